@@ -13,4 +13,137 @@ class Config:
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
-settings = Config()
\ No newline at end of file
+    # Data access
+    DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+
+    # RAG ingestion
+    RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+    RAG_INSERT_BATCH_SIZE = int(os.getenv("RAG_INSERT_BATCH_SIZE", "100"))
+    RAG_INSERT_RETRIES = int(os.getenv("RAG_INSERT_RETRIES", "3"))
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+
+    # Background ingestion jobs
+    INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+    INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "20"))
+    INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+    INGEST_PARSE_PROCESS = os.getenv("INGEST_PARSE_PROCESS", "true").lower() == "true"
+    INGEST_JOB_SYNC_SECONDS = float(os.getenv("INGEST_JOB_SYNC_SECONDS", "2"))
+
+    # Local vector index (falls back to the match_documents RPC until loaded)
+    VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "false").lower() == "true"
+    VECTOR_INDEX_VERIFY_RATE = float(os.getenv("VECTOR_INDEX_VERIFY_RATE", "0"))
+    VECTOR_INDEX_REFRESH_SECONDS = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+
+    # On-disk embedding snapshot (offline search fallback, shared by workers via mmap)
+    EMBEDDING_SNAPSHOT_ENABLED = os.getenv("EMBEDDING_SNAPSHOT_ENABLED", "false").lower() == "true"
+    EMBEDDING_SNAPSHOT_DIR = os.getenv("EMBEDDING_SNAPSHOT_DIR", "embedding_snapshot")
+    EMBEDDING_SNAPSHOT_DTYPE = os.getenv("EMBEDDING_SNAPSHOT_DTYPE", "int8")  # 'int8' or 'float16'
+    EMBEDDING_SNAPSHOT_SYNC_SECONDS = float(os.getenv("EMBEDDING_SNAPSHOT_SYNC_SECONDS", "300"))
+    EMBEDDING_SNAPSHOT_COMPACT_RATIO = float(os.getenv("EMBEDDING_SNAPSHOT_COMPACT_RATIO", "0.2"))
+
+    # Document catalog (one row per ingested document)
+    DOCUMENT_CATALOG_TTL = float(os.getenv("DOCUMENT_CATALOG_TTL", "300"))
+
+    # Complaint SMS outbox
+    SMS_TRANSPORT = os.getenv("SMS_TRANSPORT", "twilio")  # 'twilio' or 'local'
+    SMS_WORKERS = int(os.getenv("SMS_WORKERS", "2"))
+    SMS_RATE_PER_SEC = float(os.getenv("SMS_RATE_PER_SEC", "1"))
+    SMS_MAX_RETRIES = int(os.getenv("SMS_MAX_RETRIES", "3"))
+    SMS_RETRY_BACKOFF = float(os.getenv("SMS_RETRY_BACKOFF", "2"))
+    SMS_QUEUE_SIZE = int(os.getenv("SMS_QUEUE_SIZE", "1000"))
+    SMS_STATUS_HISTORY = int(os.getenv("SMS_STATUS_HISTORY", "5000"))
+    # Pending messages are re-marked every SMS_HEARTBEAT_SECONDS; another
+    # worker takes over those not re-marked for SMS_STALE_SECONDS
+    SMS_HEARTBEAT_SECONDS = float(os.getenv("SMS_HEARTBEAT_SECONDS", "15"))
+    SMS_STALE_SECONDS = float(os.getenv("SMS_STALE_SECONDS", "60"))
+
+    # Broadcast campaigns
+    CAMPAIGN_CONCURRENCY = int(os.getenv("CAMPAIGN_CONCURRENCY", "10"))
+    CAMPAIGN_SMS_RATE = float(os.getenv("CAMPAIGN_SMS_RATE", "10"))   # messages/second
+    CAMPAIGN_CALL_RATE = float(os.getenv("CAMPAIGN_CALL_RATE", "1"))  # calls/second
+    CAMPAIGN_MAX_RECIPIENTS = int(os.getenv("CAMPAIGN_MAX_RECIPIENTS", "100000"))
+    CAMPAIGN_SAVE_SECONDS = float(os.getenv("CAMPAIGN_SAVE_SECONDS", "2"))
+    CAMPAIGN_STALE_SECONDS = float(os.getenv("CAMPAIGN_STALE_SECONDS", "60"))
+    CAMPAIGN_HISTORY = int(os.getenv("CAMPAIGN_HISTORY", "20"))
+
+    # Caller profiles for the /incoming greeting
+    CALLER_PROFILE_CACHE_SIZE = int(os.getenv("CALLER_PROFILE_CACHE_SIZE", "10000"))
+    CALLER_PROFILE_TTL = float(os.getenv("CALLER_PROFILE_TTL", "86400"))
+    CALLER_PROFILE_REFRESH = float(os.getenv("CALLER_PROFILE_REFRESH", "600"))
+    CALLER_PROFILE_HISTORY = int(os.getenv("CALLER_PROFILE_HISTORY", "50"))
+    GREETING_LATENCY_BUDGET_MS = float(os.getenv("GREETING_LATENCY_BUDGET_MS", "150"))
+
+    # Voice tool calls (vapi_webhook)
+    TOOL_TURN_BUDGET_MS = float(os.getenv("TOOL_TURN_BUDGET_MS", "4000"))
+    TOOL_TIMEOUT_MS = float(os.getenv("TOOL_TIMEOUT_MS", "3000"))
+    TOOL_SEARCH_TIMEOUT_MS = float(os.getenv("TOOL_SEARCH_TIMEOUT_MS", "2500"))
+    EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "2"))
+
+    # Dashboard rollups
+    ROLLUP_RECONCILE_SECONDS = float(os.getenv("ROLLUP_RECONCILE_SECONDS", "900"))
+
+    # Heatmap grid
+    HEATMAP_ZOOM_LEVELS = [int(z) for z in os.getenv("HEATMAP_ZOOM_LEVELS", "10,12,14,16").split(",")]
+    HEATMAP_RECONCILE_SECONDS = float(os.getenv("HEATMAP_RECONCILE_SECONDS", "900"))
+
+    # Complaint listing / export
+    COMPLAINTS_PAGE_MAX = int(os.getenv("COMPLAINTS_PAGE_MAX", "500"))
+    EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+    # Zone detection
+    GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.json"))
+    GAZETTEER_CACHE_SIZE = int(os.getenv("GAZETTEER_CACHE_SIZE", "4096"))
+    WARDS_PATH = os.getenv("WARDS_PATH", os.path.join(os.path.dirname(__file__), "data", "wards.geojson"))
+    WARD_GRID_CELL_DEG = float(os.getenv("WARD_GRID_CELL_DEG", "0.01"))
+    # Set once WARDS_PATH points at real MCD ward boundaries: lets a ward's
+    # zone override the text match and allows writing ward reassignments.
+    # The bundled wards.geojson is approximate (cells around ward centres).
+    WARDS_AUTHORITATIVE = os.getenv("WARDS_AUTHORITATIVE", "false").lower() == "true"
+
+    # Bulk complaint import
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+    IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "200000"))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    IMPORT_JOB_HISTORY = int(os.getenv("IMPORT_JOB_HISTORY", "50"))
+    IMPORT_JOB_SYNC_SECONDS = float(os.getenv("IMPORT_JOB_SYNC_SECONDS", "2"))
+
+    # Hotspots
+    HOTSPOT_RADIUS_M = float(os.getenv("HOTSPOT_RADIUS_M", "330"))
+    HOTSPOT_MIN_SAMPLES = int(os.getenv("HOTSPOT_MIN_SAMPLES", "2"))
+    HOTSPOT_RECONCILE_SECONDS = float(os.getenv("HOTSPOT_RECONCILE_SECONDS", "900"))
+    HOTSPOT_SNAPSHOT_SECONDS = float(os.getenv("HOTSPOT_SNAPSHOT_SECONDS", "3600"))
+    HOTSPOT_TREND_WINDOW_SECONDS = float(os.getenv("HOTSPOT_TREND_WINDOW_SECONDS", "86400"))
+
+    # Live event stream
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+    EVENTS_MAX_DROPS = int(os.getenv("EVENTS_MAX_DROPS", "1000"))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_STATUS_MEMO_SIZE = int(os.getenv("EVENTS_STATUS_MEMO_SIZE", "100000"))
+    EVENTS_STATUS_MEMO_TTL = float(os.getenv("EVENTS_STATUS_MEMO_TTL", "86400"))
+    SLA_WARNING_HOURS = float(os.getenv("SLA_WARNING_HOURS", "4"))
+    SLA_CHECK_SECONDS = float(os.getenv("SLA_CHECK_SECONDS", "30"))
+    SLA_RECONCILE_SECONDS = float(os.getenv("SLA_RECONCILE_SECONDS", "900"))
+
+    # Response cache
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(2 * 1024 * 1024)))
+    # Upper bound on every route's TTL (0 = the per-route TTLs). Invalidation
+    # only reaches the worker that took the write, so multi-worker
+    # deployments set this to the staleness they accept.
+    RESPONSE_CACHE_MAX_TTL = float(os.getenv("RESPONSE_CACHE_MAX_TTL", "0"))
+
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Startup
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+    # consultManual caches
+    RAG_EMBED_CACHE_SIZE = int(os.getenv("RAG_EMBED_CACHE_SIZE", "1024"))
+    RAG_EMBED_CACHE_TTL = float(os.getenv("RAG_EMBED_CACHE_TTL", "3600"))
+    RAG_RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "512"))
+    RAG_RESULT_CACHE_TTL = float(os.getenv("RAG_RESULT_CACHE_TTL", "300"))
+
+settings = Config()
@@ -0,0 +1,586 @@
+import asyncio
+import base64
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from . import database
+from .config import settings
+from .services import metrics
+
+# The supabase client is synchronous. Every query goes through the single
+# process-wide client from database.py (one pooled set of HTTP connections);
+# async handlers must call it through run() so the event loop never blocks
+# on a round trip.
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_MAX_WORKERS,
+    thread_name_prefix="db"
+)
+
+
+async def run(fn: Callable, *args, **kwargs):
+    """
+    Runs a blocking data-access call on the DB thread pool and awaits it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(fn, *args, **kwargs))
+
+
+def submit(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Schedules a blocking data-access call on the DB thread pool without waiting.
+    """
+    return _db_executor.submit(fn, *args, **kwargs)
+
+
+def _client():
+    return database.supabase
+
+
+def _execute(request, operation: str):
+    """
+    Runs a query builder (or any object with execute()) and records the
+    round trip under `operation` in the Supabase latency metrics.
+    """
+    t0 = time.perf_counter()
+    try:
+        return request.execute()
+    except Exception:
+        metrics.supabase_errors.inc(operation)
+        raise
+    finally:
+        metrics.supabase_duration.observe(time.perf_counter() - t0, operation)
+
+
+# Columns callers may project with `fields=`
+COMPLAINT_COLUMNS = (
+    "id", "complaint_number", "category", "description", "location",
+    "latitude", "longitude", "zone", "citizen_phone", "citizen_name",
+    "status", "sla_deadline", "priority", "source", "created_at",
+    "assigned_to", "notes", "resolved_at", "ward",
+)
+
+Cursor = Tuple[str, Any]
+
+
+def encode_cursor(row: dict) -> str:
+    """
+    Opaque keyset cursor for the (created_at, id) position of `row`.
+    """
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Inverse of encode_cursor(). Raises ValueError on a malformed token.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(created_at), row_id
+
+
+class ComplaintStore:
+    """
+    Complaint reads and writes. In-memory views of the table (caches,
+    aggregates) subscribe to writes with subscribe(); listeners are called
+    with ("created" | "updated" | "imported", row, changed) after the write
+    succeeds, `changed` being the columns the write set.
+    "imported" marks rows from bulk imports, which listeners doing
+    per-row database work should handle cheaply. Listeners subscribed with
+    last=True run after all others (caches of what the other views serve).
+    """
+    table = "complaints"
+
+    def __init__(self):
+        self._listeners: List[Callable[[str, dict, frozenset], None]] = []
+        self._last_listeners: List[Callable[[str, dict, frozenset], None]] = []
+
+    def subscribe(self, listener: Callable[[str, dict, frozenset], None], last: bool = False):
+        (self._last_listeners if last else self._listeners).append(listener)
+
+    def _notify(self, event: str, row: dict, changed: frozenset):
+        for listener in self._listeners + self._last_listeners:
+            try:
+                listener(event, row, changed)
+            except Exception as e:
+                print(f"⚠️ Complaint listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    def _query(self, columns: str = "*", count: Optional[str] = None):
+        return _client().table(self.table).select(columns, count=count)
+
+    def insert(self, row: dict) -> dict:
+        response = _execute(_client().table(self.table).insert(row), f"{self.table}.insert")
+        saved = (response.data or [row])[0]
+        self._notify("created", saved, frozenset(saved))
+        return saved
+
+    def insert_many(self, rows: List[dict]) -> List[dict]:
+        """
+        Multi-row insert in one round trip; listeners see each saved row as
+        "imported".
+        """
+        response = _execute(_client().table(self.table).insert(rows), f"{self.table}.insert_many")
+        saved = response.data or rows
+        for row in saved:
+            self._notify("imported", row, frozenset(row))
+        return saved
+
+    def update(self, complaint_id: str, data: dict) -> List[dict]:
+        response = _execute(_client().table(self.table).update(data).eq("id", complaint_id), f"{self.table}.update")
+        updated = response.data or []
+        for row in updated:
+            self._notify("updated", row, frozenset(data))
+        return updated
+
+    def update_many(self, complaint_ids: List, data: dict) -> List[dict]:
+        """
+        Applies the same change to several complaints in one round trip.
+        """
+        response = _execute(_client().table(self.table).update(data).in_("id", complaint_ids), f"{self.table}.update_many")
+        updated = response.data or []
+        for row in updated:
+            self._notify("updated", row, frozenset(data))
+        return updated
+
+    def existing_numbers(self, numbers: List[str]) -> set:
+        """
+        Which of `numbers` are already used by a complaint.
+        """
+        if not numbers:
+            return set()
+        query = self._query("complaint_number").in_("complaint_number", list(numbers))
+        return {row["complaint_number"] for row in _execute(query, f"{self.table}.existing_numbers").data or []}
+
+    def for_phone(self, phone: str, columns: str = "*", limit: int = 50) -> List[dict]:
+        query = self._query(columns).eq("citizen_phone", phone).order("created_at", desc=True).limit(limit)
+        response = _execute(query, f"{self.table}.for_phone")
+        return response.data or []
+
+    def recent(
+        self,
+        limit: int = 50,
+        zone: Optional[str] = None,
+        status: Optional[str] = None,
+        columns: str = "*",
+    ) -> List[dict]:
+        """
+        Latest complaints first. `status` is matched case-insensitively.
+        """
+        query = self._query(columns).order("created_at", desc=True).limit(limit)
+        if zone:
+            query = query.eq("zone", zone)
+        if status:
+            query = query.ilike("status", status)
+        return _execute(query, f"{self.table}.recent").data or []
+
+    def page(
+        self,
+        columns: str = "*",
+        limit: int = 50,
+        after: Optional[Cursor] = None,
+        zone: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        One keyset page, newest first, ordered by (created_at, id). `after`
+        is the (created_at, id) of the last row of the previous page, so
+        each page is an index range scan however deep the caller pages.
+        """
+        query = self._query(columns)
+        if zone:
+            query = query.eq("zone", zone)
+        if status:
+            query = query.ilike("status", status)
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lt("created_at", until)
+        if after:
+            created_at, row_id = after
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+            )
+        query = query.order("created_at", desc=True).order("id", desc=True).limit(limit)
+        return _execute(query, f"{self.table}.page").data or []
+
+    def iter_keyset(
+        self,
+        columns: str = "*",
+        zone: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> Iterator[List[dict]]:
+        """
+        Walks matching complaints newest first with page(), one page per
+        round trip. `columns` must include created_at and id.
+        """
+        after = None
+        while True:
+            rows = self.page(columns, page_size, after, zone=zone, status=status, since=since, until=until)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    def located(self, columns: str = "*", zone: Optional[str] = None, limit: int = 1000) -> List[dict]:
+        """
+        Complaints that have both latitude and longitude set.
+        """
+        query = self._query(columns).not_.is_("latitude", "null").not_.is_("longitude", "null").limit(limit)
+        if zone:
+            query = query.eq("zone", zone)
+        return _execute(query, f"{self.table}.located").data or []
+
+    def iter_pages(
+        self,
+        columns: str = "*",
+        zone: Optional[str] = None,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> Iterator[List[dict]]:
+        """
+        Walks the matching complaints in id order, one page per round trip.
+        """
+        start = 0
+        while True:
+            query = self._query(columns)
+            if zone:
+                query = query.eq("zone", zone)
+            if status:
+                query = query.ilike("status", status)
+            if category:
+                query = query.eq("category", category)
+            page = _execute(query.order("id").range(start, start + page_size - 1), f"{self.table}.iter_pages").data or []
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            start += page_size
+
+    def count(
+        self,
+        zone: Optional[str] = None,
+        status: Optional[str] = None,
+        resolved_since: Optional[str] = None,
+    ) -> int:
+        """
+        Number of matching complaints. `status` is matched case-insensitively,
+        as in recent() and page().
+        """
+        query = self._query("id", count="exact")
+        if status:
+            query = query.ilike("status", status)
+        if resolved_since:
+            query = query.gte("resolved_at", resolved_since)
+        if zone:
+            query = query.eq("zone", zone)
+        return _execute(query, f"{self.table}.count").count or 0
+
+
+def doc_key(metadata: dict) -> Optional[str]:
+    """
+    The document a chunk belongs to: its doc_id, or for chunks stored before
+    doc_ids existed, its filename (the doc_id the catalog backfill gives them).
+    """
+    metadata = metadata or {}
+    return metadata.get("doc_id") or metadata.get("filename")
+
+
+class DocumentChunkStore:
+    table = "document_chunks"
+
+    def insert_many(self, rows: List[dict]) -> List[dict]:
+        response = _execute(_client().table(self.table).insert(rows), f"{self.table}.insert_many")
+        return response.data or []
+
+    def page(self, start: int, size: int, columns: str = "id,content,metadata,embedding") -> List[dict]:
+        query = _client().table(self.table)\
+            .select(columns)\
+            .order("id")\
+            .range(start, start + size - 1)
+        return _execute(query, f"{self.table}.page").data or []
+
+    def page_after(self, after_id, size: int, columns: str = "id,content,metadata,embedding") -> List[dict]:
+        """
+        The next `size` chunks with id greater than `after_id`, by id.
+        """
+        query = _client().table(self.table)\
+            .select(columns)\
+            .gt("id", after_id)\
+            .order("id")\
+            .limit(size)
+        return _execute(query, f"{self.table}.page_after").data or []
+
+    def for_doc(self, doc_id: str, columns: str = "id,content,metadata", page_size: int = 1000) -> List[dict]:
+        """
+        Every chunk of one document, by doc_key(): chunks with this doc_id,
+        or failing that, chunks without a doc_id stored under this filename.
+        """
+        rows = self._for_doc(lambda q: q.eq("metadata->>doc_id", doc_id), columns, page_size)
+        if not rows:
+            rows = self._for_doc(
+                lambda q: q.is_("metadata->>doc_id", "null").eq("metadata->>filename", doc_id), columns, page_size
+            )
+        return rows
+
+    def _for_doc(self, where: Callable, columns: str, page_size: int) -> List[dict]:
+        rows, start = [], 0
+        while True:
+            query = where(_client().table(self.table).select(columns))\
+                .order("id")\
+                .range(start, start + page_size - 1)
+            page = _execute(query, f"{self.table}.for_doc").data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    def by_ids(self, chunk_ids: List, columns: str = "id,content,metadata,embedding") -> List[dict]:
+        query = _client().table(self.table).select(columns).in_("id", chunk_ids).order("id")
+        return _execute(query, f"{self.table}.by_ids").data or []
+
+    def upsert_many(self, rows: List[dict]) -> List[dict]:
+        """
+        Rewrites existing chunks by id; columns missing from the rows (the
+        embedding, typically) are left as they are.
+        """
+        response = _execute(_client().table(self.table).upsert(rows, on_conflict="id"), f"{self.table}.upsert_many")
+        return response.data or []
+
+    def delete_many(self, chunk_ids: List) -> List[dict]:
+        response = _execute(_client().table(self.table).delete().in_("id", chunk_ids), f"{self.table}.delete_many")
+        return response.data or []
+
+    def match(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[dict]:
+        # Call the Supabase RPC function 'match_documents'
+        # Ensure this function exists in your Supabase SQL
+        response = _execute(_client().rpc("match_documents", {
+            "query_embedding": query_embedding,
+            "match_threshold": match_threshold,
+            "match_count": match_count
+        }), "rpc.match_documents")
+        return response.data or []
+
+
+class DocumentStore:
+    """
+    The document catalog: one row per ingested document (doc_id), with its
+    chunk count, size, checksum and ingest timings.
+    """
+    table = "documents"
+
+    def all(self, page_size: int = 1000) -> List[dict]:
+        rows, start = [], 0
+        while True:
+            query = _client().table(self.table).select("*").order("doc_id").range(start, start + page_size - 1)
+            page = _execute(query, f"{self.table}.all").data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    def upsert(self, rows: List[dict]) -> List[dict]:
+        response = _execute(_client().table(self.table).upsert(rows, on_conflict="doc_id"), f"{self.table}.upsert")
+        return response.data or []
+
+    def find_active(self, checksum: str = None, filename: str = None, doc_type: str = None,
+                    doc_id: str = None) -> Optional[dict]:
+        """
+        The newest active document with this checksum, filename and/or doc_id.
+        """
+        query = _client().table(self.table).select("*").eq("status", "active")
+        if doc_id is not None:
+            query = query.eq("doc_id", doc_id)
+        if checksum is not None:
+            query = query.eq("checksum", checksum)
+        if filename is not None:
+            query = query.eq("filename", filename)
+        if doc_type is not None:
+            query = query.eq("type", doc_type)
+        rows = _execute(query.order("created_at", desc=True).limit(1), f"{self.table}.find_active").data or []
+        return rows[0] if rows else None
+
+
+class CampaignStore:
+    """
+    Broadcast campaigns (one row each, with the recipient list) and their
+    per-recipient results, keyed by (campaign_id, idx).
+    """
+    table = "campaigns"
+    results_table = "campaign_results"
+    SUMMARY_COLUMNS = (
+        "id,mode,message,selector,status,error,total,cursor,sent,failed,created_at,"
+        "started_at,finished_at,owner,heartbeat_at,pause_requested"
+    )
+
+    def upsert(self, row: dict) -> List[dict]:
+        response = _execute(_client().table(self.table).upsert(row, on_conflict="id"), f"{self.table}.upsert")
+        return response.data or []
+
+    def update(self, campaign_id: str, data: dict, expected: Optional[dict] = None) -> List[dict]:
+        """
+        Updates one campaign, only if its columns still equal `expected`
+        (compare-and-set). Returns the updated rows: [] means no match.
+        """
+        query = _client().table(self.table).update(data).eq("id", campaign_id)
+        for column, value in (expected or {}).items():
+            query = query.is_(column, "null") if value is None else query.eq(column, value)
+        return _execute(query, f"{self.table}.update").data or []
+
+    def get(self, campaign_id: str, columns: str = "*") -> Optional[dict]:
+        query = _client().table(self.table).select(columns).eq("id", campaign_id).limit(1)
+        rows = _execute(query, f"{self.table}.get").data or []
+        return rows[0] if rows else None
+
+    def recent(self, limit: int = 50, columns: str = SUMMARY_COLUMNS) -> List[dict]:
+        query = _client().table(self.table).select(columns).order("created_at", desc=True).limit(limit)
+        return _execute(query, f"{self.table}.recent").data or []
+
+    def save_results(self, rows: List[dict]) -> List[dict]:
+        query = _client().table(self.results_table).upsert(rows, on_conflict="campaign_id,idx")
+        return _execute(query, f"{self.results_table}.upsert").data or []
+
+    def results(
+        self,
+        campaign_id: str,
+        offset: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Saved results in recipient order, optionally of one status or with
+        idx in [start, end).
+        """
+        query = _client().table(self.results_table).select("*").eq("campaign_id", campaign_id)
+        if status:
+            query = query.eq("status", status)
+        if start is not None:
+            query = query.gte("idx", start)
+        if end is not None:
+            query = query.lt("idx", end)
+        query = query.order("idx").range(offset, offset + limit - 1)
+        return _execute(query, f"{self.results_table}.page").data or []
+
+    def all_results(self, campaign_id: str, page_size: int = 1000) -> List[dict]:
+        rows, start = [], 0
+        while True:
+            page = self.results(campaign_id, start, page_size)
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+
+class IngestJobStore:
+    """
+    Background ingestion jobs, so any worker can report on a job another
+    worker is running.
+    """
+    table = "ingest_jobs"
+
+    def upsert(self, row: dict) -> List[dict]:
+        response = _execute(_client().table(self.table).upsert(row, on_conflict="job_id"), f"{self.table}.upsert")
+        return response.data or []
+
+    def get(self, job_id: str) -> Optional[dict]:
+        query = _client().table(self.table).select("*").eq("job_id", job_id).limit(1)
+        rows = _execute(query, f"{self.table}.get").data or []
+        return rows[0] if rows else None
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        query = _client().table(self.table).select("*").order("created_at", desc=True).limit(limit)
+        return _execute(query, f"{self.table}.recent").data or []
+
+
+class ImportJobStore(IngestJobStore):
+    """
+    Background complaint imports, kept like ingestion jobs.
+    """
+    table = "import_jobs"
+
+
+class NotificationStore:
+    """
+    The SMS outbox: one row per message, keyed by complaint number, with
+    its body and delivery status. Pending messages survive a restart, and
+    any worker can report on a message another worker queued.
+    """
+    table = "sms_outbox"
+    PENDING = ("queued", "retrying")
+
+    def upsert(self, row: dict) -> List[dict]:
+        response = _execute(_client().table(self.table).upsert(row, on_conflict="complaint_number"), f"{self.table}.upsert")
+        return response.data or []
+
+    def update(self, key: str, data: dict, expected: Optional[dict] = None) -> List[dict]:
+        """
+        Updates one message, only if its columns still equal `expected`
+        (compare-and-set). Returns the updated rows: [] means no match.
+        """
+        query = _client().table(self.table).update(data).eq("complaint_number", key)
+        for column, value in (expected or {}).items():
+            query = query.is_(column, "null") if value is None else query.eq(column, value)
+        return _execute(query, f"{self.table}.update").data or []
+
+    def get(self, key: str) -> Optional[dict]:
+        query = _client().table(self.table).select("*").eq("complaint_number", key).limit(1)
+        rows = _execute(query, f"{self.table}.get").data or []
+        return rows[0] if rows else None
+
+    def heartbeat(self, owner: str, at: str) -> List[dict]:
+        """
+        Marks every pending message of `owner` as still in hand.
+        """
+        query = _client().table(self.table).update({"heartbeat_at": at})\
+            .eq("owner", owner)\
+            .in_("status", list(self.PENDING))
+        return _execute(query, f"{self.table}.heartbeat").data or []
+
+    def stale(self, before: str, limit: int = 100) -> List[dict]:
+        """
+        Pending messages whose owner has not checked in since `before`.
+        """
+        query = _client().table(self.table).select("*")\
+            .in_("status", list(self.PENDING))\
+            .lt("heartbeat_at", before)\
+            .order("heartbeat_at")\
+            .limit(limit)
+        return _execute(query, f"{self.table}.stale").data or []
+
+
+class DocumentStorage:
+    bucket = "documents"
+
+    def upload(self, path: str, file_bytes: bytes, content_type: str = "application/pdf"):
+        with metrics.supabase_duration.time("storage.upload"):
+            return _client().storage.from_(self.bucket).upload(path, file_bytes, {"content-type": content_type})
+
+    def public_url(self, path: str) -> str:
+        return _client().storage.from_(self.bucket).get_public_url(path)
+
+    def remove(self, paths: List[str]):
+        with metrics.supabase_duration.time("storage.remove"):
+            return _client().storage.from_(self.bucket).remove(paths)
+
+
+complaints = ComplaintStore()
+notification_records = NotificationStore()
+document_chunks = DocumentChunkStore()
+documents = DocumentStore()
+ingest_job_records = IngestJobStore()
+import_job_records = ImportJobStore()
+campaign_records = CampaignStore()
+document_storage = DocumentStorage()
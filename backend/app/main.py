@@ -1,9 +1,114 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import vapi_routes, api_routes, documents
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from . import startup
+from .config import settings
+
+with startup.timed_import("app.routers.vapi_routes"):
+    from .routers import vapi_routes
+with startup.timed_import("app.routers.api_routes"):
+    from .routers import api_routes
+with startup.timed_import("app.routers.documents"):
+    from .routers import documents
+with startup.timed_import("app.routers.campaigns"):
+    from .routers import campaigns
+with startup.timed_import("app.routers.events"):
+    from .routers import events
+from .services import embedding_snapshot, events as event_bus, heatmap, hotspots, metrics, notifications, response_cache, rollups
 
 app = FastAPI(title="MCD Sampark Agent")
 
+
+def _views_ready() -> bool:
+    # The cached complaint routes answer from the rollup, heatmap and hotspot
+    # views; until those have loaded they serve slower fallback answers
+    return startup.is_ready() and rollups.engine.ready and heatmap.grid.ready and hotspots.engine.ready
+
+
+# Registered before CORS so CORS stays the outer layer and also decorates
+# cached and 304 responses
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    """
+    Serves cacheable GET routes (see response_cache.CACHED_ROUTES) from
+    memory, with ETag / If-None-Match revalidation.
+    """
+    rule = response_cache.cache.rule_for(request.url.path) if request.method == "GET" else None
+    if not settings.RESPONSE_CACHE_ENABLED or rule is None:
+        return await call_next(request)
+
+    cache = response_cache.cache
+    ttl, tag = rule
+    key = cache.key_for(request.url.path, request.query_params.multi_items())
+    if_none_match = request.headers.get("if-none-match")
+
+    entry = cache.get(key)
+    if entry is None:
+        generation = cache.generation(tag)
+        response = await call_next(request)
+        # Fallbacks and the degraded answers served while warm-ups are still
+        # running are passed through, not stored
+        if response.status_code != 200 or response_cache.is_uncacheable(response.headers) or not _views_ready():
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = tuple((k, v) for k, v in response.headers.items() if k.lower() != "content-length")
+        entry = response_cache.CachedResponse(body, 200, headers, response_cache.make_etag(body), tag, time.time() + ttl)
+        cache.set(key, entry, generation)
+        source = "MISS"
+    else:
+        source = "HIT"
+
+    validators = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": source}
+    if response_cache.etag_matches(if_none_match, entry.etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=validators)
+    return Response(content=entry.body, status_code=entry.status_code, headers={**dict(entry.headers), **validators})
+
+
+def _route_label(request: Request, status_code: int) -> str:
+    # Path parameters put back as {name}, so /api/complaints/123 and /124
+    # share a series
+    if request.scope.get("route") is not None:
+        segments = request.url.path.split("/")
+        for name, value in request.path_params.items():
+            for i in range(len(segments) - 1, -1, -1):
+                if segments[i] == str(value):
+                    segments[i] = "{" + name + "}"
+                    break
+        return "/".join(segments)
+    if response_cache.cache.rule_for(request.url.path) is not None:
+        return request.url.path  # answered from the response cache
+    return "unmatched"
+
+
+async def record_request_metrics(request: Request, call_next):
+    """
+    Per-route request counts and latency (to response start, so long-lived
+    streams are not counted as slow) plus the number of requests in flight.
+    """
+    method = request.method
+    metrics.http_in_flight.inc(method)
+    t0 = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.http_in_flight.dec(method)
+        route = _route_label(request, status_code)
+        metrics.http_request_duration.observe(time.perf_counter() - t0, method, route)
+        metrics.http_requests.inc(method, route, str(status_code))
+
+
+# Outside the response cache so cache hits are measured too; not installed
+# at all when metrics are off
+if settings.METRICS_ENABLED:
+    app.middleware("http")(record_request_metrics)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -15,8 +120,62 @@ app.add_middleware(
 app.include_router(vapi_routes.router, prefix="/api/vapi")
 app.include_router(api_routes.router, prefix="/api") # For Frontend
 app.include_router(documents.router, prefix="/api/documents")
+app.include_router(campaigns.router, prefix="/api/broadcast/campaigns")
+app.include_router(events.router, prefix="/api/events")
+
+
+def _warm_embedding_model():
+    from .services import rag_service
+    rag_service.get_model().encode("warm-up")
+
+def _warm_sklearn():
+    from sklearn.cluster import DBSCAN  # noqa: F401
+
+def _warm_document_catalog():
+    from .services import document_catalog
+    document_catalog.catalog.load()
+
+def _warm_vector_index():
+    from .services import vector_index
+    vector_index.index.load()
+    vector_index.start_refresh()
+
+
+if settings.WARMUP_ON_STARTUP:
+    startup.register_warmup("embedding_model", _warm_embedding_model)
+    startup.register_warmup("sklearn", _warm_sklearn)
+    startup.register_warmup("document_catalog", _warm_document_catalog)
+    if settings.VECTOR_INDEX_ENABLED:
+        startup.register_warmup("vector_index", _warm_vector_index)
+
+
+@app.on_event("startup")
+def start_background_warmup():
+    startup.start_warmups()
+    rollups.engine.start()
+    heatmap.grid.start()
+    hotspots.engine.start()
+    event_bus.sla_tracker.start()
+    notifications.outbox.start()
+    if settings.EMBEDDING_SNAPSHOT_ENABLED:
+        embedding_snapshot.start()
 
 
 @app.get("/")
 def health():
-    return {"status": "active"}
\ No newline at end of file
+    return {"status": "active"}
+
+@app.get("/cache-stats")
+def response_cache_stats():
+    return response_cache.cache.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Metrics are disabled"})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def readiness():
+    report = startup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
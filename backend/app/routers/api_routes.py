@@ -1,69 +1,84 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, File, Form, Query, HTTPException, UploadFile
 from typing import Optional, List
 from datetime import datetime, timedelta
+import csv
+import io
+import json
 import random
-import os
-import numpy as np
-from sklearn.cluster import DBSCAN
-from collections import Counter
-from ..database import supabase
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ..config import settings
+from ..data_access import COMPLAINT_COLUMNS, complaints as complaint_store, decode_cursor, encode_cursor
 from pydantic import BaseModel
-from ..services.tools import detect_zone_and_coords, calculate_sla
-from ..services.sms_service import send_complaint_sms
+from ..services.tools import calculate_sla, resolve_location
+from ..services import complaint_import, heatmap, hotspots, notifications, response_cache, rollups, wards
 
 router = APIRouter()
 
 # --- NEW ENDPOINTS ---
 
 @router.get("/heatmap")
-def get_heatmap_points(zone: Optional[str] = None):
+def get_heatmap_points(
+    zone: Optional[str] = None,
+    zoom: Optional[int] = None,
+    agg: str = "sum",
+    bbox: Optional[str] = None,
+):
+    """
+    Without `zoom`: raw [lat, lng, intensity] points (capped at 2000).
+    With `zoom`: server-side aggregated grid cells for that zoom level,
+    covering every complaint. `agg` is 'sum' or 'max'; `bbox` is
+    'south,west,north,east'.
+    """
+    bounds = None
+    if bbox:
+        try:
+            bounds = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            bounds = ()
+        if len(bounds) != 4:
+            raise HTTPException(status_code=400, detail="bbox must be 'south,west,north,east'")
+
     try:
-        query = supabase.table("complaints").select("latitude,longitude,priority").not_.is_("latitude", "null").not_.is_("longitude", "null").limit(2000)
-        
-        if zone and zone != 'all':
-            # Normalize zone format
-            db_zone = zone.replace('-', ' ').title()
-            query = query.eq("zone", db_zone)
-            
-        result = query.execute()
-        data = result.data or []
+        if zoom is not None and heatmap.grid.ready:
+            grid_zone = zone.replace('-', ' ') if zone and zone != 'all' else None
+            return heatmap.grid.cells(zoom, zone=grid_zone, agg=agg, bbox=bounds)
+
+        # Normalize zone format
+        db_zone = zone.replace('-', ' ').title() if zone and zone != 'all' else None
+        data = complaint_store.located("latitude,longitude,priority", zone=db_zone, limit=2000)
         
         # Convert to format expected by frontend: [lat, lng, intensity]
-        priority_map = {
-            "critical": 1.0,
-            "high": 0.8,
-            "medium": 0.5,
-            "low": 0.3
-        }
-        
         points = []
         for row in data:
-            intensity = priority_map.get(row.get("priority", "medium").lower(), 0.5)
+            intensity = heatmap.intensity_for(row.get("priority"))
             points.append([row["latitude"], row["longitude"], intensity])
             
         return {"points": points}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         print(f"Heatmap error: {e}")
-        return {"points": []}
+        return response_cache.uncacheable({"points": []})
 
 @router.get("/dashboard-stats")
 def get_dashboard_stats(zone: Optional[str] = None):
     try:
+        # Served from the in-memory rollups (kept current from the write
+        # paths and reconciled in the background) once they are loaded
+        if rollups.engine.ready:
+            rollup_zone = zone.replace('-', ' ') if zone and zone != 'all' else None
+            return rollups.engine.stats(rollup_zone)
+
         # Normalize zone format
         db_zone = zone.replace('-', ' ').title() if zone and zone != 'all' else None
 
         # 1. Total Complaints (approx)
-        total_query = supabase.table("complaints").select("id", count="exact")
-        if db_zone:
-            total_query = total_query.eq("zone", db_zone)
-        total_count = total_query.execute().count
+        total_count = complaint_store.count(zone=db_zone)
 
         # 2. Resolved Today
         today = datetime.now().date().isoformat()
-        resolved_query = supabase.table("complaints").select("id", count="exact").eq("status", "Resolved").gte("resolved_at", today)
-        if db_zone:
-            resolved_query = resolved_query.eq("zone", db_zone)
-        resolved_count = resolved_query.execute().count
+        resolved_count = complaint_store.count(zone=db_zone, status="Resolved", resolved_since=today)
         
         # 3. Active Agents (Mock for now, or fetch from agents table if exists)
         active_agents = random.randint(12, 45) 
@@ -85,29 +100,24 @@ def get_dashboard_stats(zone: Optional[str] = None):
         }
     except Exception as e:
         print(f"Dashboard stats error: {e}")
-        return {
+        return response_cache.uncacheable({
             "total_complaints": 0,
             "resolved": 0,
             "avg_resolution_hours": 0,
             "active_agents": 0,
             "complaint_trend": 0,
             "resolution_trend": 0
-        }
+        })
 
 @router.get("/activity")
 def get_recent_activity(limit: int = 5, zone: Optional[str] = None):
     try:
         # We can fetch from complaints table as "New Complaint" activity
-        query = supabase.table("complaints").select("*").order("created_at", desc=True).limit(limit)
-        
-        if zone and zone != 'all':
-            db_zone = zone.replace('-', ' ').title()
-            query = query.eq("zone", db_zone)
-            
-        result = query.execute()
+        db_zone = zone.replace('-', ' ').title() if zone and zone != 'all' else None
+        rows = complaint_store.recent(limit, zone=db_zone)
         
         activities = []
-        for row in result.data or []:
+        for row in rows:
             activities.append({
                 "id": row["id"],
                 "type": "complaint" if row["status"] == "Open" else "resolved",
@@ -120,113 +130,177 @@ def get_recent_activity(limit: int = 5, zone: Optional[str] = None):
         return {"activities": activities}
     except Exception as e:
         print(f"Activity error: {e}")
-        return {"activities": []}
+        return response_cache.uncacheable({"activities": []})
 
 
 @router.get("/hotspots")
 def get_hotspots(zone: Optional[str] = None):
     try:
-        # Fetch complaints with coordinates
-        query = supabase.table("complaints").select("*").not_.is_("latitude", "null").not_.is_("longitude", "null").limit(1000)
-        
-        if zone and zone != 'all':
-            db_zone = zone.replace('-', ' ').title()
-            query = query.eq("zone", db_zone)
-            
-        result = query.execute()
-        data = result.data or []
-        
-        if len(data) < 1:
-            return {"hotspots": []}
-            
-        # Prepare coordinates for clustering
-        coords = np.array([[row['latitude'], row['longitude']] for row in data])
-        
-        # DBSCAN Clustering
-        # eps is roughly degrees. 1 deg ~= 111km. 0.003 deg ~= 330m radius.
-        # Reduced min_samples to 2 to catch smaller clusters in specific zones
-        clustering = DBSCAN(eps=0.003, min_samples=2, metric='euclidean').fit(coords)
-        
-        labels = clustering.labels_
-        unique_labels = set(labels)
-        
-        hotspots = []
-        
-        for k in unique_labels:
-            if k == -1:
-                # Noise points, ignore
-                continue
-                
-            # Get indices for this cluster
-            class_member_mask = (labels == k)
-            cluster_data = [data[i] for i in range(len(data)) if class_member_mask[i]]
-            
-            # 1. Calculate centroid (average lat/lng)
-            lat_center = np.mean([c['latitude'] for c in cluster_data])
-            lng_center = np.mean([c['longitude'] for c in cluster_data])
+        db_zone = zone.replace('-', ' ').title() if zone and zone != 'all' else None
+        if hotspots.engine.ready:
+            return {"hotspots": hotspots.engine.hotspots(db_zone, limit=5)}
+
+        # Engine still loading: cluster a bounded sample directly
+        data = complaint_store.located(hotspots.HOTSPOT_COLUMNS, zone=db_zone, limit=1000)
+        sites = [s for s in map(hotspots._site, data) if s is not None]
+        found = sorted(hotspots.cluster_sites(sites), key=lambda x: x["complaints"], reverse=True)[:5]
+        return {"hotspots": [{"id": i + 1, **h, "trend": "stable"} for i, h in enumerate(found)]}
 
-            # 2. Determine Name
-            locations = [c.get("location", "Unknown Area").split(',')[0].strip() for c in cluster_data]
-            area_name = Counter(locations).most_common(1)[0][0]
-            
-            # 3. Stats
-            count = len(cluster_data)
-            categories = [c.get("category", "General") for c in cluster_data]
-            main_issue = Counter(categories).most_common(1)[0][0]
-            
-            # 4. Severity
-            severity = "low"
-            if count >= 10: severity = "critical"
-            elif count >= 5: severity = "high"
-            else: severity = "medium"
-            
-            hotspots.append({
-                "id": int(k) + 1,
-                "area": area_name,
-                "zone": cluster_data[0].get("zone", "General"),
-                "complaints": count,
-                "mainIssue": main_issue,
-                "severity": severity,
-                "trend": "stable",
-                "lat": lat_center, 
-                "lng": lng_center
-            })
-            
-        # Sort by complaint count
-        top_hotspots = sorted(hotspots, key=lambda x: x["complaints"], reverse=True)[:5]
-        
-        return {"hotspots": top_hotspots}
-        
     except Exception as e:
         print(f"Hotspot AI error: {e}")
         # Fallback to empty if ML fails
-        return {"hotspots": []}
+        return response_cache.uncacheable({"hotspots": []})
+
+def _status_filter(status: Optional[str]) -> Optional[str]:
+    if not status or status == 'all':
+        return None
+    # Status is matched with ilike for case insensitivity, but ILIKE
+    # "in-progress" fails against "In Progress", so map it explicitly
+    if status == 'in-progress':
+        return "In Progress"
+    return status
+
+def _projection(fields: Optional[str]) -> str:
+    """
+    Validates a comma-separated `fields=` list. created_at and id are always
+    selected, since the keyset cursor is built from them.
+    """
+    if not fields:
+        return "*"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in COMPLAINT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    columns = list(dict.fromkeys(["id", "created_at"] + requested))
+    return ",".join(columns)
 
 @router.get("/complaints")
-def get_complaints(limit: int = 50, zone: Optional[str] = None, status: Optional[str] = None):
+def get_complaints(
+    limit: int = 50,
+    zone: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Newest complaints first, keyset-paginated: pass the returned
+    `next_cursor` back as `cursor` for the following page.
+    """
+    columns = _projection(fields)
     try:
-        query = supabase.table("complaints").select("*").order("created_at", desc=True).limit(limit)
-        if zone and zone != 'all':
-            query = query.eq("zone", zone)
-        if status and status != 'all':
-            # Handle status mapping
-            db_status = status
-            if status == 'in-progress':
-                # Use ILIKE with wildcards or OR if needed, but 'In Progress' is the standard
-                # Or just construct a list of acceptable variants?
-                # Simplest: if 'in-progress', map to 'In Progress' for specific match
-                # But ILIKE "in-progress" fails against "In Progress".
-                # Let's try to be smart.
-                db_status = "In Progress"
-            
-            # Use ilike for case insensitivity
-            query = query.ilike("status", db_status)
-            
-        response = query.execute()
-        return {"complaints": response.data or []}
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = max(1, min(limit, settings.COMPLAINTS_PAGE_MAX))
+
+    try:
+        db_zone = zone if zone and zone != 'all' else None
+        rows = complaint_store.page(columns, limit, after, zone=db_zone, status=_status_filter(status))
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+        return {"complaints": rows, "next_cursor": next_cursor}
     except Exception as e:
         print(f"Error fetching complaints: {e}")
-        return {"complaints": []}
+        return response_cache.uncacheable({"complaints": [], "next_cursor": None})
+
+def _ndjson_lines(pages):
+    for rows in pages:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+def _csv_lines(pages, columns: List[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header-only export when nothing matched
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+@router.get("/complaints/export")
+def export_complaints(
+    format: str = "ndjson",
+    zone: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Streams every matching complaint as NDJSON or CSV, walking the table in
+    keyset pages so memory stays flat regardless of the export size.
+    `since`/`until` bound created_at (ISO timestamps, until exclusive).
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    columns = _projection(fields)
+    db_zone = zone if zone and zone != 'all' else None
+    pages = complaint_store.iter_keyset(
+        columns,
+        zone=db_zone,
+        status=_status_filter(status),
+        since=since,
+        until=until,
+        page_size=settings.EXPORT_PAGE_SIZE,
+    )
+
+    filename = f"complaints-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "csv":
+        header = list(COMPLAINT_COLUMNS) if columns == "*" else columns.split(",")
+        return StreamingResponse(_csv_lines(pages, header), media_type="text/csv", headers=headers)
+    return StreamingResponse(_ndjson_lines(pages), media_type="application/x-ndjson", headers=headers)
+
+@router.post("/complaints/import", status_code=202)
+def import_complaints(file: UploadFile = File(...), format: Optional[str] = Form(None), source: str = Form("import")):
+    """
+    Bulk import from a CSV or NDJSON upload (category, description, location
+    required). Runs in the background; poll /complaints/import/{job_id} for
+    progress, the per-row error report and throughput.
+    """
+    try:
+        fmt = complaint_import.detect_format(file.filename, format)
+    except complaint_import.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = complaint_import.submit_import(file.file, file.filename, fmt, source=source)
+    return {"status": "queued", "job_id": job["job_id"], "filename": file.filename, "format": fmt}
+
+@router.post("/complaints/reassign-wards")
+def reassign_wards(dry_run: bool = True):
+    """
+    Recomputes ward and zone of every located complaint from its
+    coordinates. With dry_run (the default) only reports what would change;
+    writing needs WARDS_AUTHORITATIVE.
+    """
+    try:
+        return wards.reassign_complaints(dry_run=dry_run)
+    except wards.WardDataNotAuthoritative as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Ward reassignment failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/complaints/rezone")
+def rezone(dry_run: bool = True):
+    """
+    Moves complaints to the zone the gazetteer now gives their location
+    (after places moved between zones). With dry_run (the default) only
+    reports what would change.
+    """
+    try:
+        return wards.rezone_complaints(dry_run=dry_run)
+    except Exception as e:
+        print(f"Complaint rezoning failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/complaints/import/{job_id}")
+def get_import_job(job_id: str):
+    job = complaint_import.get_import(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 class ComplaintUpdate(BaseModel):
     status: Optional[str] = None
@@ -259,9 +333,9 @@ def update_complaint(complaint_id: str, updates: ComplaintUpdate):
             return {"status": "no changes"}
 
         # Use the service role client (supabase var) which should bypass RLS if configured
-        result = supabase.table("complaints").update(data).eq("id", complaint_id).execute()
+        updated = complaint_store.update(complaint_id, data)
         
-        return {"status": "success", "data": result.data}
+        return {"status": "success", "data": updated}
     except Exception as e:
         print(f"Error updating complaint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -273,12 +347,14 @@ class ComplaintCreate(BaseModel):
     citizen_phone: Optional[str] = None
     citizen_name: Optional[str] = "Citizen"
     priority: Optional[str] = "medium"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 @router.post("/complaints")
 def create_complaint(complaint: ComplaintCreate):
     try:
-        # Auto-detect zone and coords
-        zone, (lat, lng) = detect_zone_and_coords(complaint.location)
+        # Auto-detect zone, ward and coords (map pins win over the text)
+        place = resolve_location(complaint.location, complaint.latitude, complaint.longitude)
         sla_hrs, deadline = calculate_sla(complaint.category)
         ticket_id = f"MCD-WEB-{int(datetime.now().timestamp())}"[-10:]
         
@@ -287,9 +363,7 @@ def create_complaint(complaint: ComplaintCreate):
             "category": complaint.category,
             "description": complaint.description,
             "location": complaint.location,
-            "latitude": lat,
-            "longitude": lng,
-            "zone": zone,
+            **place,
             "citizen_phone": complaint.citizen_phone,
             "citizen_name": complaint.citizen_name,
             "status": "Open",
@@ -299,20 +373,13 @@ def create_complaint(complaint: ComplaintCreate):
             "created_at": datetime.now().isoformat()
         }
         
-        data = supabase.table("complaints").insert(row).execute()
+        complaint_store.insert(row)
         
-        # Send SMS
-        if complaint.citizen_phone: 
-             # In our specific demo case, we send to the registered Twilio number mostly
-             # But we pass the citizen phone as 'to_number' logic in sms_service 
-             # handles the override for the demo.
-             send_complaint_sms(complaint.citizen_phone, ticket_id, complaint.category)
-             
-        # If no phone provided, we might still want to alert the hardcoded number?
+        # Queue SMS (sent by the outbox workers, not inline)
+        # In our specific demo case, we send to the registered Twilio number mostly
         # The user said "use my number... even when complaint logged through... web app"
-        # So yes, we should ALWAYS send SMS.
-        else:
-             send_complaint_sms("N/A", ticket_id, complaint.category)
+        # So yes, we should ALWAYS send SMS, even if no phone was provided.
+        notifications.enqueue_complaint_sms(complaint.citizen_phone or "N/A", ticket_id, complaint.category)
              
         return {"status": "success", "ticket_id": ticket_id, "data": row}
         
@@ -320,7 +387,19 @@ def create_complaint(complaint: ComplaintCreate):
         print(f"Error creating complaint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-from ..services.sms_service import send_complaint_sms, send_broadcast_sms
+from ..services.sms_service import send_broadcast_sms
+from ..services import vapi_service
+
+@router.get("/complaints/{complaint_number}/notification")
+def get_notification_status(complaint_number: str):
+    status = notifications.delivery_status(complaint_number)
+    if not status:
+        raise HTTPException(status_code=404, detail="No notification recorded for this complaint")
+    return status
+
+@router.get("/notifications/stats")
+def get_notification_stats():
+    return notifications.outbox.stats()
 
 class BroadcastRequest(BaseModel):
     message: str
@@ -331,7 +410,7 @@ class BroadcastRequest(BaseModel):
 async def start_broadcast(request: BroadcastRequest):
     try:
         if request.type == "sms":
-            success, msg = send_broadcast_sms(request.phone, request.message)
+            success, msg = await run_in_threadpool(send_broadcast_sms, request.phone, request.message)
             if success:
                 return {"status": "success", "mode": "sms", "details": msg}
             else:
@@ -339,74 +418,16 @@ async def start_broadcast(request: BroadcastRequest):
                 raise HTTPException(status_code=500, detail=f"Failed to send SMS: {msg}")
 
         # Fallback to defaults (Voice Call)
-        vapi_private_key = os.environ.get("VAPI_PRIVATE_KEY")
-        vapi_phone_id = os.environ.get("VAPI_PHONE_NUMBER_ID")
-        vapi_assistant_id = os.environ.get("VAPI_ASSISTANT_ID")
-        
-        # Ensure E.164 format for Voice Calls (default to India +91)
-        phone_number = request.phone
-        if not phone_number.startswith('+'):
-            phone_number = f"+91{phone_number}"
-        
-        if not vapi_private_key or not vapi_phone_id:
+        if not vapi_service.vapi_configured():
             raise HTTPException(status_code=500, detail="Vapi configuration missing (KEY or PHONE_ID)")
-            
-        # Prepare the buffer message to handle Twilio Trial overlap
-        # Using a professional intro as a buffer. "Namaste" + Intro is ~4-5 seconds.
-        # This is better than "..." which might be ignored by some TTS engines.
-        safe_message = f"Namaste. This is an official call from the Municipal Corporation of Delhi. {request.message}"
-
-        # If assistant ID is missing, we use a transient assistant config
-        assistant_config = {
-            "firstMessageMode": "assistant-speaks-first",
-            "firstMessage": safe_message,
-            "systemPrompt": "You are a helpful MCD officer. You just broadcasted a message to this citizen. Answer any questions they have about it or other MCD services politely and concisely in Hinglish.",
-            "voice": {
-                "provider": "11labs",
-                "voiceId": "sarah",
-            },
-            "model": {
-                "provider": "openai",
-                "model": "gpt-4-turbo",
-            }
-        }
-        
-        # If we have an assistant ID, we can use it but override the first message
-        payload = {
-            "phoneNumberId": vapi_phone_id,
-            "customer": {
-                "number": phone_number
-            },
-        }
-        
-        if vapi_assistant_id:
-             payload["assistantId"] = vapi_assistant_id
-             payload["assistantOverrides"] = {
-                 "firstMessageMode": "assistant-speaks-first",
-                 "firstMessage": safe_message,
-             }
-        else:
-            payload["assistant"] = assistant_config
-
-        print(f"📡 Sending Vapi Payload: {payload}")
-
-        import httpx
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://api.vapi.ai/call",
-                headers={
-                    "Authorization": f"Bearer {vapi_private_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=10.0
-            )
-            
-            if resp.status_code not in [200, 201]:
-                print(f"Vapi Error: {resp.text}")
-                raise HTTPException(status_code=resp.status_code, detail=f"Vapi call failed: {resp.text}")
-                
-            return {"status": "success", "call_id": resp.json().get("id")}
+
+        status_code, body, text = await vapi_service.place_call(request.phone, request.message)
+
+        if status_code not in [200, 201]:
+            print(f"Vapi Error: {text}")
+            raise HTTPException(status_code=status_code, detail=f"Vapi call failed: {text}")
+
+        return {"status": "success", "call_id": body.get("id")}
 
     except HTTPException as he:
         raise he
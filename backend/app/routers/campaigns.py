@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+from ..services import campaigns
+
+router = APIRouter()
+
+class RecipientSelector(BaseModel):
+    zone: Optional[str] = None
+    status: Optional[str] = None
+    category: Optional[str] = None
+
+class CampaignRequest(BaseModel):
+    message: str
+    type: str = "sms" # 'call' or 'sms'
+    recipients: Optional[List[str]] = None
+    selector: Optional[RecipientSelector] = None
+
+@router.post("", status_code=202)
+async def create_campaign(request: CampaignRequest):
+    """
+    Starts a broadcast to a recipient list or to the citizens matching a
+    complaint selector. Poll the status endpoint for progress.
+    """
+    try:
+        selector = request.selector.model_dump(exclude_none=True) if request.selector else None
+        campaign = campaigns.create_campaign(request.message, request.type, request.recipients, selector)
+        return campaign.summary()
+    except campaigns.CampaignError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("")
+def list_campaigns(limit: int = 50):
+    return {"campaigns": campaigns.list_campaigns(limit)}
+
+@router.get("/{campaign_id}")
+def get_campaign_status(campaign_id: str, offset: int = 0, limit: int = 100, status: Optional[str] = None):
+    result = campaigns.campaign_status(campaign_id, offset, limit, status)
+    if not result:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return result
+
+@router.post("/{campaign_id}/pause")
+def pause_campaign(campaign_id: str):
+    summary = campaigns.request_pause(campaign_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return summary
+
+@router.post("/{campaign_id}/resume")
+async def resume_campaign(campaign_id: str):
+    try:
+        summary = await campaigns.resume_campaign(campaign_id)
+    except campaigns.CampaignError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not summary:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return summary
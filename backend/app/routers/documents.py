@@ -1,71 +1,108 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from ..services import rag_service
-from ..database import supabase
+import hashlib
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Response
+from .. import data_access
+from ..services import document_catalog, embedding_snapshot, ingest_jobs, rag_service, response_cache
 
 router = APIRouter()
 
-@router.post("/upload-scheme")
+@router.post("/upload-scheme", status_code=202)
 async def upload_scheme_pdf(
+    response: Response,
     file: UploadFile = File(...),
-    description: str = Form("")
+    description: str = Form(""),
+    doc_id: Optional[str] = Form(None),
+    replace: bool = Form(False)
 ):
     """
-    Uploads a scheme PDF, vectorizes it, and stores it in the knowledge base.
+    Accepts a scheme PDF and queues it for background ingestion.
+    Returns a job id right away; poll /jobs/{job_id} for progress.
+    A file identical to an ingested document is not queued: the existing
+    document is returned with status "duplicate" (HTTP 200).
+    To upload a new revision of a document, pass its `doc_id`, or
+    `replace=true` to revise the latest document with the same filename;
+    otherwise the upload is always a new document.
     """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
     try:
         content = await file.read()
-        result = rag_service.ingest_document(
+        existing = await data_access.run(document_catalog.catalog.find_checksum, hashlib.sha256(content).hexdigest())
+        if existing:
+            response.status_code = 200
+            return {
+                "status": "duplicate",
+                "doc_id": existing["doc_id"],
+                "filename": existing.get("filename"),
+                "description": existing.get("description") or "",
+                "url": existing.get("public_url")
+            }
+
+        job = ingest_jobs.submit_job(
             file_bytes=content, 
             filename=file.filename,
             description=description,
-            metadata={"type": "scheme_doc"}
+            metadata={"type": "scheme_doc"},
+            doc_id=doc_id,
+            replace=replace
         )
         
-        if result.get("status") == "error":
-            raise HTTPException(status_code=500, detail=result.get("message"))
-            
-        return result
+        return {
+            "status": "queued",
+            "job_id": job["job_id"],
+            "filename": file.filename,
+            "description": description
+        }
         
+    except ingest_jobs.IngestQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         print(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache-stats")
+def get_cache_stats():
+    return {
+        **rag_service.cache_stats(),
+        "document_catalog": document_catalog.catalog.stats(),
+        "embedding_snapshot": embedding_snapshot.snapshot.stats(),
+    }
+
+@router.get("/jobs")
+def list_ingest_jobs(limit: int = 50):
+    return {"jobs": ingest_jobs.list_jobs(limit)}
+
+@router.get("/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    job = ingest_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @router.get("/schemes")
 def get_schemes():
+    """
+    Lists scheme documents from the document catalog (one entry per doc_id).
+    """
     try:
-        # Fetch metadata from document_chunks to reconstruct scheme list
-        # We need to filter by metadata->>type = 'scheme_doc'
-        # Since we can't easily do distinct on jsonb field via this client without rpc,
-        # We'll fetch a reasonable limit and deduplicate in python.
-        
-        response = supabase.table("document_chunks")\
-            .select("metadata")\
-            .order("created_at", desc=True)\
-            .limit(1000)\
-            .execute()
-            
-        data = response.data or []
-        
-        schemes = {}
-        for item in data:
-            meta = item.get("metadata", {})
-            if meta.get("type") == "scheme_doc":
-                doc_id = meta.get("doc_id") or meta.get("filename")
-                if doc_id not in schemes:
-                    schemes[doc_id] = {
-                        "id": doc_id,
-                        "name": meta.get("filename"),
-                        "description": meta.get("description", ""),
-                        "url": meta.get("public_url"),
-                        "created_at": meta.get("created_at"),
-                        "category": "General", # Default
-                        "status": "active"
-                    }
-        
-        return {"schemes": list(schemes.values())}
+        schemes = [
+            {
+                "id": entry["doc_id"],
+                "name": entry.get("filename"),
+                "description": entry.get("description") or "",
+                "url": entry.get("public_url"),
+                "created_at": entry.get("created_at"),
+                "category": "General", # Default
+                "status": entry.get("status") or "active",
+                "chunks": entry.get("chunk_count"),
+                "size_bytes": entry.get("size_bytes"),
+                "pages": entry.get("pages"),
+            }
+            for entry in document_catalog.catalog.list("scheme_doc")
+        ]
+        return {"schemes": schemes}
     except Exception as e:
         print(f"Error fetching schemes: {e}")
-        return {"schemes": []}
+        return response_cache.uncacheable({"schemes": []})
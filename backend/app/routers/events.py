@@ -0,0 +1,68 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..services import events, rollups
+
+router = APIRouter()
+
+
+def _sse(event_type: str, data: dict, event_id=None) -> str:
+    lines = [f"event: {event_type}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def stream_events(request: Request, zone: Optional[str] = None):
+    """
+    Server-sent events for live dashboards: complaint.created,
+    complaint.status_changed, complaint.updated, complaints.imported,
+    sla.warning and sla.breached, optionally limited to one zone.
+
+    The first event is a `snapshot` with the current dashboard stats, so
+    clients need no initial poll. A `lagged` event reports events dropped
+    because the client read too slowly; comment lines are sent as
+    heartbeats while idle.
+    """
+    db_zone = zone.replace('-', ' ') if zone and zone != 'all' else None
+    subscriber = events.bus.subscribe(db_zone)
+
+    async def generate():
+        try:
+            snapshot = {"zone": db_zone, "stats": rollups.engine.stats(db_zone) if rollups.engine.ready else None}
+            yield _sse("snapshot", snapshot)
+            while True:
+                if subscriber.overflowed:
+                    yield _sse("overflow", {"message": "Client too slow, reconnect to resume"})
+                    return
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if subscriber.dropped:
+                    yield _sse("lagged", {"dropped": subscriber.dropped})
+                    subscriber.dropped = 0
+                yield _sse(event["type"], event, event["id"])
+        finally:
+            events.bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def event_stats():
+    return {**events.bus.stats(), "sla_tracker_ready": events.sla_tracker.ready}
@@ -1,10 +1,6 @@
-import json
-from datetime import datetime, timedelta
 from fastapi import APIRouter, Request
-from ..database import supabase
-from ..services.tools import detect_zone_and_coords, calculate_sla
-from ..services.rag_service import search_knowledge_base
-from ..services.sms_service import send_complaint_sms
+from ..services import caller_profiles, voice_tools
+from ..config import settings
 
 # THIS LINE IS CRITICAL - DO NOT MISS IT
 router = APIRouter()
@@ -16,13 +12,12 @@ async def handle_incoming(request: Request):
         call_payload = payload.get("message", {}).get("call", {}) if "message" in payload else payload.get("call", {})
         phone = call_payload.get("customer", {}).get("number")
         
-        greeting = "Namaste! I am the MCD Sahayak. How can I help you today?"
-        
+        profile = None
         if phone:
-            data = supabase.table("complaints").select("citizen_name").eq("citizen_phone", phone).limit(1).execute()
-            if data.data and data.data[0].get('citizen_name'):
-                name = data.data[0]['citizen_name']
-                greeting = f"Namaste {name} ji! Welcome back to MCD. How can I assist you?"
+            # Served from the caller-profile cache; a cold lookup gets a strict
+            # latency budget before we fall back to the generic greeting
+            profile = await caller_profiles.get_profile(phone, settings.GREETING_LATENCY_BUDGET_MS / 1000)
+        greeting = caller_profiles.build_greeting(profile)
 
         return {
             "assistant": {
@@ -45,63 +40,9 @@ async def vapi_webhook(request: Request):
         message = payload.get("message", {})
         
         if message.get("type") == "tool-calls":
-            tool_calls = message.get("toolCallList", [])
-            results = []
-            
-            for tool in tool_calls:
-                fn = tool["function"]["name"]
-                args = tool["function"]["arguments"]
-                if isinstance(args, str):
-                    args = json.loads(args)
-                result_text = "Action failed."
-                
-                if fn == "createComplaint":
-                    cat = args.get("category", "General")
-                    desc = args.get("description", "Voice logged complaint")
-                    loc = args.get("location", "Delhi")
-                    phone = args.get("phone")
-                    name = args.get("name", "Citizen")
-
-                    zone, (lat, lng) = detect_zone_and_coords(loc)
-                    sla_hrs, deadline = calculate_sla(cat)
-                    ticket_id = f"MCD-{int(datetime.now().timestamp())}"[-8:]
-
-                    row = {
-                        "complaint_number": ticket_id,
-                        "category": cat,
-                        "description": desc,
-                        "location": loc,
-                        "latitude": lat,
-                        "longitude": lng,
-                        "zone": zone,
-                        "citizen_phone": phone,
-                        "citizen_name": name,
-                        "status": "Open",
-                        "sla_deadline": deadline,
-                        "priority": "medium",
-                        "source": "voice",
-                        "created_at": datetime.now().isoformat()
-                    }
-                    try:
-                        supabase.table("complaints").insert(row).execute()
-                        result_text = f"Complaint registered. Ticket {ticket_id}."
-                        print(f"✅ Logged: {ticket_id}")
-                        
-                        # Send SMS Notification
-                        send_complaint_sms(phone, ticket_id, cat)
-                        
-                    except Exception as e:
-                        print(f"❌ DB Error: {e}")
-                        result_text = "Error logging complaint to database."
-
-                elif fn == "consultManual":
-                    query = args.get("query")
-                    result_text = search_knowledge_base(query)
-
-                results.append({
-                    "toolCallId": tool["id"],
-                    "result": result_text
-                })
+            # Tool calls of one turn run concurrently within the turn's
+            # latency budget; see services/voice_tools.py for the registry
+            results = await voice_tools.dispatch(message.get("toolCallList", []))
             return {"results": results}
         return {"status": "ok"}
     except Exception as e:
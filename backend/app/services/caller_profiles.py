@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional
+
+from ..config import settings
+from .. import data_access
+from ..data_access import complaints as complaint_store
+from .cache import TTLCache
+
+# phone -> {name, last_complaint, open_tickets, loaded_at}
+# Phones with no complaints are cached too (name None), so repeat callers
+# without history do not hit the database on every call either.
+profiles = TTLCache(settings.CALLER_PROFILE_CACHE_SIZE, settings.CALLER_PROFILE_TTL, name="caller_profiles")
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+CLOSED_STATUSES = ("resolved", "closed", "rejected")
+
+
+def _is_open(status: Optional[str]) -> bool:
+    return (status or "").lower() not in CLOSED_STATUSES
+
+
+def _summarise(complaint: dict) -> dict:
+    return {
+        "complaint_number": complaint.get("complaint_number"),
+        "category": complaint.get("category"),
+        "status": complaint.get("status"),
+        "created_at": complaint.get("created_at"),
+    }
+
+
+def build_profile(rows: List[dict]) -> dict:
+    """
+    Builds a caller profile from that caller's complaints, newest first.
+    """
+    name = next((r.get("citizen_name") for r in rows if r.get("citizen_name")), None)
+    return {
+        "name": name,
+        "last_complaint": _summarise(rows[0]) if rows else None,
+        "open_tickets": sum(1 for r in rows if _is_open(r.get("status"))),
+        "loaded_at": time.time(),
+    }
+
+
+def load_profile(phone: str) -> dict:
+    rows = complaint_store.for_phone(
+        phone,
+        "citizen_name,complaint_number,category,status,created_at",
+        limit=settings.CALLER_PROFILE_HISTORY
+    )
+    profile = build_profile(rows)
+    profiles.set(phone, profile)
+    return profile
+
+
+def _refresh_in_background(phone: str):
+    with _refreshing_lock:
+        if phone in _refreshing:
+            return
+        _refreshing.add(phone)
+
+    def _refresh():
+        try:
+            load_profile(phone)
+        except Exception as e:
+            print(f"⚠️ Caller profile refresh failed for {phone}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(phone)
+
+    data_access.submit(_refresh)
+
+
+def cached_profile(phone: str) -> Optional[dict]:
+    """
+    Returns the cached profile without touching the database. Entries older
+    than the refresh interval are still served, and reloaded in the background.
+    """
+    profile = profiles.get(phone)
+    if profile and time.time() - profile["loaded_at"] > settings.CALLER_PROFILE_REFRESH:
+        _refresh_in_background(phone)
+    return profile
+
+
+async def get_profile(phone: str, budget_seconds: float) -> Optional[dict]:
+    """
+    Cached profile, or a database lookup bounded by `budget_seconds`.
+    A lookup that misses the budget keeps running and fills the cache for
+    the caller's next call; None is returned meanwhile.
+    """
+    profile = cached_profile(phone)
+    if profile:
+        return profile
+    lookup = asyncio.ensure_future(data_access.run(load_profile, phone))
+    try:
+        return await asyncio.wait_for(asyncio.shield(lookup), timeout=budget_seconds)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Caller profile lookup for {phone} exceeded {budget_seconds * 1000:.0f}ms, using generic greeting")
+        return None
+    except Exception as e:
+        print(f"Caller profile lookup failed: {e}")
+        return None
+
+
+def on_complaint_written(event: str, row: dict, changed: frozenset):
+    """
+    Keeps profiles current from the complaint write path.
+    """
+    phone = row.get("citizen_phone")
+    if not phone:
+        return
+
+    if event == "imported":
+        # Bulk imports: drop the entry rather than reloading per row; the
+        # caller's next call loads the full history once
+        profiles.delete(phone)
+        return
+
+    profile = profiles.get(phone)
+    if event == "created":
+        # On first sighting in this process, seed from the new row now and
+        # recount the caller's full history in the background
+        first_sighting = profile is None
+        if first_sighting:
+            profile = {"name": None, "last_complaint": None, "open_tickets": 0, "loaded_at": time.time()}
+        profile = {
+            **profile,
+            "name": row.get("citizen_name") or profile["name"],
+            "last_complaint": _summarise(row),
+            "open_tickets": profile["open_tickets"] + (1 if _is_open(row.get("status")) else 0),
+        }
+        profiles.set(phone, profile)
+        if first_sighting:
+            _refresh_in_background(phone)
+    elif profile is not None and "status" in changed:
+        # A status change may open or close a ticket; recount from the database
+        _refresh_in_background(phone)
+
+
+complaint_store.subscribe(on_complaint_written)
+
+
+def build_greeting(profile: Optional[dict]) -> str:
+    if not profile or not profile.get("name"):
+        return "Namaste! I am the MCD Sahayak. How can I help you today?"
+
+    name = profile["name"]
+    last = profile.get("last_complaint")
+    if profile.get("open_tickets") and last and _is_open(last.get("status")):
+        return (
+            f"Namaste {name} ji! Welcome back to MCD. "
+            f"Your {last.get('category', '')} complaint {last.get('complaint_number')} is {last.get('status')}. "
+            f"How can I assist you?"
+        )
+    return f"Namaste {name} ji! Welcome back to MCD. How can I assist you?"
@@ -0,0 +1,484 @@
+import asyncio
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from .. import data_access
+from ..data_access import campaign_records
+from ..data_access import complaints as complaint_store
+from .rate_limit import RateLimiter
+from .sms_service import normalize_phone, send_broadcast_sms
+from . import vapi_service
+
+# Provider limits are shared by every running campaign in the process
+_limiters = {
+    "sms": RateLimiter(settings.CAMPAIGN_SMS_RATE, burst=max(int(settings.CAMPAIGN_SMS_RATE), 1)),
+    "call": RateLimiter(settings.CAMPAIGN_CALL_RATE, burst=max(int(settings.CAMPAIGN_CALL_RATE), 1)),
+}
+
+# Campaigns are stored in the campaigns / campaign_results tables, so any
+# worker can report on them and resume them after a restart. A process only
+# keeps the campaigns it is running (plus, if saving failed, up to
+# CAMPAIGN_HISTORY finished ones); everything else is read from the tables.
+_campaigns: Dict[str, "Campaign"] = {}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+ACTIVE_STATUSES = ("pending", "resolving", "running", "pausing")
+
+
+class CampaignError(Exception):
+    pass
+
+
+class Campaign:
+    """
+    One broadcast to many recipients. `cursor` is the index of the first
+    recipient without a result, so a paused campaign resumes from there and
+    never contacts anyone twice.
+    """
+
+    def __init__(self, message: str, mode: str, recipients: List[str] = None, selector: dict = None):
+        self.id = str(uuid.uuid4())
+        self.message = message
+        self.mode = mode
+        self.selector = selector
+        self.recipients: List[str] = recipients or []
+        self.results: List[Optional[dict]] = [None] * len(self.recipients)
+        self.cursor = 0
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.counts = {"sent": 0, "failed": 0}
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._next_index = 0
+        self._pause_requested = False
+        self._task: Optional[asyncio.Task] = None
+        # Result indices not yet written to campaign_results
+        self._unsaved: List[int] = []
+        self._saved_ok = True
+        self._recipients_saved = False
+        self._save_lock = threading.Lock()
+
+    def summary(self) -> dict:
+        return self.row()
+
+    def row(self) -> dict:
+        """
+        The campaigns table row, without the recipient list.
+        """
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "message": self.message,
+            "selector": self.selector,
+            "status": self.status,
+            "error": self.error,
+            "total": len(self.recipients),
+            "cursor": self.cursor,
+            "sent": self.counts["sent"],
+            "failed": self.counts["failed"],
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_records(cls, row: dict, results: List[dict]) -> "Campaign":
+        """
+        Rebuilds a campaign from its table row (with recipients) and saved
+        results.
+        """
+        campaign = cls(row["message"], row["mode"], row.get("recipients") or [], row.get("selector"))
+        campaign.id = row["id"]
+        campaign.status = row["status"]
+        campaign.error = row.get("error")
+        campaign.created_at = row.get("created_at")
+        campaign.started_at = row.get("started_at")
+        campaign.finished_at = row.get("finished_at")
+        for result in results:
+            i = result["idx"]
+            if i < len(campaign.results) and campaign.results[i] is None:
+                campaign.results[i] = _result_fields(result)
+                campaign.counts[result["status"]] += 1
+        while campaign.cursor < len(campaign.results) and campaign.results[campaign.cursor] is not None:
+            campaign.cursor += 1
+        return campaign
+
+    def result_page(self, offset: int = 0, limit: int = 100, status: Optional[str] = None) -> List[dict]:
+        indices = range(len(self.results))
+        if status:
+            indices = [i for i in indices if (self.results[i] or {"status": "pending"})["status"] == status]
+        return [
+            {"index": i, "phone": self.recipients[i], **(self.results[i] or {"status": "pending"})}
+            for i in indices[offset:offset + limit]
+        ]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _result_fields(row: dict) -> dict:
+    result = {"status": row["status"], "at": row.get("at")}
+    if row.get("detail") is not None:
+        result["detail"] = row["detail"]
+    if row.get("call_id") is not None:
+        result["call_id"] = row["call_id"]
+    return result
+
+
+def _stale(row: dict) -> bool:
+    # An active campaign whose owner stopped saving (the worker died)
+    if row.get("status") not in ACTIVE_STATUSES:
+        return False
+    try:
+        heartbeat = datetime.fromisoformat(row["heartbeat_at"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    if heartbeat.tzinfo is None:
+        heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - heartbeat).total_seconds() > settings.CAMPAIGN_STALE_SECONDS
+
+
+def _summary_from_row(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "mode": row.get("mode"),
+        "message": row.get("message"),
+        "selector": row.get("selector"),
+        "status": "interrupted" if _stale(row) else row.get("status"),
+        "error": row.get("error"),
+        "total": row.get("total") or 0,
+        "cursor": row.get("cursor") or 0,
+        "sent": row.get("sent") or 0,
+        "failed": row.get("failed") or 0,
+        "created_at": row.get("created_at"),
+        "started_at": row.get("started_at"),
+        "finished_at": row.get("finished_at"),
+    }
+
+
+def _save(campaign: Campaign, recipients: bool = False) -> Optional[dict]:
+    """
+    Writes new results, then the campaign row (results first, so the saved
+    cursor never runs ahead of them). Returns the saved row, or None if
+    the write failed.
+    """
+    with campaign._save_lock:
+        return _save_locked(campaign, recipients)
+
+
+def _save_locked(campaign: Campaign, recipients: bool) -> Optional[dict]:
+    try:
+        unsaved, campaign._unsaved = campaign._unsaved, []
+        try:
+            if unsaved:
+                campaign_records.save_results([
+                    {
+                        "campaign_id": campaign.id,
+                        "idx": i,
+                        "phone": campaign.recipients[i],
+                        "status": campaign.results[i]["status"],
+                        "detail": campaign.results[i].get("detail"),
+                        "call_id": campaign.results[i].get("call_id"),
+                        "at": campaign.results[i].get("at"),
+                    }
+                    for i in unsaved
+                ])
+        except Exception:
+            campaign._unsaved = unsaved + campaign._unsaved
+            raise
+        row = {**campaign.row(), "owner": WORKER_ID, "heartbeat_at": _now()}
+        if recipients or not campaign._recipients_saved:
+            # Also retries the first write if it failed: until it lands
+            # there is no row for update() to match
+            saved = campaign_records.upsert({**row, "recipients": campaign.recipients, "pause_requested": False})
+            campaign._recipients_saved = True
+        else:
+            saved = campaign_records.update(campaign.id, row)
+            if not saved:
+                campaign._recipients_saved = False
+                raise RuntimeError("campaign row not found")
+        campaign._saved_ok = True
+        return saved[0] if saved else row
+    except Exception as e:
+        print(f"⚠️ Could not save campaign {campaign.id}: {e}")
+        campaign._saved_ok = False
+        return None
+
+
+async def _saver(campaign: Campaign):
+    # Saves progress every CAMPAIGN_SAVE_SECONDS while the campaign runs and
+    # picks up pause requests made through other workers
+    while True:
+        await asyncio.sleep(settings.CAMPAIGN_SAVE_SECONDS)
+        saved = await data_access.run(_save, campaign)
+        if saved and saved.get("pause_requested") and not campaign._pause_requested:
+            pause_campaign(campaign)
+
+
+def _forget(campaign: Campaign):
+    # Keep finished campaigns only if the final save failed, and then at
+    # most CAMPAIGN_HISTORY of them
+    if campaign._saved_ok:
+        _campaigns.pop(campaign.id, None)
+        return
+    finished = [c for c in _campaigns.values() if c._task is None or c._task.done()]
+    for old in finished[:max(len(finished) - settings.CAMPAIGN_HISTORY, 0)]:
+        _campaigns.pop(old.id, None)
+
+
+def _dedupe_phones(phones) -> List[str]:
+    seen = set()
+    unique = []
+    for phone in phones:
+        if not phone or phone == "N/A":
+            continue
+        phone = normalize_phone(str(phone).strip())
+        if phone not in seen:
+            seen.add(phone)
+            unique.append(phone)
+    return unique
+
+
+def _resolve_selector(selector: dict) -> List[str]:
+    """
+    Collects distinct citizen phones for complaints matching the selector.
+    """
+    phones = []
+    for page in complaint_store.iter_pages(
+        "id,citizen_phone",
+        zone=selector.get("zone"),
+        status=selector.get("status"),
+        category=selector.get("category"),
+    ):
+        phones.extend(row.get("citizen_phone") for row in page)
+        if len(phones) > settings.CAMPAIGN_MAX_RECIPIENTS * 2:
+            break
+    return _dedupe_phones(phones)[:settings.CAMPAIGN_MAX_RECIPIENTS]
+
+
+async def _send_one(mode: str, phone: str, message: str) -> dict:
+    await _limiters[mode].acquire_async()
+    try:
+        if mode == "sms":
+            success, detail = await run_in_threadpool(send_broadcast_sms, phone, message)
+            return {"status": "sent" if success else "failed", "detail": detail}
+
+        status_code, body, text = await vapi_service.place_call(phone, message)
+        if status_code in [200, 201]:
+            return {"status": "sent", "call_id": body.get("id")}
+        return {"status": "failed", "detail": f"Vapi call failed ({status_code}): {text}"}
+    except Exception as e:
+        return {"status": "failed", "detail": str(e)}
+
+
+async def _worker(campaign: Campaign):
+    while not campaign._pause_requested:
+        i = campaign._next_index
+        if i >= len(campaign.recipients):
+            return
+        campaign._next_index += 1
+        if campaign.results[i] is not None:
+            continue
+
+        result = await _send_one(campaign.mode, campaign.recipients[i], campaign.message)
+        result["at"] = _now()
+        campaign.results[i] = result
+        campaign.counts[result["status"]] += 1
+        campaign._unsaved.append(i)
+
+        while campaign.cursor < len(campaign.results) and campaign.results[campaign.cursor] is not None:
+            campaign.cursor += 1
+
+
+async def _run(campaign: Campaign):
+    saver = None
+    try:
+        if campaign.selector and not campaign.recipients:
+            campaign.status = "resolving"
+            recipients = await data_access.run(_resolve_selector, campaign.selector)
+            campaign.recipients = recipients
+            campaign.results = [None] * len(recipients)
+        if not campaign._recipients_saved:
+            await data_access.run(_save, campaign, True)
+
+        campaign.status = "running"
+        campaign.started_at = campaign.started_at or _now()
+        campaign._next_index = campaign.cursor
+        saver = asyncio.create_task(_saver(campaign))
+
+        # Bounded fan-out: a fixed number of workers share the recipient list
+        await asyncio.gather(*(_worker(campaign) for _ in range(settings.CAMPAIGN_CONCURRENCY)))
+
+        if campaign._pause_requested and campaign.cursor < len(campaign.recipients):
+            campaign.status = "paused"
+        else:
+            campaign.status = "completed"
+            campaign.finished_at = _now()
+        print(f"📣 Campaign {campaign.id} {campaign.status}: {campaign.counts}")
+    except Exception as e:
+        print(f"❌ Campaign {campaign.id} failed: {e}")
+        campaign.status = "failed"
+        campaign.error = str(e)
+    finally:
+        if saver:
+            saver.cancel()
+        await data_access.run(_save, campaign)
+        _forget(campaign)
+
+
+def _start(campaign: Campaign):
+    campaign._pause_requested = False
+    _campaigns[campaign.id] = campaign
+    campaign._task = asyncio.create_task(_run(campaign))
+
+
+def create_campaign(message: str, mode: str, recipients: List[str] = None, selector: dict = None) -> Campaign:
+    """
+    Creates a campaign and starts its fan-out on the running event loop.
+    """
+    if mode not in _limiters:
+        raise CampaignError("type must be 'sms' or 'call'")
+    if mode == "call" and not vapi_service.vapi_configured():
+        raise CampaignError("Vapi configuration missing (KEY or PHONE_ID)")
+
+    recipients = _dedupe_phones(recipients or [])
+    if not recipients and not selector:
+        raise CampaignError("Provide recipients or a selector")
+    if len(recipients) > settings.CAMPAIGN_MAX_RECIPIENTS:
+        raise CampaignError(f"Too many recipients (max {settings.CAMPAIGN_MAX_RECIPIENTS})")
+
+    campaign = Campaign(message, mode, recipients, selector)
+    _start(campaign)
+    return campaign
+
+
+def get_campaign(campaign_id: str) -> Optional[Campaign]:
+    """
+    The campaign, if this process is running it (or kept it).
+    """
+    return _campaigns.get(campaign_id)
+
+
+def campaign_status(campaign_id: str, offset: int = 0, limit: int = 100, status: Optional[str] = None) -> Optional[dict]:
+    """
+    Summary and one page of results for a campaign run by any worker.
+    """
+    campaign = _campaigns.get(campaign_id)
+    if campaign:
+        return {**campaign.summary(), "results": campaign.result_page(offset, limit, status)}
+
+    row = campaign_records.get(campaign_id, campaign_records.SUMMARY_COLUMNS)
+    if not row:
+        return None
+    if status == "pending":
+        # Pending recipients have no result rows; rebuild the campaign
+        campaign = Campaign.from_records(campaign_records.get(campaign_id), campaign_records.all_results(campaign_id))
+        results = campaign.result_page(offset, limit, status)
+    elif status:
+        results = [
+            {"index": r["idx"], "phone": r.get("phone"), **_result_fields(r)}
+            for r in campaign_records.results(campaign_id, offset, limit, status)
+        ]
+    else:
+        # Every index in the page, with the recipients still to be contacted
+        end = min(offset + limit, row.get("total") or 0)
+        saved = {r["idx"]: r for r in campaign_records.results(campaign_id, 0, limit, start=offset, end=end)}
+        recipients = []
+        if len(saved) < end - offset:
+            recipients = (campaign_records.get(campaign_id, "recipients") or {}).get("recipients") or []
+        results = [
+            {"index": i, "phone": saved[i].get("phone"), **_result_fields(saved[i])} if i in saved
+            else {"index": i, "phone": recipients[i] if i < len(recipients) else None, "status": "pending"}
+            for i in range(offset, end)
+        ]
+    return {**_summary_from_row(row), "results": results}
+
+
+def list_campaigns(limit: int = 50) -> List[dict]:
+    """
+    Latest campaigns of all workers, newest first.
+    """
+    local = {c.id: c.summary() for c in _campaigns.values()}
+    try:
+        rows = {row["id"]: _summary_from_row(row) for row in campaign_records.recent(limit)}
+    except Exception as e:
+        print(f"⚠️ Could not list campaigns: {e}")
+        rows = {}
+    merged = {**rows, **local}
+    return sorted(merged.values(), key=lambda c: str(c.get("created_at") or ""), reverse=True)[:limit]
+
+
+def pause_campaign(campaign: Campaign):
+    """
+    Stops handing out new recipients; sends already in flight still finish.
+    """
+    campaign._pause_requested = True
+    if campaign.status in ("pending", "resolving", "running"):
+        campaign.status = "pausing"
+
+
+def request_pause(campaign_id: str) -> Optional[dict]:
+    """
+    Pauses a campaign run by any worker: directly if it runs here,
+    otherwise by flagging its row for the owner's next save. A campaign
+    whose owner stopped is marked paused outright.
+    """
+    campaign = _campaigns.get(campaign_id)
+    if campaign:
+        pause_campaign(campaign)
+        return campaign.summary()
+    row = campaign_records.get(campaign_id, campaign_records.SUMMARY_COLUMNS)
+    if not row:
+        return None
+    if _stale(row):
+        campaign_records.update(campaign_id, {"status": "paused"}, expected={"heartbeat_at": row.get("heartbeat_at")})
+        row["status"] = "paused"
+    elif row.get("status") in ACTIVE_STATUSES:
+        campaign_records.update(campaign_id, {"pause_requested": True})
+        row["status"] = "pausing"
+    return _summary_from_row(row)
+
+
+async def resume_campaign(campaign_id: str) -> Optional[dict]:
+    """
+    Resumes a paused, failed or interrupted campaign on this worker from
+    its saved cursor. Results not saved before a worker stopped (at most
+    CAMPAIGN_SAVE_SECONDS of sends) are sent again.
+    """
+    campaign = _campaigns.get(campaign_id)
+    if campaign:
+        # Kept here because saving it failed; the local copy is the newest
+        if campaign.status not in ("paused", "failed"):
+            raise CampaignError(f"Campaign is {campaign.status}, not paused")
+    else:
+        row = await data_access.run(campaign_records.get, campaign_id)
+        if not row:
+            return None
+        if not (row.get("status") in ("paused", "failed") or _stale(row)):
+            raise CampaignError(f"Campaign is {_summary_from_row(row)['status']}, not paused")
+        # Claim it, so two workers can't both resume it
+        claimed = await data_access.run(
+            campaign_records.update,
+            campaign_id,
+            {"status": "running", "owner": WORKER_ID, "heartbeat_at": _now(), "pause_requested": False},
+            expected={"status": row["status"], "heartbeat_at": row.get("heartbeat_at")},
+        )
+        if not claimed:
+            raise CampaignError("Campaign was resumed by another worker")
+        results = await data_access.run(campaign_records.all_results, campaign_id)
+        campaign = Campaign.from_records(row, results)
+        campaign._recipients_saved = True
+
+    campaign.status = "running"
+    campaign.error = None
+    _start(campaign)
+    return campaign.summary()
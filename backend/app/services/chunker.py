@@ -0,0 +1,324 @@
+import multiprocessing
+import queue
+import re
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ..config import settings
+
+# Rough word-piece count: words and punctuation marks. all-MiniLM-L6-v2
+# truncates at 256 word pieces, so CHUNK_MAX_TOKENS stays well under that.
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+# A sentence ends at . ! ? or the Devanagari danda, before a capital, digit or
+# Devanagari letter
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+(?=[\"'(\[]?[A-Z0-9ऀ-ॿ])")
+# Abbreviations that end in a full stop without ending the sentence
+# ("Rs. 2.5 lakh", "No. 14", "Smt. Devi")
+_ABBREVIATION = re.compile(r"(?<![\w.])(?:Rs|No|Nos|Sr|Dr|Smt|Shri|Govt|Mr|Mrs|Ms)\.$")
+# "1.", "2.3", "IV.", "(a)", "A)" section numbering
+_NUMBERED = re.compile(r"^(\(?\d+(\.\d+)*[.)]?|\(?[IVXLC]+[.)]|\(?[A-Za-z][.)])\s+\S")
+# Column gaps mark table rows, which are never headings
+# (two spaces after a full stop are not)
+_COLUMN_GAP = re.compile(r"[^\s.!?;:,]\s{2,}\S")
+_COLUMN_GAP_SPLIT = re.compile(r"\s{2,}")
+
+
+class Chunk(NamedTuple):
+    text: str
+    page: int
+    heading: Optional[str]
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def iter_pages(reader) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_no, text) for each page of a PdfReader, one page at a time.
+    Pages without extractable text (scans, figures) yield "".
+    """
+    for page_no, page in enumerate(reader.pages, start=1):
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            print(f"⚠️ Could not extract text from page {page_no}: {e}")
+            text = ""
+        # Drop the objects this page resolved (content streams, fonts); they
+        # are re-read on demand, so memory stays at about a page
+        reader.resolved_objects.clear()
+        yield page_no, text
+
+
+def is_heading(line: str) -> bool:
+    """
+    Short lines without closing punctuation that are numbered, upper case,
+    title case or end in a colon.
+    """
+    words = line.split()
+    if not words or len(words) > 12 or len(line) > 100 or line[-1] in ".,;?!" or _COLUMN_GAP.search(line):
+        return False
+    if line.endswith(":") or _NUMBERED.match(line):
+        return True
+    alpha = [w for w in words if w[0].isalpha()]
+    if not alpha:
+        return False
+    if len(words) == 1:
+        # "Benefits", "ELIGIBILITY"
+        return words[0].isalpha() and (words[0].istitle() or words[0].isupper())
+    if all(not c.islower() for w in alpha for c in w):
+        return True
+    capitalised = sum(1 for w in alpha if w[0].isupper())
+    return len(alpha) > 1 and capitalised / len(alpha) >= 0.7
+
+
+def _paragraph(lines: List[str]) -> str:
+    # Wrapped prose lines are joined with spaces; table rows keep their line
+    # breaks, with column gaps shown as " | "
+    out = ""
+    previous_row = False
+    for line in lines:
+        row = bool(_COLUMN_GAP.search(line))
+        if row:
+            line = _COLUMN_GAP_SPLIT.sub(" | ", line)
+        if out:
+            out += "\n" if row or previous_row else " "
+        out += line
+        previous_row = row
+    return out
+
+
+def _blocks(text: str) -> Iterator[Tuple[str, str]]:
+    # ("heading", line) and ("para", text) blocks
+    lines: List[str] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            if lines:
+                yield "para", _paragraph(lines)
+                lines = []
+        elif is_heading(line):
+            if lines:
+                yield "para", _paragraph(lines)
+                lines = []
+            yield "heading", line
+        elif lines and lines[-1].endswith("-") and line[0].islower():
+            # Re-join a word hyphenated across a line break
+            lines[-1] = lines[-1][:-1] + line
+        else:
+            lines.append(line)
+    if lines:
+        yield "para", _paragraph(lines)
+
+
+def _pack(parts: Iterable[str], max_tokens: int, sep: str) -> Iterator[str]:
+    packed: List[str] = []
+    size = 0
+    for part in parts:
+        n = count_tokens(part)
+        if packed and size + n > max_tokens:
+            yield sep.join(packed)
+            packed, size = [], 0
+        packed.append(part)
+        size += n
+    if packed:
+        yield sep.join(packed)
+
+
+def _split_oversize(sentence: str, max_tokens: int) -> Iterator[str]:
+    # Pack whole table rows first, then fall back to words
+    for piece in _pack(sentence.split("\n"), max_tokens, "\n"):
+        if count_tokens(piece) > max_tokens:
+            yield from _pack(piece.split(" "), max_tokens, " ")
+        else:
+            yield piece
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    """
+    Splits at sentence ends, except after abbreviations such as "Rs.".
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        if _ABBREVIATION.search(paragraph[max(start, match.start() - 8):match.start()]):
+            continue
+        sentences.append(paragraph[start:match.start()])
+        start = match.end()
+    sentences.append(paragraph[start:])
+    return sentences
+
+
+def _sentences(paragraph: str, max_tokens: int) -> Iterator[str]:
+    for sentence in split_sentences(paragraph):
+        if count_tokens(sentence) > max_tokens:
+            yield from _split_oversize(sentence, max_tokens)
+        elif sentence:
+            yield sentence
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    max_tokens: int = None,
+    overlap_tokens: int = None,
+) -> Iterator[Chunk]:
+    """
+    Turns (page_no, text) pairs into chunks of whole sentences of at most
+    `max_tokens` tokens. A heading starts a new chunk and prefixes every
+    chunk under it; consecutive chunks share trailing sentences worth up to
+    `overlap_tokens`. Chunks never span pages, so editing one page leaves
+    the other pages' chunks (and their content hashes) unchanged.
+    Only the current page is held in memory.
+    """
+    max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+    overlap_tokens = overlap_tokens if overlap_tokens is not None else settings.CHUNK_OVERLAP_TOKENS
+    heading: Optional[str] = None
+    heading_pending = False
+    page_no = 0
+
+    for page_no, text in pages:
+        sentences: List[Tuple[str, int]] = []
+        size = 0
+        fresh = 0
+
+        def emit() -> Chunk:
+            body = " ".join(s for s, _ in sentences)
+            return Chunk(f"{heading}\n{body}" if heading else body, page_no, heading)
+
+        for kind, block in _blocks(text):
+            if kind == "heading":
+                if fresh:
+                    yield emit()
+                sentences, size, fresh = [], 0, 0
+                # Headings with no text between them ("PART II", "Licences")
+                # merge, up to a quarter of the chunk; a longer run (a
+                # contents page) is emitted as chunks of headings
+                merged = f"{heading} - {block}" if heading_pending else block
+                if heading_pending and count_tokens(merged) > max_tokens // 4:
+                    yield Chunk(heading, page_no, heading)
+                    merged = block
+                heading = merged
+                heading_pending = True
+                continue
+
+            budget = max(max_tokens - (count_tokens(heading) if heading else 0), max_tokens // 2)
+            for sentence in _sentences(block, budget):
+                n = count_tokens(sentence)
+                if fresh and size + n > budget:
+                    yield emit()
+                    # Carry trailing sentences into the next chunk as overlap
+                    tail, tail_size = [], 0
+                    for s, k in reversed(sentences[1:]):
+                        if tail_size + k > overlap_tokens:
+                            break
+                        tail.insert(0, (s, k))
+                        tail_size += k
+                    sentences, size, fresh = tail, tail_size, 0
+                sentences.append((sentence, n))
+                size += n
+                fresh += 1
+                heading_pending = False
+
+        if fresh:
+            yield emit()
+
+    if heading_pending and heading:
+        # A trailing heading with no text after it (e.g. a title page)
+        yield Chunk(heading, page_no, heading)
+
+
+def _parse_worker(pdf_path: str, max_tokens: int, overlap_tokens: int, batch_size: int, out):
+    # Runs in the parse process: streams ("pages", total), ("chunks",
+    # pages_parsed, [Chunk]) batches and finally ("done", timings) or
+    # ("error", message) through `out`
+    try:
+        from pypdf import PdfReader
+
+        timings = {"parse": 0.0, "chunk": 0.0}
+        reader = PdfReader(pdf_path)
+        out.put(("pages", len(reader.pages)))
+        parsed = 0
+
+        def pages():
+            nonlocal parsed
+            source = iter_pages(reader)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    page = next(source)
+                except StopIteration:
+                    timings["parse"] += time.perf_counter() - t0
+                    return
+                timings["parse"] += time.perf_counter() - t0
+                parsed = page[0]
+                yield page
+
+        batch: List[Chunk] = []
+        t0 = time.perf_counter()
+        for chunk in iter_chunks(pages(), max_tokens, overlap_tokens):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                out.put(("chunks", parsed, batch))
+                batch = []
+        out.put(("chunks", parsed, batch))
+        timings["chunk"] = time.perf_counter() - t0 - timings["parse"]
+        out.put(("done", timings))
+    except Exception as e:
+        out.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def iter_pdf_chunks_in_process(
+    pdf_path: str,
+    on_pages: Callable[[int], None] = None,
+    on_parsed: Callable[[int], None] = None,
+    timings: dict = None,
+    batch_size: int = 64,
+) -> Iterator[Chunk]:
+    """
+    iter_chunks() over the pages of the PDF at `pdf_path`, parsed in a
+    separate process. pypdf is pure Python, so parsing in a thread would
+    hold the GIL against the event loop; the child holds its own. Chunks
+    arrive in batches through a bounded queue, so neither side holds more
+    than a few batches. `on_pages(total)` and `on_parsed(pages_parsed)`
+    report progress; parse and chunk seconds are added to `timings`.
+    Raises RuntimeError if parsing fails; the child is stopped if the
+    caller stops early.
+    """
+    on_pages = on_pages or (lambda total: None)
+    on_parsed = on_parsed or (lambda parsed: None)
+    # spawn, not fork: the server process has DB, embedding and SMS threads
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue(maxsize=8)
+    worker = ctx.Process(
+        target=_parse_worker,
+        args=(pdf_path, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS, batch_size, out),
+        name="pdf-parse",
+        daemon=True,
+    )
+    worker.start()
+    try:
+        while True:
+            try:
+                message = out.get(timeout=1)
+            except queue.Empty:
+                if not worker.is_alive():
+                    raise RuntimeError(f"PDF parse process exited with code {worker.exitcode}")
+                continue
+            kind = message[0]
+            if kind == "pages":
+                on_pages(message[1])
+            elif kind == "chunks":
+                on_parsed(message[1])
+                yield from message[2]
+            elif kind == "done":
+                if timings is not None:
+                    for stage, seconds in message[1].items():
+                        timings[stage] = timings.get(stage, 0.0) + seconds
+                return
+            else:
+                raise RuntimeError(f"PDF parsing failed: {message[1]}")
+    finally:
+        if worker.is_alive():
+            worker.terminate()
+        worker.join(timeout=5)
+        out.close()
@@ -0,0 +1,430 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from .. import data_access
+from ..config import settings
+from ..data_access import complaints as complaint_store, import_job_records
+from . import events, response_cache
+from .gazetteer import gazetteer
+from .tools import calculate_sla, calculate_slas, detect_zones, match_place, ward_zone
+from .wards import wards
+
+REQUIRED_FIELDS = ("category", "description", "location")
+PRIORITIES = ("low", "medium", "high", "critical")
+# Accepted status spellings (lower case, '-' and '_' as spaces) and how they are stored
+STATUSES = {"open": "Open", "in progress": "In Progress", "resolved": "Resolved", "closed": "Closed", "rejected": "Rejected"}
+# Optional columns copied through from the upload when present
+PASSTHROUGH_FIELDS = ("citizen_phone", "citizen_name", "assigned_to", "notes", "resolved_at")
+
+# One import at a time: imports are bulk writes, and running them
+# back-to-back keeps the database load predictable
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+
+# Jobs started by this process; every state change is also written to the
+# import_jobs table so that other workers can answer for them
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def detect_format(filename: str, declared: Optional[str] = None) -> str:
+    fmt = (declared or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt in ("jsonl", "json"):
+        fmt = "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        raise ImportFormatError("Upload a .csv or .ndjson file (or pass format=csv|ndjson)")
+    return fmt
+
+
+def iter_records(f: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Streams (line, record, error) from an upload without loading it whole.
+    """
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, {k.strip(): v for k, v in record.items() if k}, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _words(value) -> str:
+    return " ".join(str(value).replace("-", " ").replace("_", " ").split())
+
+
+def normalize_zone(value) -> Optional[str]:
+    """
+    The canonical zone name for an uploaded zone ("south", "Shahdara-North"),
+    or None if it is not a known zone.
+    """
+    zone = _words(value).upper()
+    return zone if zone in gazetteer.zones else None
+
+
+def normalize_status(value) -> Optional[str]:
+    return STATUSES.get(_words(value).lower())
+
+
+def _parse_time(value) -> datetime:
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _given(record: dict, field: str) -> bool:
+    return record.get(field) not in (None, "")
+
+
+def _validate(record: dict) -> Optional[str]:
+    missing = [f for f in REQUIRED_FIELDS if not str(record.get(f) or "").strip()]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    priority = str(record.get("priority") or "medium").lower()
+    if priority not in PRIORITIES:
+        return f"Unknown priority '{record.get('priority')}'"
+    if _given(record, "zone") and not normalize_zone(record["zone"]):
+        return f"Unknown zone '{record['zone']}'"
+    if _given(record, "status") and not normalize_status(record["status"]):
+        return f"Unknown status '{record['status']}' (expected one of {', '.join(STATUSES.values())})"
+    for field in ("created_at", "resolved_at"):
+        if _given(record, field):
+            try:
+                _parse_time(record[field])
+            except ValueError:
+                return f"Invalid {field} '{record[field]}' (expected an ISO 8601 date/time)"
+    for field in ("latitude", "longitude"):
+        if record.get(field) not in (None, ""):
+            try:
+                float(record[field])
+            except (TypeError, ValueError):
+                return f"Invalid {field} '{record[field]}'"
+    return None
+
+
+def enrich_batch(records: List[dict], ticket_prefix: str, first_seq: int, source: str) -> List[dict]:
+    """
+    Builds complaint rows for a batch: zones and SLAs are computed once per
+    distinct location/category, wards for the whole batch in one vectorised
+    pass, tickets numbered sequentially from `first_seq`. Coordinates in the
+    upload win over the gazetteer's. Rows with a `created_at` (historical
+    complaints) get their SLA deadline from it rather than from now.
+    Records must have passed _validate().
+    """
+    now = datetime.now()
+    zones = detect_zones([str(r["location"]) for r in records])
+    slas = calculate_slas([str(r["category"]) for r in records], now)
+    lats = [float(r["latitude"]) if r.get("latitude") not in (None, "") else lat for r, (_, (lat, _)) in zip(records, zones)]
+    lngs = [float(r["longitude"]) if r.get("longitude") not in (None, "") else lng for r, (_, (_, lng)) in zip(records, zones)]
+    found = wards.locate_many(lats, lngs).tolist()
+    # No ward for rows placed only at a zone or the default location
+    located = [
+        (_given(r, "latitude") and _given(r, "longitude")) or match_place(str(r["location"])) is not None
+        for r in records
+    ]
+
+    rows = []
+    for i, (record, (zone, _), (_, deadline)) in enumerate(zip(records, zones, slas)):
+        ward = wards.wards[found[i]] if found[i] >= 0 and located[i] else None
+        created_at = now.isoformat()
+        if _given(record, "created_at"):
+            created_at = str(record["created_at"]).strip()
+            _, deadline = calculate_sla(str(record["category"]), _parse_time(created_at))
+        row = {
+            "complaint_number": record.get("complaint_number") or f"{ticket_prefix}-{first_seq + i:06d}",
+            "category": record["category"],
+            "description": record["description"],
+            "location": record["location"],
+            "latitude": lats[i],
+            "longitude": lngs[i],
+            "zone": normalize_zone(record["zone"]) if _given(record, "zone") else ward_zone(ward, zone),
+            "ward": ward.name if ward else None,
+            "status": normalize_status(record["status"]) if _given(record, "status") else "Open",
+            "sla_deadline": deadline,
+            "priority": str(record.get("priority") or "medium").lower(),
+            "source": record.get("source") or source,
+            "created_at": created_at,
+        }
+        for field in PASSTHROUGH_FIELDS:
+            if record.get(field) not in (None, ""):
+                row[field] = record[field]
+        rows.append(row)
+    return rows
+
+
+def _claim_numbers(records: List[dict], lines: List[int], seen: set) -> Tuple[List[dict], List[int], List[dict]]:
+    """
+    Drops records whose supplied complaint_number is already taken, by a
+    stored complaint or an earlier row of the same import (`seen`, updated
+    here). Returns the kept records and lines, and an error per dropped row.
+    """
+    supplied = {str(r["complaint_number"]).strip() for r in records if _given(r, "complaint_number")}
+    taken = complaint_store.existing_numbers(sorted(supplied - seen)) | (supplied & seen)
+    kept, kept_lines, errors = [], [], []
+    for record, line in zip(records, lines):
+        if _given(record, "complaint_number"):
+            number = record["complaint_number"] = str(record["complaint_number"]).strip()
+            if number in taken:
+                errors.append({"line": line, "error": f"complaint_number '{number}' already exists"})
+                continue
+            taken.add(number)
+            seen.add(number)
+        kept.append(record)
+        kept_lines.append(line)
+    return kept, kept_lines, errors
+
+
+def _insert_batch(rows: List[dict], lines: List[int]) -> Tuple[int, List[dict]]:
+    """
+    One multi-row insert; if the database rejects the batch, rows are
+    retried one by one so a single bad row only fails itself.
+    """
+    try:
+        return len(complaint_store.insert_many(rows)), []
+    except Exception as e:
+        print(f"⚠️ Import batch of {len(rows)} failed ({e}), retrying row by row")
+
+    inserted, errors = 0, []
+    for row, line in zip(rows, lines):
+        try:
+            complaint_store.insert_many([row])
+            inserted += 1
+        except Exception as e:
+            errors.append({"line": line, "error": str(e)})
+    return inserted, errors
+
+
+def import_complaints(f: BinaryIO, fmt: str, source: str = "import", progress=None) -> dict:
+    """
+    Streams an upload through validation, batched enrichment and multi-row
+    inserts of IMPORT_BATCH_SIZE rows. Rows whose complaint_number is
+    already taken are rejected. Returns counts, a per-row error report
+    (capped at IMPORT_MAX_ERRORS) and throughput figures.
+    """
+    batch_size = settings.IMPORT_BATCH_SIZE
+    ticket_prefix = f"MCD-IMP-{int(time.time()):x}".upper()
+    timings = {"parse": 0.0, "enrich": 0.0, "insert": 0.0}
+    counts = {"rows_read": 0, "rows_inserted": 0, "rows_failed": 0}
+    errors: List[dict] = []
+    numbers_seen: set = set()
+    next_seq = 1
+    started = time.perf_counter()
+
+    def report_error(line: int, message: str):
+        counts["rows_failed"] += 1
+        if len(errors) < settings.IMPORT_MAX_ERRORS:
+            errors.append({"line": line, "error": message})
+
+    def flush(batch: List[dict], lines: List[int]):
+        nonlocal next_seq
+        t0 = time.perf_counter()
+        batch, lines, rejected = _claim_numbers(batch, lines, numbers_seen)
+        for err in rejected:
+            report_error(err["line"], err["error"])
+        rows = enrich_batch(batch, ticket_prefix, next_seq, source) if batch else []
+        next_seq += len(rows)
+        t1 = time.perf_counter()
+        inserted, failed = _insert_batch(rows, lines) if rows else (0, [])
+        if inserted:
+            response_cache.cache.invalidate("complaints")
+        timings["enrich"] += t1 - t0
+        timings["insert"] += time.perf_counter() - t1
+        counts["rows_inserted"] += inserted
+        for err in failed:
+            report_error(err["line"], err["error"])
+        if progress:
+            progress(**counts)
+
+    batch, lines = [], []
+    t0 = time.perf_counter()
+    for line, record, error in iter_records(f, fmt):
+        counts["rows_read"] += 1
+        if counts["rows_read"] > settings.IMPORT_MAX_ROWS:
+            counts["rows_read"] -= 1
+            report_error(line, f"Row limit of {settings.IMPORT_MAX_ROWS} reached, rest of the file skipped")
+            break
+        error = error or _validate(record)
+        if error:
+            report_error(line, error)
+            continue
+        batch.append(record)
+        lines.append(line)
+        if len(batch) >= batch_size:
+            timings["parse"] += time.perf_counter() - t0
+            flush(batch, lines)
+            batch, lines = [], []
+            t0 = time.perf_counter()
+    timings["parse"] += time.perf_counter() - t0
+    if batch:
+        flush(batch, lines)
+
+    elapsed = time.perf_counter() - started
+    events.bus.publish("complaints.imported", {"ticket_prefix": ticket_prefix, **counts})
+    print(f"✅ Imported {counts['rows_inserted']}/{counts['rows_read']} complaints in {elapsed:.1f}s")
+    return {
+        **counts,
+        "errors": errors,
+        "errors_truncated": counts["rows_failed"] > len(errors),
+        "ticket_prefix": ticket_prefix,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(counts["rows_read"] / elapsed, 1) if elapsed else None,
+        "timings_ms": {k: round(v * 1000, 1) for k, v in timings.items()},
+    }
+
+
+def _prune_history():
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in ("success", "error")]
+    overflow = len(_jobs) - settings.IMPORT_JOB_HISTORY
+    for job_id in finished[:max(overflow, 0)]:
+        del _jobs[job_id]
+
+
+# Keys of a job record that are stored; anything else is process-local
+RECORD_FIELDS = (
+    "job_id", "filename", "format", "status", "created_at",
+    "started_at", "finished_at", "progress", "result", "error",
+)
+
+
+def _record(job: dict) -> dict:
+    record = {field: job[field] for field in RECORD_FIELDS}
+    record["progress"] = dict(record["progress"])
+    return record
+
+
+def _persist(job: dict):
+    # Writes the job's current state; failures only cost other workers'
+    # visibility of the job
+    with _lock:
+        row = _record(job)
+    try:
+        import_job_records.upsert(row)
+    except Exception as e:
+        print(f"⚠️ Could not save import job {job['job_id']}: {e}")
+
+
+def submit_import(upload: BinaryIO, filename: str, fmt: str, source: str = "import") -> dict:
+    """
+    Spools the upload to disk and queues it for background import.
+    Returns a snapshot of the new job record.
+    """
+    fd, spool_path = tempfile.mkstemp(prefix="import_", suffix=f".{fmt}")
+    with os.fdopen(fd, "wb") as f:
+        while True:
+            chunk = upload.read(1024 * 1024)
+            if not chunk:
+                break
+            f.write(chunk)
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "filename": filename,
+        "format": fmt,
+        "status": "queued",
+        "created_at": datetime.now().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {"rows_read": 0, "rows_inserted": 0, "rows_failed": 0},
+        "result": None,
+        "error": None,
+        "_saved": None,
+        "_saved_at": 0.0,
+    }
+    with _lock:
+        _jobs[job_id] = job
+        _prune_history()
+        snapshot = _snapshot(job)
+
+    # Saved off the event loop; the job's own writes wait for this one
+    job["_saved"] = data_access.submit(_persist, job)
+    _executor.submit(_run_import, job_id, spool_path, fmt, source)
+    return snapshot
+
+
+def _run_import(job_id: str, spool_path: str, fmt: str, source: str):
+    job = _jobs[job_id]
+
+    def progress(**counters):
+        with _lock:
+            job["progress"].update(counters)
+            due = time.monotonic() - job["_saved_at"] >= settings.IMPORT_JOB_SYNC_SECONDS
+            if due:
+                job["_saved_at"] = time.monotonic()
+        if due:
+            _persist(job)
+
+    try:
+        job["_saved"].result()
+    except Exception:
+        pass
+    with _lock:
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        job["_saved_at"] = time.monotonic()
+    _persist(job)
+
+    try:
+        with open(spool_path, "rb") as f:
+            result = import_complaints(f, fmt, source=source, progress=progress)
+        with _lock:
+            job["result"] = result
+            job["progress"].update({k: result[k] for k in job["progress"]})
+            job["status"] = "success"
+    except Exception as e:
+        print(f"❌ Import job {job_id} failed: {e}")
+        with _lock:
+            job["status"] = "error"
+            job["error"] = str(e)
+    finally:
+        with _lock:
+            job["finished_at"] = datetime.now().isoformat()
+        _persist(job)
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
+
+
+def _snapshot(job: dict) -> dict:
+    return _record(job)
+
+
+def get_import(job_id: str) -> Optional[dict]:
+    """
+    An import started by any worker: this process's copy if it ran the
+    import, the import_jobs table otherwise.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            return _snapshot(job)
+    try:
+        return import_job_records.get(job_id)
+    except Exception as e:
+        print(f"⚠️ Could not read import job {job_id}: {e}")
+        return None
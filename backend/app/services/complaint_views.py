@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+from ..data_access import complaints as complaint_store
+
+
+class ComplaintView:
+    """
+    Base for in-memory views derived from the complaints table (rollups,
+    heatmap grids, ...).
+
+    Each complaint's last-seen record is kept in `_records`, so applying a
+    write is a diff: the old record's contribution is removed and the new
+    one added. That makes writes idempotent, which lets reconcile() rebuild
+    from a database snapshot and replay writes that raced with it.
+
+    Subclasses define `columns`, record(row), _empty_state() and
+    _add(state, record, sign); _build_state() may be overridden with a
+    vectorised bulk build.
+    """
+
+    name = "view"
+    columns = "id"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records: Dict[Hashable, tuple] = {}
+        self._state = self._empty_state()
+        self._reconciling = False
+        self._pending = []
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False
+        self.reconciled_at: Optional[float] = None
+        complaint_store.subscribe(self.on_complaint_written)
+
+    # --- subclass hooks ---
+
+    def record(self, row: dict) -> Optional[tuple]:
+        raise NotImplementedError
+
+    def _empty_state(self):
+        raise NotImplementedError
+
+    def _add(self, state, rec: tuple, sign: int):
+        raise NotImplementedError
+
+    def _build_state(self, records: Dict[Hashable, tuple]):
+        state = self._empty_state()
+        for rec in records.values():
+            self._add(state, rec, +1)
+        return state
+
+    # --- maintenance ---
+
+    def _apply(self, state, records: dict, complaint_id, new: Optional[tuple]):
+        old = records.get(complaint_id)
+        if old == new:
+            return
+        if old is not None:
+            self._add(state, old, -1)
+        if new is not None:
+            self._add(state, new, +1)
+            records[complaint_id] = new
+        else:
+            records.pop(complaint_id, None)
+
+    def on_complaint_written(self, event: str, row: dict, changed: frozenset):
+        if row.get("id") is None:
+            return
+        with self._lock:
+            self._apply(self._state, self._records, row["id"], self.record(row))
+            if self._reconciling:
+                self._pending.append(row)
+
+    def reconcile(self) -> int:
+        """
+        Rebuilds the view from the database, then replays writes that
+        arrived while the snapshot was being read.
+        """
+        with self._lock:
+            self._reconciling = True
+            self._pending = []
+        try:
+            records = {}
+            for page in complaint_store.iter_pages(self.columns):
+                for row in page:
+                    rec = self.record(row)
+                    if rec is not None:
+                        records[row["id"]] = rec
+            state = self._build_state(records)
+
+            with self._lock:
+                for row in self._pending:
+                    self._apply(state, records, row["id"], self.record(row))
+                drift = len(self._records) - len(records)
+                if self.ready and drift:
+                    print(f"⚠️ {self.name} drifted by {drift} complaints, reconciled")
+                self._records = records
+                self._state = state
+                self.ready = True
+                self.reconciled_at = time.time()
+            return len(records)
+        finally:
+            with self._lock:
+                self._reconciling = False
+                self._pending = []
+
+    def start(self, interval_seconds: float):
+        """
+        Starts a background thread that reconciles now and then every
+        `interval_seconds`.
+        """
+        if self._thread:
+            return
+
+        def _loop():
+            while True:
+                try:
+                    t0 = time.perf_counter()
+                    count = self.reconcile()
+                    print(f"✅ {self.name} reconciled: {count} complaints in {time.perf_counter() - t0:.1f}s")
+                except Exception as e:
+                    print(f"❌ {self.name} reconcile failed: {e}")
+                time.sleep(interval_seconds)
+
+        self._thread = threading.Thread(target=_loop, name=f"{self.name}-reconcile", daemon=True)
+        self._thread.start()
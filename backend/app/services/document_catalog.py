@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..config import settings
+from ..data_access import document_chunks, documents
+from . import response_cache
+
+# Columns kept per document; anything else in a catalog row is ignored
+FIELDS = (
+    "doc_id", "filename", "description", "type", "storage_path", "public_url",
+    "chunk_count", "size_bytes", "pages", "checksum", "timings_ms", "status",
+    "created_at", "updated_at",
+)
+
+
+class DocumentCatalog:
+    """
+    In-memory copy of the documents table: one entry per doc_id with its
+    chunk count, size, checksum and ingest timings. Listing documents reads
+    this instead of scanning document_chunks, so it costs O(documents).
+    The copy is reloaded from the table once it is older than
+    DOCUMENT_CATALOG_TTL; ingest_document keeps it current in between.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._listing: Optional[List[dict]] = None
+        self.loaded_at: Optional[float] = None
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    def load(self) -> int:
+        """
+        Reads the documents table. If it is empty (documents ingested before
+        the catalog existed), the entries are rebuilt from chunk metadata
+        and written back.
+        """
+        rows = documents.all()
+        if not rows:
+            rows = self._from_chunks()
+            if rows:
+                print(f"📚 Backfilling document catalog with {len(rows)} documents")
+                try:
+                    documents.upsert(rows)
+                except Exception as e:
+                    print(f"⚠️ Document catalog backfill failed: {e}")
+
+        with self._lock:
+            self._entries = {row["doc_id"]: self._entry(row) for row in rows}
+            self._listing = None
+            self.loaded_at = time.monotonic()
+        return len(rows)
+
+    @staticmethod
+    def _entry(row: dict) -> dict:
+        return {field: row.get(field) for field in FIELDS}
+
+    @staticmethod
+    def _from_chunks(page_size: int = 1000) -> List[dict]:
+        entries: Dict[str, dict] = {}
+        start = 0
+        while True:
+            page = document_chunks.page(start, page_size, columns="id,content,metadata")
+            for chunk in page:
+                meta = chunk.get("metadata") or {}
+                doc_id = meta.get("doc_id") or meta.get("filename")
+                if not doc_id:
+                    continue
+                entry = entries.get(doc_id)
+                if entry is None:
+                    entry = entries[doc_id] = {
+                        "doc_id": doc_id,
+                        "filename": meta.get("filename"),
+                        "description": meta.get("description", ""),
+                        "type": meta.get("type"),
+                        "storage_path": meta.get("storage_path"),
+                        "public_url": meta.get("public_url"),
+                        "chunk_count": 0,
+                        "size_bytes": None,
+                        "status": "active",
+                        "created_at": meta.get("created_at"),
+                        "updated_at": meta.get("created_at"),
+                    }
+                entry["chunk_count"] += 1
+            if len(page) < page_size:
+                return list(entries.values())
+            start += page_size
+
+    def _ensure_loaded(self):
+        if not self._fresh():
+            self.load()
+
+    def record(self, entry: dict):
+        """
+        Writes a document's entry to the documents table, then to memory.
+        Raises if the write fails, so the ingest fails rather than leaving
+        an entry only this worker knows about (and loses on reload).
+        """
+        entry = self._entry(entry)
+        if self.loaded_at is None:
+            # Load (and backfill) before the first write, or the table
+            # would no longer look empty to the backfill check
+            try:
+                self.load()
+            except Exception as e:
+                print(f"⚠️ Document catalog load failed: {e}")
+        try:
+            documents.upsert([entry])
+        except Exception as e:
+            print(f"❌ Document catalog write failed for {entry['doc_id']}: {e}")
+            raise
+        with self._lock:
+            self._entries[entry["doc_id"]] = entry
+            self._listing = None
+        response_cache.cache.invalidate("documents")
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        self._ensure_loaded()
+        return self._entries.get(doc_id)
+
+    # Duplicate and revision lookups read the table, not this copy: another
+    # worker may have ingested the file since it was loaded
+
+    def find_checksum(self, checksum: str) -> Optional[dict]:
+        """
+        The active document whose file has this sha256, if any.
+        """
+        row = documents.find_active(checksum=checksum)
+        return self._entry(row) if row else None
+
+    def find_doc(self, doc_id: str) -> Optional[dict]:
+        """
+        The active document with this doc_id, if any.
+        """
+        row = documents.find_active(doc_id=doc_id)
+        return self._entry(row) if row else None
+
+    def find_filename(self, filename: str, doc_type: Optional[str] = "scheme_doc") -> Optional[dict]:
+        """
+        The newest active document uploaded under this filename, if any.
+        """
+        row = documents.find_active(filename=filename, doc_type=doc_type)
+        return self._entry(row) if row else None
+
+    def list(self, doc_type: Optional[str] = "scheme_doc") -> List[dict]:
+        """
+        Catalog entries, newest first, optionally of one type only.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._listing is None:
+                self._listing = sorted(self._entries.values(), key=lambda e: e.get("created_at") or "", reverse=True)
+            listing = self._listing
+        if doc_type is None:
+            return listing
+        return [entry for entry in listing if entry.get("type") == doc_type]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._entries),
+            "loaded_age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+        }
+
+
+catalog = DocumentCatalog(settings.DOCUMENT_CATALOG_TTL)
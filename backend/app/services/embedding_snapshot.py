@@ -0,0 +1,599 @@
+"""
+On-disk snapshot of the document_chunks embeddings, used to answer
+knowledge-base searches when match_documents is unreachable.
+
+One directory holds, per generation g:
+
+    vectors.g.int8|float16  unit vectors, one row per position
+    factors.g.f32           per-row score factor (1 / stored row norm)
+    ids.g.i64               chunk id per position
+    doc_ordinals.g.i32      document per position (index into docs.g.json)
+    offsets.g.u64           byte offset of each position's line in rows.g.jsonl
+    rows.g.jsonl            [id, content, chunk-level metadata] per position
+    tombstones.g.i64        positions superseded or deleted since the last compaction
+    docs.g.json             document-level metadata, stored once per document
+
+plus manifest.json, which names the generation and says how many rows of
+each file are valid. Files are append-only; the manifest is replaced
+atomically after each sync, so readers never see a partial write. Every
+worker maps the files read-only, so they share one copy through the page
+cache. A single writer (whichever worker holds the lock file) syncs new
+chunks by id, then reconciles documents against the catalog and
+document_chunks (see EmbeddingSnapshot.sync).
+"""
+import json
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..data_access import doc_key, document_chunks, documents
+from . import metrics
+from .vector_index import parse_embedding
+
+FORMAT = 1
+DTYPES = {"int8": np.int8, "float16": np.float16}
+# Metadata kept per chunk in rows.jsonl; every other key is per document
+CHUNK_KEYS = ("chunk_index", "page", "heading", "content_hash")
+# Rows converted to float32 at a time while scoring; small enough for the
+# converted block to stay in cache (int8 at 1024 rows beats a float32 matvec)
+SEARCH_BLOCK_ROWS = 1024
+# Rows copied at a time when compacting
+COPY_BLOCK_ROWS = 32768
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (stored rows, score factors). Rows are unit-normalised, then
+    kept as float16, or as int8 scaled so each row's largest component is
+    ±127 (a quarter of the float32 size, and the faster one to score). For
+    a unit query, cosine similarity ≈ (row · query) * factor.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms
+    if dtype == "int8":
+        peak = np.abs(unit).max(axis=1, keepdims=True)
+        peak[peak == 0] = 1.0
+        stored = np.rint(unit / peak * 127).astype(np.int8)
+    else:
+        stored = unit.astype(np.float16)
+    lengths = np.linalg.norm(stored.astype(np.float32), axis=1)
+    lengths[lengths == 0] = 1.0
+    return stored, (1.0 / lengths).astype(np.float32)
+
+
+class _Files:
+    def __init__(self, directory: str, generation: int, dtype: str):
+        def path(name: str) -> str:
+            return os.path.join(directory, name)
+
+        g = generation
+        self.vectors = path(f"vectors.{g}.{dtype}")
+        self.factors = path(f"factors.{g}.f32")
+        self.ids = path(f"ids.{g}.i64")
+        self.doc_ordinals = path(f"doc_ordinals.{g}.i32")
+        self.offsets = path(f"offsets.{g}.u64")
+        self.rows = path(f"rows.{g}.jsonl")
+        self.tombstones = path(f"tombstones.{g}.i64")
+        self.docs = path(f"docs.{g}.json")
+
+    def all(self) -> List[str]:
+        return [self.vectors, self.factors, self.ids, self.doc_ordinals, self.offsets, self.rows, self.tombstones]
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: str, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _empty_manifest(dtype: str, generation: int = 0) -> dict:
+    return {
+        "format": FORMAT,
+        "generation": generation,
+        "dtype": dtype,
+        "dim": 0,
+        "count": 0,
+        "tombstones": 0,
+        "rows_bytes": 0,
+        "last_id": 0,
+        "docs_synced_at": "",
+        # Catalog doc_ids at the last sync, to tell which documents left it
+        "catalog_docs": [],
+        "synced_at": None,
+        "revision": 0,
+    }
+
+
+def _split_metadata(metadata: dict) -> Tuple[dict, dict]:
+    metadata = metadata or {}
+    chunk = {k: metadata[k] for k in CHUNK_KEYS if k in metadata}
+    doc = {k: v for k, v in metadata.items() if k not in CHUNK_KEYS}
+    return doc, chunk
+
+
+def _read_rows(path: str, offsets: np.ndarray, positions) -> List[list]:
+    out = []
+    with open(path, "rb") as f:
+        for p in positions:
+            f.seek(int(offsets[p]))
+            out.append(json.loads(f.read(int(offsets[p + 1] - offsets[p]))))
+    return out
+
+
+class _Writer:
+    """
+    Appends to one generation's files; the caller publishes the manifest.
+    """
+
+    def __init__(self, directory: str, manifest: dict, docs: List[dict]):
+        self.directory = directory
+        self.manifest = manifest
+        self.docs = docs
+        self.doc_index = {doc_key(d): i for i, d in enumerate(docs)}
+        self.files = _Files(directory, manifest["generation"], manifest["dtype"])
+        self._truncate()
+        self._handles = {path: open(path, "ab") for path in self.files.all()}
+        if os.path.getsize(self.files.offsets) == 0:
+            self._handles[self.files.offsets].write(np.zeros(1, dtype=np.uint64).tobytes())
+
+    def _truncate(self):
+        # Drop anything appended after the last published manifest (a sync
+        # that died half way)
+        m = self.manifest
+        itemsize = np.dtype(DTYPES[m["dtype"]]).itemsize
+        sizes = {
+            self.files.vectors: m["count"] * m["dim"] * itemsize,
+            self.files.factors: m["count"] * 4,
+            self.files.ids: m["count"] * 8,
+            self.files.doc_ordinals: m["count"] * 4,
+            self.files.offsets: (m["count"] + 1) * 8 if m["count"] else 0,
+            self.files.rows: m["rows_bytes"],
+            self.files.tombstones: m["tombstones"] * 8,
+        }
+        for path, size in sizes.items():
+            with open(path, "ab") as f:
+                f.truncate(size)
+
+    def doc_ordinal(self, metadata: dict) -> int:
+        doc, _ = _split_metadata(metadata)
+        key = doc_key(doc)
+        ordinal = self.doc_index.get(key)
+        if ordinal is None:
+            ordinal = self.doc_index[key] = len(self.docs)
+            self.docs.append(doc)
+        else:
+            self.docs[ordinal] = doc
+        return ordinal
+
+    def append(self, stored: np.ndarray, factors: np.ndarray, rows: List[dict]):
+        """
+        Appends already quantized vectors with their {id, content, metadata} rows.
+        """
+        if not rows:
+            return
+        m = self.manifest
+        if not m["dim"]:
+            m["dim"] = stored.shape[1]
+        elif stored.shape[1] != m["dim"]:
+            raise ValueError(f"Embedding dimension {stored.shape[1]} does not match snapshot dimension {m['dim']}")
+
+        lines = []
+        for row in rows:
+            _, chunk = _split_metadata(row.get("metadata"))
+            lines.append(json.dumps([row["id"], row.get("content", ""), chunk], ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        ends = m["rows_bytes"] + np.cumsum([len(line) for line in lines], dtype=np.uint64)
+
+        h = self._handles
+        h[self.files.vectors].write(np.ascontiguousarray(stored, dtype=DTYPES[m["dtype"]]).tobytes())
+        h[self.files.factors].write(np.asarray(factors, dtype=np.float32).tobytes())
+        h[self.files.ids].write(np.asarray([row["id"] for row in rows], dtype=np.int64).tobytes())
+        h[self.files.doc_ordinals].write(np.asarray([self.doc_ordinal(row.get("metadata")) for row in rows], dtype=np.int32).tobytes())
+        h[self.files.offsets].write(ends.tobytes())
+        h[self.files.rows].write(b"".join(lines))
+
+        m["count"] += len(rows)
+        m["rows_bytes"] = int(ends[-1])
+
+    def tombstone(self, positions):
+        positions = np.asarray(list(positions), dtype=np.int64)
+        if len(positions):
+            self._handles[self.files.tombstones].write(positions.tobytes())
+            self.manifest["tombstones"] += len(positions)
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.flush()
+            os.fsync(handle.fileno())
+            handle.close()
+
+
+class _View:
+    """
+    Read-only memory maps of one published manifest.
+    """
+
+    def __init__(self, directory: str, manifest: dict, docs: List[dict]):
+        self.manifest = manifest
+        self.docs = docs
+        self.files = _Files(directory, manifest["generation"], manifest["dtype"])
+        count, dim = manifest["count"], manifest["dim"]
+        self.count = count
+        if not count:
+            return
+        self.vectors = np.memmap(self.files.vectors, dtype=DTYPES[manifest["dtype"]], mode="r", shape=(count, dim))
+        self.factors = np.memmap(self.files.factors, dtype=np.float32, mode="r", shape=(count,))
+        self.ids = np.memmap(self.files.ids, dtype=np.int64, mode="r", shape=(count,))
+        self.doc_ordinals = np.memmap(self.files.doc_ordinals, dtype=np.int32, mode="r", shape=(count,))
+        self.offsets = np.memmap(self.files.offsets, dtype=np.uint64, mode="r", shape=(count + 1,))
+        with open(self.files.rows, "rb") as f:
+            self.rows = mmap.mmap(f.fileno(), manifest["rows_bytes"], access=mmap.ACCESS_READ)
+        self.live = np.ones(count, dtype=bool)
+        dead = np.fromfile(self.files.tombstones, dtype=np.int64, count=manifest["tombstones"])
+        self.live[dead[dead < count]] = False
+
+    def row(self, position: int) -> list:
+        return json.loads(self.rows[int(self.offsets[position]):int(self.offsets[position + 1])])
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, self.count)
+            scores[start:end] = self.vectors[start:end].astype(np.float32) @ query
+        scores *= self.factors
+        scores[~self.live] = -np.inf
+        return scores
+
+
+class EmbeddingSnapshot:
+    def __init__(self, directory: str, dtype: str = "int8"):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+        self.directory = directory
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._view: Optional[_View] = None
+        self._manifest_stat = None
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    # --- reading ---
+
+    def view(self) -> Optional[_View]:
+        """
+        The maps for the latest published manifest, reopened when it changes.
+        """
+        try:
+            st = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            if self._view is None or stat != self._manifest_stat:
+                manifest = _read_json(self._manifest_path)
+                if not manifest or manifest.get("format") != FORMAT:
+                    return None
+                docs = _read_json(_Files(self.directory, manifest["generation"], manifest["dtype"]).docs)
+                self._view = _View(self.directory, manifest, docs or [])
+                self._manifest_stat = stat
+            return self._view
+
+    def search(self, query_embedding: List[float], match_threshold: float = 0.7, match_count: int = 5) -> List[dict]:
+        """
+        Top `match_count` chunks above `match_threshold` by cosine similarity,
+        shaped like the match_documents RPC rows.
+        """
+        view = self.view()
+        if view is None or not view.count or match_count <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = view.scores(query)
+        k = min(match_count, view.count)
+        top = np.argpartition(-scores, k - 1)[:k] if k < view.count else np.arange(view.count)
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for p in top:
+            if not scores[p] > match_threshold:
+                continue
+            chunk_id, content, chunk_meta = view.row(p)
+            ordinal = int(view.doc_ordinals[p])
+            doc_meta = view.docs[ordinal] if ordinal < len(view.docs) else {}
+            results.append({
+                "id": chunk_id,
+                "content": content,
+                "metadata": {**doc_meta, **chunk_meta},
+                "similarity": float(scores[p]),
+            })
+        return results
+
+    def stats(self) -> dict:
+        view = self.view()
+        if view is None:
+            return {"ready": False}
+        m = view.manifest
+        return {
+            "ready": True,
+            "dtype": m["dtype"],
+            "rows": m["count"] - m["tombstones"],
+            "tombstones": m["tombstones"],
+            "last_id": m["last_id"],
+            "synced_at": m["synced_at"],
+            "bytes": sum(os.path.getsize(p) for p in view.files.all() if os.path.exists(p)),
+        }
+
+    # --- writing ---
+
+    @contextmanager
+    def _writer_lock(self):
+        import fcntl
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def sync(self, page_size: int = 1000) -> dict:
+        """
+        Brings the snapshot up to date with document_chunks: appends chunks
+        with ids above the last synced id, then reconciles documents (by
+        doc_key, as the catalog keys them). A document that left the
+        catalog is tombstoned. One that was revised since the last sync,
+        whose live chunk count differs from its catalog chunk_count, or that
+        has chunks but no catalog entry is re-read from document_chunks:
+        deleted chunks are tombstoned (retired, or rolled back by a failed
+        ingest), chunks whose metadata changed are re-appended, and chunks
+        missed by the id scan (ids commit out of order) are appended.
+        Compacts when tombstones pass
+        EMBEDDING_SNAPSHOT_COMPACT_RATIO. Only one process syncs at a time;
+        the others get {"status": "busy"}.
+        """
+        with self._writer_lock() as locked:
+            if not locked:
+                return {"status": "busy"}
+            with metrics.snapshot_sync_duration.time():
+                return self._sync(page_size)
+
+    def _sync(self, page_size: int) -> dict:
+        manifest = _read_json(self._manifest_path)
+        if not manifest or manifest.get("format") != FORMAT or manifest.get("dtype") != self.dtype:
+            generation = manifest["generation"] + 1 if manifest else 0
+            manifest = _empty_manifest(self.dtype, generation)
+            docs = []
+        else:
+            docs = _read_json(_Files(self.directory, manifest["generation"], manifest["dtype"]).docs) or []
+        count_before = manifest["count"]
+        writer = _Writer(self.directory, manifest, docs)
+        summary = {"status": "ok", "added": 0, "updated": 0, "retired": 0, "compacted": False}
+
+        # doc_key -> [(position, chunk id)] appended by this sync
+        appended: Dict[str, List[Tuple[int, int]]] = {}
+        try:
+            # 1. New chunks, by id
+            while True:
+                page = document_chunks.page_after(manifest["last_id"], page_size)
+                rows = [row for row in page if row.get("embedding") is not None]
+                if rows:
+                    self._append_rows(writer, rows, appended)
+                    summary["added"] += len(rows)
+                if page:
+                    manifest["last_id"] = page[-1]["id"]
+                if len(page) < page_size:
+                    break
+
+            # 2. Documents whose chunks may differ from the table's
+            catalog_rows = documents.all()
+            since = manifest["docs_synced_at"]
+            catalog = {r.get("doc_id"): r for r in catalog_rows}
+            left = set(manifest.get("catalog_docs") or []) - set(catalog)
+            counts = self._live_counts(writer, count_before)
+            for key, items in appended.items():
+                counts[key] = counts.get(key, 0) + len(items)
+            check = {
+                key for key, entry in catalog.items()
+                if (entry.get("updated_at") or "") > since or counts.get(key, 0) != (entry.get("chunk_count") or 0)
+            }
+            if catalog:
+                check.update(key for key in counts if key not in catalog and key not in left)
+            added, updated, retired = self._refresh_documents(writer, check, left, count_before, appended)
+            summary["added"] += added
+            summary["updated"] += updated
+            summary["retired"] += retired
+            manifest["docs_synced_at"] = max([since] + [r.get("updated_at") or "" for r in catalog_rows])
+            manifest["catalog_docs"] = sorted(key for key in catalog if key)
+        finally:
+            writer.close()
+
+        manifest["synced_at"] = time.time()
+        manifest["revision"] += 1
+        _write_json(writer.files.docs, writer.docs)
+        _write_json(self._manifest_path, manifest)
+
+        if manifest["count"] and manifest["tombstones"] > settings.EMBEDDING_SNAPSHOT_COMPACT_RATIO * manifest["count"]:
+            self._compact(manifest, writer.docs)
+            summary["compacted"] = True
+        elif manifest["generation"] and not count_before:
+            # A fresh generation replaced an incompatible snapshot
+            self._remove_other_generations(manifest)
+        return summary
+
+    def _append_rows(self, writer: _Writer, rows: List[dict], appended: Dict[str, List[Tuple[int, int]]]):
+        stored, factors = quantize(np.stack([parse_embedding(r["embedding"]) for r in rows]), self.dtype)
+        start = writer.manifest["count"]
+        writer.append(stored, factors, rows)
+        for i, row in enumerate(rows):
+            appended.setdefault(doc_key(row.get("metadata")), []).append((start + i, row["id"]))
+
+    @staticmethod
+    def _live_counts(writer: _Writer, count_before: int) -> Dict[str, int]:
+        # Live rows per doc_key among the first count_before positions
+        if not count_before:
+            return {}
+        files = writer.files
+        doc_ordinals = np.fromfile(files.doc_ordinals, dtype=np.int32, count=count_before)
+        live = np.ones(count_before, dtype=bool)
+        dead = np.fromfile(files.tombstones, dtype=np.int64, count=writer.manifest["tombstones"])
+        live[dead[dead < count_before]] = False
+        per_ordinal = np.bincount(doc_ordinals[live], minlength=len(writer.docs))
+        keys = {ordinal: key for key, ordinal in writer.doc_index.items()}
+        return {keys[o]: int(n) for o, n in enumerate(per_ordinal) if n and o in keys}
+
+    def _refresh_documents(self, writer: _Writer, check: set, left: set, count_before: int,
+                           appended: Dict[str, List[Tuple[int, int]]]) -> Tuple[int, int, int]:
+        if not check and not left:
+            return 0, 0, 0
+        files = writer.files
+        m = writer.manifest
+        doc_ordinals = np.fromfile(files.doc_ordinals, dtype=np.int32, count=count_before)
+        ids = np.fromfile(files.ids, dtype=np.int64, count=count_before)
+        offsets = np.fromfile(files.offsets, dtype=np.uint64, count=count_before + 1)
+        live = np.ones(count_before, dtype=bool)
+        dead = np.fromfile(files.tombstones, dtype=np.int64, count=m["tombstones"])
+        live[dead[dead < count_before]] = False
+        vectors = np.memmap(files.vectors, dtype=DTYPES[m["dtype"]], mode="r", shape=(count_before, m["dim"])) if count_before else None
+        factors = np.fromfile(files.factors, dtype=np.float32, count=count_before)
+
+        def positions_of(key) -> np.ndarray:
+            ordinal = writer.doc_index.get(key)
+            if ordinal is None or not count_before:
+                return np.zeros(0, dtype=np.int64)
+            return np.flatnonzero((doc_ordinals == ordinal) & live)
+
+        added = updated = retired = 0
+        for key in left:
+            # The document left the catalog: drop all of it
+            gone = list(positions_of(key)) + [p for p, _ in appended.get(key, [])]
+            writer.tombstone(gone)
+            retired += len(gone)
+
+        for key in check:
+            positions = positions_of(key)
+            current = {row["id"]: row for row in document_chunks.for_doc(key)}
+            stale, changed = [], []
+            for p, (chunk_id, content, chunk_meta) in zip(positions, _read_rows(files.rows, offsets, positions)):
+                row = current.get(chunk_id)
+                if row is None:
+                    stale.append(p)
+                    continue
+                _, new_meta = _split_metadata(row.get("metadata"))
+                if new_meta != chunk_meta or row.get("content", content) != content:
+                    changed.append((p, row))
+            # Unchanged chunks pick up the new document-level metadata
+            # (storage path, url) through docs.json
+            if current:
+                writer.doc_ordinal(next(iter(current.values())).get("metadata"))
+            if changed:
+                positions_changed = [p for p, _ in changed]
+                writer.append(np.asarray(vectors[positions_changed]), factors[positions_changed], [row for _, row in changed])
+            writer.tombstone(stale + [p for p, _ in changed])
+            updated += len(changed)
+            retired += len(stale)
+
+            # Chunks neither scan has seen: committed behind last_id
+            held = {int(i) for i in ids[positions]} | {chunk_id for _, chunk_id in appended.get(key, [])}
+            missing = [chunk_id for chunk_id in current if chunk_id not in held]
+            for start in range(0, len(missing), COPY_BLOCK_ROWS):
+                rows = [r for r in document_chunks.by_ids(missing[start:start + COPY_BLOCK_ROWS]) if r.get("embedding") is not None]
+                if rows:
+                    self._append_rows(writer, rows, appended)
+                    added += len(rows)
+        return added, updated, retired
+
+    def _compact(self, manifest: dict, docs: List[dict]):
+        old = _Files(self.directory, manifest["generation"], manifest["dtype"])
+        count = manifest["count"]
+        live = np.ones(count, dtype=bool)
+        dead = np.fromfile(old.tombstones, dtype=np.int64, count=manifest["tombstones"])
+        live[dead[dead < count]] = False
+        positions = np.flatnonzero(live)
+
+        compacted = {**manifest, "generation": manifest["generation"] + 1, "count": 0, "tombstones": 0, "rows_bytes": 0}
+        writer = _Writer(self.directory, compacted, docs)
+        vectors = np.memmap(old.vectors, dtype=DTYPES[manifest["dtype"]], mode="r", shape=(count, manifest["dim"]))
+        factors = np.fromfile(old.factors, dtype=np.float32, count=count)
+        offsets = np.fromfile(old.offsets, dtype=np.uint64, count=count + 1)
+        doc_ordinals = np.fromfile(old.doc_ordinals, dtype=np.int32, count=count)
+        try:
+            for start in range(0, len(positions), COPY_BLOCK_ROWS):
+                block = positions[start:start + COPY_BLOCK_ROWS]
+                rows = [
+                    {"id": chunk_id, "content": content, "metadata": {**docs[doc_ordinals[p]], **chunk_meta}}
+                    for p, (chunk_id, content, chunk_meta) in zip(block, _read_rows(old.rows, offsets, block))
+                ]
+                writer.append(np.asarray(vectors[block]), factors[block], rows)
+        finally:
+            writer.close()
+        compacted["revision"] += 1
+        _write_json(writer.files.docs, writer.docs)
+        _write_json(self._manifest_path, compacted)
+        self._remove_other_generations(compacted)
+        print(f"🗜️ Embedding snapshot compacted: {count} -> {compacted['count']} rows")
+
+    def _remove_other_generations(self, manifest: dict):
+        # Readers still mapping an old generation keep their (unlinked) files
+        current = _Files(self.directory, manifest["generation"], manifest["dtype"])
+        keep = {os.path.basename(p) for p in current.all() + [current.docs]}
+        prefixes = ("vectors.", "factors.", "ids.", "doc_ordinals.", "offsets.", "rows.", "tombstones.", "docs.")
+        for name in os.listdir(self.directory):
+            if name.startswith(prefixes) and name not in keep:
+                os.remove(os.path.join(self.directory, name))
+
+
+snapshot = EmbeddingSnapshot(settings.EMBEDDING_SNAPSHOT_DIR, settings.EMBEDDING_SNAPSHOT_DTYPE)
+_sync_thread: Optional[threading.Thread] = None
+
+
+def start(interval_seconds: float = None):
+    """
+    Starts a background thread that syncs the snapshot now and then every
+    `interval_seconds` (EMBEDDING_SNAPSHOT_SYNC_SECONDS by default).
+    """
+    global _sync_thread
+    if _sync_thread:
+        return
+    interval_seconds = interval_seconds or settings.EMBEDDING_SNAPSHOT_SYNC_SECONDS
+
+    def _loop():
+        while True:
+            try:
+                t0 = time.perf_counter()
+                result = snapshot.sync()
+                if result["status"] == "ok":
+                    print(f"✅ Embedding snapshot synced: +{result['added']} ~{result['updated']} "
+                          f"-{result['retired']} chunks in {time.perf_counter() - t0:.1f}s")
+            except Exception as e:
+                print(f"❌ Embedding snapshot sync failed: {e}")
+            time.sleep(interval_seconds)
+
+    _sync_thread = threading.Thread(target=_loop, name="embedding-snapshot-sync", daemon=True)
+    _sync_thread.start()
@@ -0,0 +1,265 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from ..config import settings
+from ..data_access import complaints as complaint_store
+from .cache import TTLCache
+from .complaint_views import ComplaintView
+
+CLOSED_STATUSES = ("resolved", "closed", "rejected")
+
+
+class Subscriber:
+    def __init__(self, zone: Optional[str], queue_size: int):
+        self.zone = zone.upper() if zone else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        # Drops since the client last caught up (its queue was empty)
+        self.total_dropped = 0
+        self.overflowed = False
+
+    def wants(self, event: dict) -> bool:
+        return self.zone is None or not event.get("zone") or event["zone"].upper() == self.zone
+
+
+class EventBus:
+    """
+    In-process pub/sub for live dashboard streams. publish() may be called
+    from any thread; fan-out happens once on the event loop, which pushes
+    each event into every matching subscriber's bounded queue.
+
+    Slow clients never block the fan-out: when a queue is full its oldest
+    event is dropped (the client is told how many it missed), and a client
+    that drops more than EVENTS_MAX_DROPS events without catching up in
+    between is disconnected.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, zone: Optional[str] = None) -> Subscriber:
+        # Called from the event loop (the stream endpoint)
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(zone, settings.EVENTS_QUEUE_SIZE)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, event_type: str, data: dict):
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        event = {"id": next(self._ids), "type": event_type, "ts": datetime.now().isoformat(), **data}
+        self.published += 1
+        loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event: dict):
+        for subscriber in list(self._subscribers):
+            if subscriber.overflowed or not subscriber.wants(event):
+                continue
+            if subscriber.queue.empty():
+                subscriber.total_dropped = 0
+            elif subscriber.queue.full():
+                subscriber.queue.get_nowait()
+                subscriber.dropped += 1
+                subscriber.total_dropped += 1
+                if subscriber.total_dropped > settings.EVENTS_MAX_DROPS:
+                    subscriber.overflowed = True
+                    self.unsubscribe(subscriber)
+                    continue
+            subscriber.queue.put_nowait(event)
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+
+bus = EventBus()
+
+
+def _is_open(status: Optional[str]) -> bool:
+    return (status or "").lower() not in CLOSED_STATUSES
+
+
+def complaint_event(row: dict) -> dict:
+    # Same shape as an /api/activity item, plus what stream clients filter on
+    return {
+        "complaint_id": row.get("id"),
+        "complaint_number": row.get("complaint_number"),
+        "category": row.get("category"),
+        "status": row.get("status"),
+        "priority": row.get("priority"),
+        "location": row.get("location"),
+        "zone": row.get("zone"),
+        "title": f"New {row.get('category')} Report",
+        "created_at": row.get("created_at"),
+    }
+
+
+# complaint id -> last status seen, reported as previous_status
+_last_status = TTLCache(settings.EVENTS_STATUS_MEMO_SIZE, settings.EVENTS_STATUS_MEMO_TTL, name="event_status")
+
+
+def on_complaint_written(event: str, row: dict, changed: frozenset):
+    complaint_id = row.get("id")
+    status = row.get("status")
+    previous = _last_status.get(complaint_id) if complaint_id is not None else None
+    if complaint_id is not None and status:
+        _last_status.set(complaint_id, status)
+
+    if event == "created":
+        bus.publish("complaint.created", complaint_event(row))
+    elif event == "updated":
+        # Only writes that set the status count, and only if it moved
+        if "status" in changed and previous != status:
+            bus.publish("complaint.status_changed", {**complaint_event(row), "previous_status": previous})
+        else:
+            bus.publish("complaint.updated", complaint_event(row))
+    # Bulk imports announce themselves once per job instead of per row
+
+
+complaint_store.subscribe(on_complaint_written)
+
+
+class _Deadline(NamedTuple):
+    complaint_id: object
+    deadline: float
+    zone: str
+    complaint_number: Optional[str]
+    category: Optional[str]
+
+
+def _parse_deadline(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None).timestamp()
+    except ValueError:
+        return None
+
+
+class SlaTracker(ComplaintView):
+    """
+    Deadlines of open complaints in two heaps (warning time, breach time),
+    kept current from the write paths. A background tick pops whatever has
+    come due and publishes sla.warning / sla.breached. Removals are lazy:
+    a popped entry is skipped unless it is still the complaint's current
+    record, i.e. the complaint is still open with that deadline.
+    """
+
+    name = "SLA tracker"
+    columns = "id,zone,status,sla_deadline,complaint_number,category"
+
+    def __init__(self):
+        self._seq = itertools.count()
+        # (complaint id, event type) -> deadline already announced
+        self._announced = {}
+        self._tick_thread: Optional[threading.Thread] = None
+        super().__init__()
+
+    def record(self, row: dict) -> Optional[_Deadline]:
+        deadline = _parse_deadline(row.get("sla_deadline"))
+        if deadline is None or not _is_open(row.get("status")):
+            return None
+        return _Deadline(row.get("id"), deadline, row.get("zone") or "", row.get("complaint_number"), row.get("category"))
+
+    def _empty_state(self):
+        return {"sla.warning": [], "sla.breached": []}
+
+    def _entries(self, rec: _Deadline):
+        yield "sla.warning", (rec.deadline - settings.SLA_WARNING_HOURS * 3600, next(self._seq), rec)
+        yield "sla.breached", (rec.deadline, next(self._seq), rec)
+
+    def _add(self, state, rec: _Deadline, sign: int):
+        if sign > 0:
+            for event_type, entry in self._entries(rec):
+                heapq.heappush(state[event_type], entry)
+
+    def _build_state(self, records):
+        state = self._empty_state()
+        for rec in records.values():
+            for event_type, entry in self._entries(rec):
+                state[event_type].append(entry)
+        for heap in state.values():
+            heapq.heapify(heap)
+        return state
+
+    def _due(self, event_type: str, now: float) -> List[_Deadline]:
+        due = []
+        with self._lock:
+            heap = self._state[event_type]
+            while heap and heap[0][0] <= now:
+                _, _, rec = heapq.heappop(heap)
+                if self._records.get(rec.complaint_id) is rec:
+                    due.append(rec)
+        return due
+
+    def tick(self, now: float = None) -> int:
+        """
+        Publishes warnings and breaches that came due since the last tick.
+        Anything that fell due long before (e.g. at startup or after a
+        reconcile rebuilt the heaps) is consumed silently rather than
+        replayed as a burst.
+        """
+        now = now or time.time()
+        stale_before = now - 2 * settings.SLA_CHECK_SECONDS
+        published = 0
+        for event_type in ("sla.warning", "sla.breached"):
+            for rec in self._due(event_type, now):
+                due_at = rec.deadline if event_type == "sla.breached" else rec.deadline - settings.SLA_WARNING_HOURS * 3600
+                key = (rec.complaint_id, event_type)
+                if due_at < stale_before or self._announced.get(key) == rec.deadline:
+                    continue
+                if event_type == "sla.warning" and rec.deadline <= now:
+                    continue  # already past due; the breach covers it
+                self._announced[key] = rec.deadline
+                bus.publish(event_type, {
+                    "complaint_id": rec.complaint_id,
+                    "complaint_number": rec.complaint_number,
+                    "category": rec.category,
+                    "zone": rec.zone,
+                    "sla_deadline": datetime.fromtimestamp(rec.deadline).isoformat(),
+                })
+                published += 1
+
+        if len(self._announced) > 2 * max(len(self._records), 1000):
+            with self._lock:
+                self._announced = {k: v for k, v in self._announced.items() if k[0] in self._records}
+        return published
+
+    def start(self):
+        super().start(settings.SLA_RECONCILE_SECONDS)
+        if self._tick_thread:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(settings.SLA_CHECK_SECONDS)
+                if not self.ready:
+                    continue
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"❌ SLA tick failed: {e}")
+
+        self._tick_thread = threading.Thread(target=_loop, name="sla-tick", daemon=True)
+        self._tick_thread.start()
+
+
+sla_tracker = SlaTracker()
@@ -0,0 +1,112 @@
+import json
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..config import settings
+
+# Punctuation becomes whitespace before splitting into tokens; nukta and
+# zero-width joiners are dropped (spelled inconsistently, never meaningful)
+_TOKEN_TABLE = {
+    **dict.fromkeys(map(ord, ",.;:/\\()[]{}-_#'\"!?&|+*"), " "),
+    **dict.fromkeys(map(ord, "\u093c\u200c\u200d"), None),
+}
+
+_END = None  # trie key holding the place that ends at a node
+
+# Zone-level names (e.g. "south delhi") lose to any locality or landmark
+SPECIFICITY = {"zone": 0, "ward": 1, "locality": 2, "landmark": 2}
+
+
+class Place(NamedTuple):
+    name: str
+    zone: str
+    coords: Tuple[float, float]
+    kind: str
+
+
+class Gazetteer:
+    """
+    Compiled matcher over the MCD gazetteer: every place name and alias is
+    normalised into a token sequence and inserted into a token trie, so a
+    location string is matched in one pass over its tokens regardless of how
+    many places the gazetteer holds.
+
+    The best match is the most specific kind (localities and landmarks over
+    zone names), then the one spanning the most tokens, then the earliest.
+    """
+
+    def __init__(self, data: dict):
+        self.token_aliases: Dict[str, str] = data.get("token_aliases", {})
+        default = data["default"]
+        self.default = Place("", default["zone"], tuple(default["coords"]), "default")
+        self._root: dict = {}
+        self.patterns = 0
+        # Canonical (upper case) zone names
+        self.zones = frozenset([self.default.zone, *data.get("zones", {})])
+
+        for zone, entry in data.get("zones", {}).items():
+            place = Place(zone.lower(), zone, tuple(entry["coords"]), "zone")
+            for name in [zone.lower()] + entry.get("aliases", []):
+                self._insert(name, place)
+
+        for entry in data.get("places", []):
+            place = Place(entry["name"], entry["zone"], tuple(entry["coords"]), entry.get("kind", "locality"))
+            for name in [entry["name"]] + entry.get("aliases", []):
+                self._insert(name, place)
+
+    def tokens(self, text: str) -> List[str]:
+        text = text.lower()
+        if not text.isascii():
+            text = unicodedata.normalize("NFC", text)
+        aliases = self.token_aliases
+        return [aliases.get(t, t) for t in text.translate(_TOKEN_TABLE).split()]
+
+    def _insert(self, name: str, place: Place):
+        tokens = self.tokens(name)
+        if not tokens:
+            return
+        variants = [tokens]
+        if len(tokens) > 1:
+            # Multi-word names are often typed run together ("lajpatnagar")
+            variants.append(["".join(tokens)])
+        for variant in variants:
+            node = self._root
+            for token in variant:
+                node = node.setdefault(token, {})
+            existing = node.get(_END)
+            if existing is None or SPECIFICITY[place.kind] > SPECIFICITY[existing.kind]:
+                node[_END] = place
+                self.patterns += 1
+
+    def lookup(self, text: Optional[str]) -> Optional[Place]:
+        """
+        Best gazetteer match in `text`, or None.
+        """
+        if not text:
+            return None
+        tokens = self.tokens(text)
+        best, best_rank = None, None
+        for start in range(len(tokens)):
+            node = self._root
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                place = node.get(_END)
+                if place is not None:
+                    rank = (SPECIFICITY[place.kind], end - start + 1, -start)
+                    if best_rank is None or rank > best_rank:
+                        best, best_rank = place, rank
+        return best
+
+    def detect(self, text: Optional[str]) -> Tuple[str, Tuple[float, float]]:
+        place = self.lookup(text) or self.default
+        return place.zone, place.coords
+
+
+def load_gazetteer(path: str = None) -> Gazetteer:
+    with open(path or settings.GAZETTEER_PATH, encoding="utf-8") as f:
+        return Gazetteer(json.load(f))
+
+
+gazetteer = load_gazetteer()
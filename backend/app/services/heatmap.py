@@ -0,0 +1,173 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .complaint_views import ComplaintView
+
+# Heat contributed by each complaint, by priority
+PRIORITY_INTENSITY = {
+    "critical": 1.0,
+    "high": 0.8,
+    "medium": 0.5,
+    "low": 0.3
+}
+INTENSITIES = sorted(set(PRIORITY_INTENSITY.values()))
+ALL_ZONES = "*"
+
+
+def intensity_for(priority: Optional[str]) -> float:
+    return PRIORITY_INTENSITY.get((priority or "medium").lower(), 0.5)
+
+
+def cell_size_for_zoom(zoom: int) -> float:
+    # Roughly a 32px cell on a 256px web-mercator tile
+    return 360.0 / (2 ** zoom) / 8
+
+
+class _Point(NamedTuple):
+    zone: str
+    lat: float
+    lng: float
+    intensity: float
+
+
+class HeatmapGrid(ComplaintView):
+    """
+    Complaint heat binned into grid cells at a fixed set of zoom levels, per
+    zone and city-wide. Each cell keeps a count per intensity value (there
+    are only four priorities), so both the summed and the max intensity of a
+    cell stay exact as complaints are added, moved or re-prioritised.
+
+    state: {zoom: {zone: {(row, col): {intensity: count}}}}
+    """
+
+    name = "Heatmap grid"
+    columns = "id,zone,latitude,longitude,priority"
+
+    def __init__(self, zoom_levels: List[int]):
+        self.zoom_levels = sorted(zoom_levels)
+        self.cell_sizes = {z: cell_size_for_zoom(z) for z in self.zoom_levels}
+        super().__init__()
+
+    def record(self, row: dict) -> Optional[_Point]:
+        lat, lng = row.get("latitude"), row.get("longitude")
+        if lat is None or lng is None:
+            return None
+        return _Point((row.get("zone") or "").upper(), float(lat), float(lng), intensity_for(row.get("priority")))
+
+    def _empty_state(self):
+        return {z: defaultdict(dict) for z in self.zoom_levels}
+
+    def _add(self, state, rec: _Point, sign: int):
+        for zoom, size in self.cell_sizes.items():
+            cell = (math.floor(rec.lat / size), math.floor(rec.lng / size))
+            for zone in (rec.zone, ALL_ZONES):
+                cells = state[zoom][zone]
+                counts = cells.setdefault(cell, {})
+                n = counts.get(rec.intensity, 0) + sign
+                if n > 0:
+                    counts[rec.intensity] = n
+                else:
+                    counts.pop(rec.intensity, None)
+                    if not counts:
+                        del cells[cell]
+
+    def _build_state(self, records: Dict) -> dict:
+        """
+        Vectorised bulk build: bins every point at every level with NumPy
+        instead of calling _add per complaint. (zone, row, col, intensity)
+        is packed into one int64 key so a single np.unique per level does
+        the grouping.
+        """
+        state = self._empty_state()
+        if not records:
+            return state
+
+        points = list(records.values())
+        lats = np.fromiter((p.lat for p in points), dtype=np.float64, count=len(points))
+        lngs = np.fromiter((p.lng for p in points), dtype=np.float64, count=len(points))
+        levels = np.searchsorted(INTENSITIES, [p.intensity for p in points]).astype(np.int64)
+        zone_names, zone_ids = np.unique([p.zone for p in points], return_inverse=True)
+        zone_ids = zone_ids.astype(np.int64) + 1  # 0 is reserved for ALL_ZONES
+        zone_lookup = [ALL_ZONES] + [str(z) for z in zone_names]
+        n_levels = len(INTENSITIES)
+
+        for zoom, size in self.cell_sizes.items():
+            rows = np.floor(lats / size).astype(np.int64)
+            cols = np.floor(lngs / size).astype(np.int64)
+            row_min, col_min = rows.min(), cols.min()
+            n_cols = int(cols.max() - col_min) + 1
+            n_rows = int(rows.max() - row_min) + 1
+            cell_keys = ((rows - row_min) * n_cols + (cols - col_min)) * n_levels + levels
+
+            for zone_key in (np.zeros_like(zone_ids), zone_ids):
+                keys, counts = np.unique(zone_key * (n_rows * n_cols * n_levels) + cell_keys, return_counts=True)
+                zone_idx, rest = np.divmod(keys, n_rows * n_cols * n_levels)
+                cell_idx, level_idx = np.divmod(rest, n_levels)
+                r_idx, c_idx = np.divmod(cell_idx, n_cols)
+                r_idx += row_min
+                c_idx += col_min
+
+                zone_states = state[zoom]
+                for z, r, c, lvl, n in zip(zone_idx.tolist(), r_idx.tolist(), c_idx.tolist(), level_idx.tolist(), counts.tolist()):
+                    zone_states[zone_lookup[z]].setdefault((r, c), {})[INTENSITIES[lvl]] = n
+        return state
+
+    def start(self):
+        super().start(settings.HEATMAP_RECONCILE_SECONDS)
+
+    def _snap_zoom(self, zoom: int) -> int:
+        # Finest precomputed level that is not finer than the requested zoom
+        candidates = [z for z in self.zoom_levels if z <= zoom]
+        return candidates[-1] if candidates else self.zoom_levels[0]
+
+    def cells(
+        self,
+        zoom: int,
+        zone: Optional[str] = None,
+        agg: str = "sum",
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ) -> dict:
+        """
+        Aggregated heat for one zoom level as [lat, lng, value] cell centres.
+        `bbox` is (south, west, north, east). Summed values are scaled to
+        0..1 by the hottest returned cell; max values already are.
+        """
+        level = self._snap_zoom(zoom)
+        size = self.cell_sizes[level]
+        key = zone.upper() if zone else ALL_ZONES
+
+        with self._lock:
+            cells = [(cell, dict(counts)) for cell, counts in self._state[level].get(key, {}).items()]
+
+        points = []
+        total = 0
+        for (r, c), counts in cells:
+            lat, lng = (r + 0.5) * size, (c + 0.5) * size
+            if bbox and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
+                continue
+            n = sum(counts.values())
+            total += n
+            value = max(counts) if agg == "max" else sum(i * k for i, k in counts.items())
+            points.append([round(lat, 6), round(lng, 6), value, n])
+
+        max_value = max((p[2] for p in points), default=0)
+        if agg != "max" and max_value:
+            for p in points:
+                p[2] = round(p[2] / max_value, 4)
+
+        return {
+            "points": [p[:3] for p in points],
+            "counts": [p[3] for p in points],
+            "zoom": level,
+            "cell_size_deg": size,
+            "agg": agg,
+            "complaints": total,
+            "max_value": max_value,
+        }
+
+
+grid = HeatmapGrid(settings.HEATMAP_ZOOM_LEVELS)
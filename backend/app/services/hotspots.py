@@ -0,0 +1,289 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..config import settings
+from . import metrics
+from .complaint_views import ComplaintView
+
+EARTH_RADIUS_M = 6371000.0
+HOTSPOT_COLUMNS = "id,zone,latitude,longitude,location,category"
+
+
+class _Site(NamedTuple):
+    id: object
+    zone: str
+    lat: float
+    lng: float
+    area: str
+    category: str
+
+
+def _site(row: dict) -> Optional[_Site]:
+    lat, lng = row.get("latitude"), row.get("longitude")
+    if lat is None or lng is None:
+        return None
+    return _Site(
+        id=row.get("id"),
+        zone=(row.get("zone") or "").upper(),
+        lat=float(lat),
+        lng=float(lng),
+        area=(row.get("location") or "Unknown Area").split(",")[0].strip(),
+        category=row.get("category") or "General",
+    )
+
+
+def _eps() -> float:
+    # Haversine distances are in radians on the unit sphere
+    return settings.HOTSPOT_RADIUS_M / EARTH_RADIUS_M
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    """Pairwise great-circle distance in radians; inputs in radians, broadcastable."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _mode_per_label(labels: np.ndarray, values: List[str], n_labels: int) -> List[str]:
+    # Vectorised group-by mode: a (cluster x value) count table, argmax per row
+    names, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    table = np.bincount(labels * len(names) + codes, minlength=n_labels * len(names))
+    return [str(v) for v in names[table.reshape(n_labels, len(names)).argmax(axis=1)]]
+
+
+def _severity(count: int) -> str:
+    if count >= 10:
+        return "critical"
+    if count >= 5:
+        return "high"
+    return "medium"
+
+
+def fit_neighbours(sites: List[_Site]):
+    """Haversine BallTree over the sites, used both for DBSCAN and for write checks."""
+    from sklearn.neighbors import NearestNeighbors
+    coords = np.radians([[s.lat, s.lng] for s in sites])
+    return NearestNeighbors(radius=_eps(), metric="haversine", algorithm="ball_tree").fit(coords), coords
+
+
+def cluster_sites(sites: List[_Site], nn=None, coords=None) -> List[dict]:
+    """
+    DBSCAN over haversine distances, then centroid, dominant area and
+    dominant category per cluster via NumPy group-bys.
+    """
+    if len(sites) < settings.HOTSPOT_MIN_SAMPLES:
+        return []
+    from sklearn.cluster import DBSCAN
+
+    with metrics.dbscan_duration.time():
+        if nn is None:
+            nn, coords = fit_neighbours(sites)
+        graph = nn.radius_neighbors_graph(coords, mode="distance")
+        labels = DBSCAN(eps=_eps(), min_samples=settings.HOTSPOT_MIN_SAMPLES, metric="precomputed").fit(graph).labels_
+    metrics.dbscan_points.inc(amount=len(sites))
+
+    clustered = np.flatnonzero(labels >= 0)
+    if not len(clustered):
+        return []
+    labels = labels[clustered]
+    n_labels = int(labels.max()) + 1
+    counts = np.bincount(labels, minlength=n_labels)
+    lat = np.array([sites[i].lat for i in clustered])
+    lng = np.array([sites[i].lng for i in clustered])
+    lat_center = np.bincount(labels, weights=lat, minlength=n_labels) / counts
+    lng_center = np.bincount(labels, weights=lng, minlength=n_labels) / counts
+    areas = _mode_per_label(labels, [sites[i].area for i in clustered], n_labels)
+    issues = _mode_per_label(labels, [sites[i].category for i in clustered], n_labels)
+    zones = _mode_per_label(labels, [sites[i].zone for i in clustered], n_labels)
+
+    return [
+        {
+            "area": areas[k],
+            "zone": zones[k].title() or "General",
+            "complaints": int(counts[k]),
+            "mainIssue": issues[k],
+            "severity": _severity(int(counts[k])),
+            "lat": float(lat_center[k]),
+            "lng": float(lng_center[k]),
+        }
+        for k in range(n_labels)
+        if counts[k]
+    ]
+
+
+class _ZoneHotspots:
+    def __init__(self):
+        self.sites: Dict[object, _Site] = {}
+        self.dirty = True
+        self.version = 0
+        self.nn = None
+        self.indexed_ids: List[object] = []
+        # Sites written since the tree was built: id -> (lat, lng) in radians
+        self.added: Dict[object, tuple] = {}
+        self.hotspots: List[dict] = []
+
+
+class HotspotEngine(ComplaintView):
+    """
+    DBSCAN hotspots per zone, cached in memory. A complaint write only
+    invalidates its zone's clusters when the complaint has a neighbour
+    within the clustering radius (checked against the zone's BallTree and
+    the sites written since it was built); isolated complaints cannot change
+    any cluster. Dirty zones are re-clustered on the next read.
+
+    Trends compare each cluster with the closest cluster in a snapshot taken
+    about HOTSPOT_TREND_WINDOW_SECONDS earlier.
+    """
+
+    name = "Hotspot engine"
+    columns = HOTSPOT_COLUMNS
+
+    def __init__(self):
+        # zone -> deque of (taken_at, lat[], lng[], counts[])
+        self._history = defaultdict(lambda: deque(maxlen=self._history_len()))
+        self._compute_lock = threading.Lock()
+        super().__init__()
+
+    @staticmethod
+    def _history_len() -> int:
+        return int(settings.HOTSPOT_TREND_WINDOW_SECONDS // max(settings.HOTSPOT_SNAPSHOT_SECONDS, 1)) + 2
+
+    def record(self, row: dict) -> Optional[_Site]:
+        return _site(row)
+
+    def _empty_state(self):
+        return defaultdict(_ZoneHotspots)
+
+    def _has_neighbour(self, z: _ZoneHotspots, site: _Site) -> bool:
+        point = np.radians([[site.lat, site.lng]])
+        if z.nn is not None:
+            hits = z.nn.radius_neighbors(point, return_distance=False)[0]
+            if any(z.indexed_ids[i] != site.id for i in hits):
+                return True
+        others = [p for i, p in z.added.items() if i != site.id]
+        if others:
+            others = np.asarray(others)
+            if (_haversine(point[0, 0], point[0, 1], others[:, 0], others[:, 1]) <= _eps()).any():
+                return True
+        return False
+
+    def _add(self, state, rec: _Site, sign: int):
+        z = state[rec.zone]
+        if sign > 0:
+            z.sites[rec.id] = rec
+        else:
+            z.sites.pop(rec.id, None)
+
+        if not z.dirty and self._has_neighbour(z, rec):
+            z.dirty = True
+        z.version += 1
+
+        if sign > 0:
+            z.added[rec.id] = (np.radians(rec.lat), np.radians(rec.lng))
+        else:
+            z.added.pop(rec.id, None)
+
+    def start(self):
+        super().start(settings.HOTSPOT_RECONCILE_SECONDS)
+
+    def _refresh(self, zone: str):
+        """
+        Re-clusters one zone outside the view lock and installs the result,
+        unless a write landed meanwhile; that write is kept as pending so
+        the next read catches it.
+        """
+        with self._compute_lock:
+            with self._lock:
+                z = self._state[zone]
+                if not z.dirty:
+                    return
+                version = z.version
+                sites = list(z.sites.values())
+
+            nn, coords = fit_neighbours(sites) if sites else (None, None)
+            hotspots = cluster_sites(sites, nn, coords) if sites else []
+
+            with self._lock:
+                z = self._state.get(zone)
+                if z is None:
+                    return
+                z.nn = nn
+                z.indexed_ids = [s.id for s in sites]
+                z.hotspots = hotspots
+                if z.version == version:
+                    z.added = {}
+                    z.dirty = False
+
+    def _snapshot(self, zone: str, hotspots: List[dict]):
+        history = self._history[zone]
+        now = time.time()
+        if history and now - history[-1][0] < settings.HOTSPOT_SNAPSHOT_SECONDS:
+            return
+        history.append((
+            now,
+            np.radians([h["lat"] for h in hotspots]),
+            np.radians([h["lng"] for h in hotspots]),
+            np.array([h["complaints"] for h in hotspots]),
+        ))
+
+    def _baseline(self, zone: str):
+        # Newest snapshot at least a trend window old, else the oldest one
+        history = self._history.get(zone)
+        if not history:
+            return None
+        cutoff = time.time() - settings.HOTSPOT_TREND_WINDOW_SECONDS
+        older = [s for s in history if s[0] <= cutoff]
+        return older[-1] if older else history[0]
+
+    def _with_trends(self, zone: str, hotspots: List[dict]) -> List[dict]:
+        baseline = self._baseline(zone)
+        self._snapshot(zone, hotspots)
+        if not hotspots:
+            return []
+
+        trends = ["stable"] * len(hotspots)
+        if baseline is not None:
+            _, prev_lat, prev_lng, prev_counts = baseline
+            lat = np.radians([h["lat"] for h in hotspots])[:, None]
+            lng = np.radians([h["lng"] for h in hotspots])[:, None]
+            if len(prev_counts):
+                dist = _haversine(lat, lng, prev_lat[None, :], prev_lng[None, :])
+                nearest = dist.argmin(axis=1)
+                matched = dist[np.arange(len(hotspots)), nearest] <= 2 * _eps()
+            else:
+                nearest = np.zeros(len(hotspots), dtype=int)
+                matched = np.zeros(len(hotspots), dtype=bool)
+            for i, h in enumerate(hotspots):
+                if not matched[i]:
+                    trends[i] = "increasing"
+                elif h["complaints"] > prev_counts[nearest[i]]:
+                    trends[i] = "increasing"
+                elif h["complaints"] < prev_counts[nearest[i]]:
+                    trends[i] = "decreasing"
+        return [{**h, "trend": t} for h, t in zip(hotspots, trends)]
+
+    def hotspots(self, zone: Optional[str] = None, limit: int = 5) -> List[dict]:
+        """
+        Top hotspots by complaint count for a zone (or city-wide, merging
+        every zone's clusters), re-clustering only zones that changed.
+        """
+        with self._lock:
+            zones = [zone.upper()] if zone else list(self._state.keys())
+            dirty = [z for z in zones if z in self._state and self._state[z].dirty]
+        for z in dirty:
+            self._refresh(z)
+
+        result = []
+        with self._lock:
+            for z in zones:
+                if z in self._state:
+                    result.extend(self._with_trends(z, self._state[z].hotspots))
+
+        top = sorted(result, key=lambda h: h["complaints"], reverse=True)[:limit]
+        return [{"id": i + 1, **h} for i, h in enumerate(top)]
+
+
+engine = HotspotEngine()
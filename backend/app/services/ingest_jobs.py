@@ -0,0 +1,214 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from .. import data_access
+from ..config import settings
+from ..data_access import ingest_job_records
+from . import rag_service
+
+# Ingestion runs on a small, fixed pool so no more than INGEST_MAX_WORKERS
+# jobs embed and write at once. The pool threads mostly wait on the embedding
+# model (which releases the GIL) and Supabase; pypdf parsing is pure Python
+# and would hold the GIL against the voice webhook's event loop, so each job
+# parses its PDF in a child process (chunker.iter_pdf_chunks_in_process).
+_executor = ThreadPoolExecutor(
+    max_workers=settings.INGEST_MAX_WORKERS,
+    thread_name_prefix="ingest"
+)
+
+# Jobs started by this process; every state change is also written to the
+# ingest_jobs table so that other workers can answer for them
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+def _pending_count() -> int:
+    return sum(1 for job in _jobs.values() if job["status"] in ("queued", "running"))
+
+
+def _prune_history():
+    # Drop the oldest finished jobs once the history limit is exceeded
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in ("success", "error")]
+    overflow = len(_jobs) - settings.INGEST_JOB_HISTORY
+    for job_id in finished[:max(overflow, 0)]:
+        del _jobs[job_id]
+
+
+# Keys of a job record that are stored; anything else is process-local
+RECORD_FIELDS = (
+    "job_id", "filename", "description", "status", "created_at",
+    "started_at", "finished_at", "progress", "result", "error",
+)
+
+
+def _record(job: dict) -> dict:
+    record = {field: job[field] for field in RECORD_FIELDS}
+    record["progress"] = dict(record["progress"])
+    return record
+
+
+def _persist(job: dict):
+    # Writes the job's current state; failures only cost other workers'
+    # visibility of the job
+    with _lock:
+        row = _record(job)
+    try:
+        ingest_job_records.upsert(row)
+    except Exception as e:
+        print(f"⚠️ Could not save ingest job {job['job_id']}: {e}")
+
+
+def submit_job(file_bytes: bytes, filename: str, description: str = "", metadata: dict = None,
+               doc_id: str = None, replace: bool = False) -> dict:
+    """
+    Spools the upload to disk and queues it for background ingestion.
+    `doc_id` / `replace` make it a revision (see rag_service.ingest_document).
+    Returns a snapshot of the new job record.
+    """
+    fd, spool_path = tempfile.mkstemp(prefix="ingest_", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_bytes)
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "filename": filename,
+        "description": description,
+        "status": "queued",
+        "created_at": datetime.now().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {
+            "pages_total": 0,
+            "pages_parsed": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "chunks_stored": 0,
+            "chunks_reused": 0,
+            "chunks_retired": 0,
+        },
+        "result": None,
+        "error": None,
+        "_saved": None,
+        "_saved_at": 0.0,
+    }
+
+    with _lock:
+        if _pending_count() >= settings.INGEST_MAX_PENDING:
+            os.remove(spool_path)
+            raise IngestQueueFull(f"Ingestion queue is full ({settings.INGEST_MAX_PENDING} pending jobs)")
+        _jobs[job_id] = job
+        _prune_history()
+        snapshot = _snapshot(job)
+
+    # Saved off the event loop; the job's own writes wait for this one
+    job["_saved"] = data_access.submit(_persist, job)
+    _executor.submit(_run_job, job_id, spool_path, filename, description, metadata, doc_id, replace)
+    return snapshot
+
+
+def _run_job(job_id: str, spool_path: str, filename: str, description: str, metadata: Optional[dict],
+             doc_id: Optional[str] = None, replace: bool = False):
+    job = _jobs[job_id]
+
+    def progress(**counters):
+        with _lock:
+            job["progress"].update(counters)
+            due = time.monotonic() - job["_saved_at"] >= settings.INGEST_JOB_SYNC_SECONDS
+            if due:
+                job["_saved_at"] = time.monotonic()
+        if due:
+            _persist(job)
+
+    try:
+        job["_saved"].result()
+    except Exception:
+        pass
+    with _lock:
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        job["_saved_at"] = time.monotonic()
+    _persist(job)
+
+    try:
+        with open(spool_path, "rb") as f:
+            file_bytes = f.read()
+
+        result = rag_service.ingest_document(
+            file_bytes=file_bytes,
+            filename=filename,
+            description=description,
+            metadata=metadata,
+            progress=progress,
+            pdf_path=spool_path,
+            doc_id=doc_id,
+            replace=replace
+        )
+
+        with _lock:
+            job["result"] = result
+            if result.get("status") == "error":
+                job["status"] = "error"
+                job["error"] = result.get("message")
+            else:
+                job["status"] = "success"
+    except Exception as e:
+        print(f"❌ Ingest job {job_id} failed: {e}")
+        with _lock:
+            job["status"] = "error"
+            job["error"] = str(e)
+    finally:
+        with _lock:
+            job["finished_at"] = datetime.now().isoformat()
+        _persist(job)
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
+
+
+def _snapshot(job: dict) -> dict:
+    return _record(job)
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """
+    A job started by any worker: this process's copy if it ran the job,
+    the ingest_jobs table otherwise.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            return _snapshot(job)
+    try:
+        return ingest_job_records.get(job_id)
+    except Exception as e:
+        print(f"⚠️ Could not read ingest job {job_id}: {e}")
+        return None
+
+
+def list_jobs(limit: int = 50) -> list:
+    """
+    Latest jobs of all workers, newest first. Falls back to this process's
+    jobs if the table can't be read.
+    """
+    with _lock:
+        local = {job_id: _snapshot(job) for job_id, job in _jobs.items()}
+    try:
+        rows = {row["job_id"]: row for row in ingest_job_records.recent(limit)}
+    except Exception as e:
+        print(f"⚠️ Could not list ingest jobs: {e}")
+        rows = {}
+    merged = {**rows, **local}
+    return sorted(merged.values(), key=lambda job: str(job.get("created_at") or ""), reverse=True)[:limit]
@@ -0,0 +1,161 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+from ..config import settings
+
+# Latency buckets in seconds: sub-millisecond in-memory work up to slow
+# model loads and provider calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels: Tuple, value) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. Each label set keeps per-bucket counts (the
+    last slot is +Inf), a sum and a count; buckets are made cumulative only
+    when rendered, so observe() is a bisect and three additions.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        if not settings.METRICS_ENABLED:
+            return
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def _samples(self, labels: Tuple, series) -> List[str]:
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "Time to response start by route template.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.", ("method",))
+
+# Dependencies
+supabase_duration = Histogram("supabase_request_duration_seconds", "Supabase round trips by operation.", ("operation",))
+supabase_errors = Counter("supabase_errors_total", "Supabase calls that raised, by operation.", ("operation",))
+embedding_duration = Histogram("embedding_duration_seconds", "Sentence-transformer encode calls.", ("kind",))
+embedding_texts = Counter("embedding_texts_total", "Texts encoded.", ("kind",))
+pdf_parse_duration = Histogram("pdf_parse_duration_seconds", "PdfReader parsing and text extraction per document.")
+dbscan_duration = Histogram("dbscan_duration_seconds", "Hotspot clustering runs (neighbour graph plus DBSCAN).")
+dbscan_points = Counter("dbscan_points_total", "Points clustered.")
+external_duration = Histogram("external_call_duration_seconds", "Twilio and Vapi API calls.", ("service", "outcome"))
+
+# Knowledge-base snapshot
+snapshot_searches = Counter("embedding_snapshot_searches_total", "Searches served from the local embedding snapshot after match_documents failed.", ("outcome",))
+snapshot_sync_duration = Histogram("embedding_snapshot_sync_duration_seconds", "Embedding snapshot syncs from document_chunks.")
+
+# Voice agent
+tool_calls = Counter("vapi_tool_calls_total", "vapi_webhook tool calls by function and outcome.", ("function", "outcome"))
+tool_call_duration = Histogram("vapi_tool_call_duration_seconds", "vapi_webhook tool call durations by function.", ("function",))
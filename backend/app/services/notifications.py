@@ -0,0 +1,391 @@
+import heapq
+import itertools
+import os
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from .. import data_access
+from ..config import settings
+from ..data_access import notification_records
+from .rate_limit import RateLimiter
+from . import sms_service
+
+
+class PermanentSendError(Exception):
+    """
+    A send failure that retrying cannot fix (e.g. missing credentials, an
+    invalid or unverified number).
+    """
+
+
+class TwilioTransport:
+    name = "twilio"
+
+    def send(self, to_number: str, body: str) -> str:
+        from_number = os.environ.get('TWILIO_PHONE_NUMBER')
+        client = sms_service.get_twilio_client()
+        if not client or not from_number:
+            raise PermanentSendError("Twilio credentials missing. SMS not sent.")
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            message = sms_service.create_message(client, body=body, from_=from_number, to=to_number)
+        except TwilioRestException as e:
+            # 4xx (bad number, unverified recipient, ...) fails the same way
+            # every time; only rate limiting (429) and 5xx are worth retrying
+            if e.status is not None and e.status < 500 and e.status != 429:
+                raise PermanentSendError(f"Twilio rejected the message ({e.status}, code {e.code}): {e.msg}") from e
+            raise
+        return message.sid
+
+
+class LocalTransport:
+    """
+    Stand-in transport that records messages in memory instead of sending them.
+    """
+    name = "local"
+
+    def __init__(self):
+        self.sent: List[dict] = []
+        self._lock = threading.Lock()
+
+    def send(self, to_number: str, body: str) -> str:
+        with self._lock:
+            sid = f"LOCAL{len(self.sent) + 1:06d}"
+            self.sent.append({"sid": sid, "to": to_number, "body": body, "sent_at": datetime.now().isoformat()})
+        print(f"📨 [local] SMS to {to_number}: {body!r}")
+        return sid
+
+
+# Owner tag on the outbox rows this process is sending
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class NotificationOutbox:
+    """
+    Bounded queue of outgoing SMS drained by a small pool of worker threads.
+    Enqueueing never blocks the caller; workers honour a global send rate,
+    retry transient failures with exponential backoff, and record delivery
+    status per complaint number.
+
+    Every message and status change is also written to the sms_outbox
+    table. The worker holding a message re-marks its pending rows every
+    SMS_HEARTBEAT_SECONDS; rows left unmarked for SMS_STALE_SECONDS (their
+    worker crashed or restarted) are claimed and sent by another worker.
+    Delivery is at least once: a crash between the send and its "sent"
+    write means the message goes out again.
+
+    A retry is not slept on: the message is set aside until its backoff
+    (`not_before`) has passed, so failing numbers never hold a worker.
+    """
+
+    def __init__(self, transport, workers: int, rate_per_sec: float, max_retries: int,
+                 backoff_seconds: float, queue_size: int, history: int, records=None):
+        self.transport = transport
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.history = history
+        self.records = records
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=queue_size)
+        # (not_before epoch seconds, seq, item) of messages waiting to retry
+        self._delayed: List[tuple] = []
+        self._seq = itertools.count()
+        self._limiter = RateLimiter(rate_per_sec, burst=max(int(rate_per_sec), 1))
+        self._status: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._keeper: Optional[threading.Thread] = None
+        self.counters = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0, "retries": 0, "recovered": 0}
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"sms-outbox-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def start(self):
+        """
+        Starts the workers and the thread that keeps this worker's pending
+        rows marked and takes over stale ones.
+        """
+        self._ensure_workers()
+        if self.records is None or self._keeper:
+            return
+
+        def _loop():
+            while True:
+                try:
+                    self.records.heartbeat(WORKER_ID, _now())
+                    self.recover()
+                except Exception as e:
+                    print(f"⚠️ SMS outbox heartbeat failed: {e}")
+                time.sleep(settings.SMS_HEARTBEAT_SECONDS)
+
+        self._keeper = threading.Thread(target=_loop, name="sms-outbox-keeper", daemon=True)
+        self._keeper.start()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _record(self, key: str, **fields) -> dict:
+        with self._lock:
+            entry = self._status.setdefault(key, {"complaint_number": key, "attempts": 0})
+            entry.update(fields, updated_at=_now())
+            self._status.move_to_end(key)
+            while len(self._status) > self.history:
+                self._status.popitem(last=False)
+            return dict(entry)
+
+    def _persist(self, key: str, data: dict, insert: dict = None):
+        # Status writes are best-effort: a failure costs other workers'
+        # view of the message (and its recovery after a crash), not the send
+        if self.records is None:
+            return
+        try:
+            if insert is not None:
+                self.records.upsert({**insert, **data, "complaint_number": key})
+            else:
+                self.records.update(key, data)
+        except Exception as e:
+            print(f"⚠️ Could not save SMS status for {key}: {e}")
+
+    def _save(self, key: str, **fields):
+        entry = self._record(key, **fields)
+        self._persist(key, {**fields, "updated_at": entry["updated_at"], "heartbeat_at": entry["updated_at"]})
+
+    def enqueue(self, key: str, to_number: str, body: str) -> bool:
+        """
+        Queues a message and returns immediately. Returns False if the outbox
+        is full and the message was dropped.
+        """
+        self._ensure_workers()
+        # Record before queueing so a fast worker's "sent" is never overwritten
+        entry = self._record(key, status="queued", to=to_number, transport=self.transport.name, error=None)
+        row = {
+            "to_number": to_number, "body": body, "status": "queued", "attempts": 0, "error": None,
+            "sid": None, "transport": self.transport.name, "not_before": None, "owner": WORKER_ID,
+            "created_at": entry["updated_at"], "updated_at": entry["updated_at"], "heartbeat_at": entry["updated_at"],
+        }
+        item = {"key": key, "to": to_number, "body": body, "attempt": 0}
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            print(f"❌ SMS outbox full, dropping notification for {key}")
+            entry = self._record(key, status="dropped", error="outbox full")
+            data_access.submit(self._persist, key, {"status": "dropped", "error": "outbox full"}, row)
+            self._count("dropped")
+            return False
+        # Saved off the caller's thread (often the event loop); the worker
+        # waits for this write before writing the message's next status
+        item["_saved"] = data_access.submit(self._persist, key, {}, row)
+        self._count("queued")
+        return True
+
+    def recover(self, limit: int = 100) -> int:
+        """
+        Claims pending messages whose worker stopped marking them and queues
+        them here. Returns the number claimed.
+        """
+        before = (datetime.now(timezone.utc) - timedelta(seconds=settings.SMS_STALE_SECONDS)).isoformat()
+        claimed = 0
+        for row in self.records.stale(before, limit):
+            key = row["complaint_number"]
+            if self._queue.full():
+                break
+            now = _now()
+            won = self.records.update(
+                key,
+                {"owner": WORKER_ID, "heartbeat_at": now, "updated_at": now},
+                expected={"owner": row.get("owner"), "heartbeat_at": row.get("heartbeat_at")},
+            )
+            if not won:
+                continue  # another worker claimed it first
+            item = {"key": key, "to": row.get("to_number"), "body": row.get("body") or "", "attempt": row.get("attempts") or 0}
+            self._record(key, status=row["status"], to=item["to"], attempts=item["attempt"],
+                         transport=self.transport.name, error=row.get("error"))
+            due = _epoch(row.get("not_before"))
+            if due > time.time():
+                with self._lock:
+                    heapq.heappush(self._delayed, (due, next(self._seq), item))
+            else:
+                self._queue.put_nowait(item)
+            claimed += 1
+            self._count("recovered")
+        if claimed:
+            self._ensure_workers()
+            print(f"📨 Took over {claimed} pending SMS from stopped workers")
+        return claimed
+
+    def _promote_due(self):
+        # Moves messages whose backoff has passed back onto the queue
+        now = time.time()
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                try:
+                    self._queue.put_nowait(self._delayed[0][2])
+                except queue.Full:
+                    return
+                heapq.heappop(self._delayed)
+
+    def _worker(self):
+        while True:
+            self._promote_due()
+            try:
+                item = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                self._deliver(item)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, item: dict):
+        key = item["key"]
+        saved = item.pop("_saved", None)
+        if saved is not None:
+            try:
+                saved.result()
+            except Exception:
+                pass
+        item["attempt"] += 1
+        self._limiter.acquire()
+        try:
+            sid = self.transport.send(item["to"], item["body"])
+            self._save(key, status="sent", sid=sid, attempts=item["attempt"], error=None, not_before=None)
+            self._count("sent")
+            print(f"✅ SMS sent for {key}: {sid}")
+            return
+        except PermanentSendError as e:
+            error, retry = str(e), False
+        except Exception as e:
+            error, retry = str(e), item["attempt"] <= self.max_retries
+
+        if not retry:
+            self._save(key, status="failed", attempts=item["attempt"], error=error, not_before=None)
+            self._count("failed")
+            print(f"❌ Failed to send SMS for {key}: {error}")
+            return
+
+        due = time.time() + self.backoff_seconds * (2 ** (item["attempt"] - 1))
+        self._save(key, status="retrying", attempts=item["attempt"], error=error,
+                   not_before=datetime.fromtimestamp(due, timezone.utc).isoformat())
+        self._count("retries")
+        with self._lock:
+            heapq.heappush(self._delayed, (due, next(self._seq), item))
+
+    def status(self, key: str) -> Optional[dict]:
+        """
+        Delivery status of a message queued by any worker.
+        """
+        with self._lock:
+            entry = self._status.get(key)
+            if entry:
+                return dict(entry)
+        if self.records is None:
+            return None
+        try:
+            row = self.records.get(key)
+        except Exception as e:
+            print(f"⚠️ Could not read SMS status for {key}: {e}")
+            return None
+        if not row:
+            return None
+        return {
+            "complaint_number": key,
+            "status": row.get("status"),
+            "attempts": row.get("attempts") or 0,
+            "to": row.get("to_number"),
+            "transport": row.get("transport"),
+            "sid": row.get("sid"),
+            "error": row.get("error"),
+            "updated_at": row.get("updated_at"),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            delayed = len(self._delayed)
+        return {
+            "transport": self.transport.name,
+            "workers": self.workers,
+            "pending": self._queue.qsize() + delayed,
+            "waiting_to_retry": delayed,
+            **counters,
+        }
+
+    def drain(self, timeout: float = None) -> bool:
+        """
+        Waits until every queued message has been handled, retries
+        included. Intended for tests and shutdown.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks or self._delayed:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+def _epoch(value) -> float:
+    if not value:
+        return 0.0
+    try:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _build_transport():
+    if settings.SMS_TRANSPORT == "local":
+        return LocalTransport()
+    return TwilioTransport()
+
+
+outbox = NotificationOutbox(
+    transport=_build_transport(),
+    workers=settings.SMS_WORKERS,
+    rate_per_sec=settings.SMS_RATE_PER_SEC,
+    max_retries=settings.SMS_MAX_RETRIES,
+    backoff_seconds=settings.SMS_RETRY_BACKOFF,
+    queue_size=settings.SMS_QUEUE_SIZE,
+    history=settings.SMS_STATUS_HISTORY,
+    records=notification_records,
+)
+
+
+def enqueue_complaint_sms(to_number: str, complaint_number: str, category: str) -> bool:
+    """
+    Queues the "complaint registered" SMS for a new ticket.
+    Like send_complaint_sms, it is delivered to the demo recipient for the trial.
+    """
+    return outbox.enqueue(complaint_number, sms_service.DEMO_RECIPIENT, sms_service.complaint_sms_body(complaint_number, category))
+
+
+def enqueue_complaint_failed_sms(to_number: str, key: str, category: str) -> bool:
+    """
+    Queues the apology SMS for a complaint the caller was told would be
+    registered but whose insert failed.
+    """
+    return outbox.enqueue(key, sms_service.DEMO_RECIPIENT, sms_service.complaint_failed_sms_body(category))
+
+
+def delivery_status(complaint_number: str) -> Optional[dict]:
+    return outbox.status(complaint_number)
@@ -1,69 +1,235 @@
+import hashlib
 import io
+import random
+import re
 import time
-from typing import List
+from typing import Callable, Dict, Iterator, List
 from pypdf import PdfReader
-from sentence_transformers import SentenceTransformer
-from ..database import supabase
+import threading
+from ..config import settings
+from ..data_access import document_chunks, document_storage
+from . import chunker, document_catalog, embedding_snapshot, metrics, response_cache, vector_index
+from .cache import TTLCache
 
-# Load a lightweight model for embeddings
+# Lightweight embedding model, loaded on first use (or by the startup warm-up)
+# so importing this module does not pay for torch and the model weights.
 # This will download the model on the first run
-model = SentenceTransformer('all-MiniLM-L6-v2')
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer('all-MiniLM-L6-v2')
+    return _model
+
+# Callers ask the same few questions over and over, so query embeddings are
+# cached by normalised text and search results by (embedding, threshold, count).
+# Result entries are dropped whenever new chunks are stored.
+query_embedding_cache = TTLCache(settings.RAG_EMBED_CACHE_SIZE, settings.RAG_EMBED_CACHE_TTL, name="query_embeddings")
+search_result_cache = TTLCache(settings.RAG_RESULT_CACHE_SIZE, settings.RAG_RESULT_CACHE_TTL, name="search_results")
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (text or "").lower())).strip()
+
+def _embedding_key(embedding: List[float]) -> str:
+    return hashlib.blake2b(repr(embedding).encode(), digest_size=16).hexdigest()
+
+def get_query_embedding(query: str) -> List[float]:
+    """
+    Returns the embedding for a search query, served from cache when possible.
+    """
+    return query_embedding_cache.get_or_set(normalize_query(query), lambda: generate_embedding(query))
+
+_search_generation = 0
+
+def invalidate_search_cache():
+    # Bumping the generation also stops searches already in flight from
+    # caching results computed before the write.
+    global _search_generation
+    _search_generation += 1
+    search_result_cache.clear()
+    response_cache.cache.invalidate("documents")
+
+def cache_stats() -> dict:
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "search_results": search_result_cache.stats(),
+    }
 
 def generate_embedding(text: str) -> List[float]:
     """
     Generates a version vector embedding for the given text.
     """
-    return model.encode(text).tolist()
+    model = get_model()
+    with metrics.embedding_duration.time("single"):
+        vector = model.encode(text).tolist()
+    metrics.embedding_texts.inc("single")
+    return vector
+
+def generate_embeddings(texts: List[str], batch_size: int = None) -> List[List[float]]:
+    """
+    Encodes a list of texts in batched forward passes.
+    """
+    if not texts:
+        return []
+    batch_size = batch_size or settings.RAG_EMBED_BATCH_SIZE
+    model = get_model()
+    with metrics.embedding_duration.time("batch"):
+        vectors = model.encode(texts, batch_size=batch_size).tolist()
+    metrics.embedding_texts.inc("batch", amount=len(texts))
+    return vectors
+
+def insert_chunk_rows(rows: List[dict], retries: int = None) -> List[dict]:
+    """
+    Bulk inserts chunk rows in a single round trip, retrying with backoff.
+    Returns the sent rows with their database ids filled in.
+    Raises the last error if every attempt fails.
+    """
+    retries = retries if retries is not None else settings.RAG_INSERT_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            saved = document_chunks.insert_many(rows)
+            return [{**row, "id": saved_row.get("id")} for row, saved_row in zip(rows, saved)]
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = 0.5 * (2 ** attempt)
+            print(f"⚠️ Chunk insert failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
 
 import uuid
 from datetime import datetime
 
 # ... existing code ...
 
-def ingest_document(file_bytes: bytes, filename: str, description: str = "", metadata: dict = None) -> dict:
+def chunk_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def _timed(items: Iterator, timings: dict, stage: str) -> Iterator:
+    # Adds the time spent producing each item of a generator to timings[stage]
+    items = iter(items)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            timings[stage] += time.perf_counter() - t0
+            return
+        timings[stage] += time.perf_counter() - t0
+        yield item
+
+def _reusable_chunks(doc_id: str) -> Dict[str, List[dict]]:
+    """
+    Chunks (id, content, metadata) of a stored document, grouped by
+    content hash.
+    """
+    pool: Dict[str, List[dict]] = {}
+    for row in document_chunks.for_doc(doc_id):
+        meta = row.get("metadata") or {}
+        digest = meta.get("content_hash") or chunk_hash(row.get("content") or "")
+        pool.setdefault(digest, []).append(row)
+    return pool
+
+def ingest_document(
+    file_bytes: bytes,
+    filename: str,
+    description: str = "",
+    metadata: dict = None,
+    embed_batch_size: int = None,
+    insert_batch_size: int = None,
+    progress: Callable[..., None] = None,
+    pdf_path: str = None,
+    doc_id: str = None,
+    replace: bool = False,
+) -> dict:
     """
     Parses a PDF, chunks the text, vectors it, and stores in Supabase.
+    Pages are streamed through chunker.iter_chunks (sentence- and
+    heading-aware, token-limited) and the chunks are embedded in batches
+    and written with bulk inserts as they come; each batch is embedded
+    once, so a retried insert never re-runs the model. When `pdf_path`
+    (the same file, on disk) is given, parsing and chunking run in a
+    separate process (INGEST_PARSE_PROCESS), off this process's GIL.
+
+    Ingestion is content-addressed. A file whose sha256 is already in the
+    document catalog is not ingested again. Revisions are explicit: with
+    `doc_id` (or `replace`, which picks the newest active document of the
+    same filename) the file replaces that document. It keeps the doc_id,
+    only chunks whose content hash is new are embedded and inserted,
+    unchanged chunks are kept (their metadata refreshed), and chunks no
+    longer in the file are deleted. A filename match alone is a new
+    document. Chunks never cross page boundaries, so an edit on one page
+    leaves the other pages' chunks unchanged.
+
+    The catalog entry is written before the previous revision's chunks are
+    retired. If the ingest fails before that write it is rolled back: the
+    chunks it inserted are deleted, reused chunks get their old metadata
+    back and the uploaded file is removed.
+
+    `progress`, if given, is called with counter keyword updates
+    (pages_total, pages_parsed, chunks_total, chunks_embedded, chunks_stored,
+    chunks_reused, chunks_retired).
     """
+    progress = progress or (lambda **counters: None)
+    embed_batch_size = embed_batch_size or settings.RAG_EMBED_BATCH_SIZE
+    insert_batch_size = insert_batch_size or settings.RAG_INSERT_BATCH_SIZE
+    timings = {"upload": 0.0, "parse": 0.0, "chunk": 0.0, "diff": 0.0, "embed": 0.0, "insert": 0.0}
+    stored_count = 0
+    # Ids inserted by this ingest, deleted again if it fails before the
+    # document is recorded in the catalog
+    inserted_ids: List = []
+    # Reused chunks as they were before this ingest rewrote their metadata
+    replaced_rows: List[dict] = []
+    uploaded_path = None
+    committed = False
+
     try:
-        doc_id = str(uuid.uuid4())
-        created_at = datetime.now().isoformat()
+        checksum = hashlib.sha256(file_bytes).hexdigest()
+        existing = document_catalog.catalog.find_checksum(checksum)
+        if existing:
+            print(f"📄 {filename} is identical to document {existing['doc_id']}, skipping ingestion")
+            return {
+                "status": "duplicate",
+                "chunks_processed": 0,
+                "filename": existing.get("filename"),
+                "description": existing.get("description"),
+                "public_url": existing.get("public_url"),
+                "doc_id": existing["doc_id"],
+                "timings_ms": {stage: 0.0 for stage in timings}
+            }
+
+        doc_type = (metadata or {}).get("type", "scheme_doc")
+        if doc_id:
+            previous = document_catalog.catalog.find_doc(doc_id)
+            if not previous:
+                return {"status": "error", "message": f"Document {doc_id} not found"}
+        elif replace:
+            previous = document_catalog.catalog.find_filename(filename, doc_type)
+        else:
+            previous = None
+        doc_id = previous["doc_id"] if previous else str(uuid.uuid4())
+        created_at = (previous or {}).get("created_at") or datetime.now().isoformat()
         
         # 1. Upload to Supabase Storage
-        file_path = f"schemes/{int(time.time())}_{filename}"
-        storage_response = supabase.storage.from_("documents").upload(
-            file_path,
-            file_bytes,
-            {"content-type": "application/pdf"}
-        )
+        t0 = time.perf_counter()
+        # Unique per upload: a rollback removes only its own file
+        file_path = f"schemes/{int(time.time())}_{uuid.uuid4().hex[:8]}_{filename}"
+        document_storage.upload(file_path, file_bytes)
+        uploaded_path = file_path
         
         # Get Public URL
-        public_url_response = supabase.storage.from_("documents").get_public_url(file_path)
-        public_url = public_url_response
-
-        # 2. Parse PDF
-        reader = PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        
-        if not text.strip():
-            return {"status": "error", "message": "No text found in PDF"}
+        public_url = document_storage.public_url(file_path)
+        timings["upload"] = time.perf_counter() - t0
+
+        # Chunks of the previous revision, by content hash
+        t0 = time.perf_counter()
+        pool = _reusable_chunks(doc_id) if previous else {}
+        timings["diff"] = time.perf_counter() - t0
 
-        # 3. Chunk Text
-        chunk_size = 1000
-        overlap = 200
-        chunks = []
-        
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += chunk_size - overlap
-            
-        # 4. Generate Embeddings & Store
-        stored_count = 0
-        
         # Common metadata for all chunks
         doc_metadata = {
             "doc_id": doc_id,
@@ -76,52 +242,278 @@ def ingest_document(file_bytes: bytes, filename: str, description: str = "", met
             **(metadata or {})
         }
 
-        for i, chunk_text in enumerate(chunks):
-            embedding = generate_embedding(chunk_text)
-            
-            row = {
-                "content": chunk_text,
+        def chunk_row(chunk_index: int, chunk, digest: str) -> dict:
+            return {
+                "content": chunk.text,
                 "metadata": {
                     **doc_metadata,
-                    "chunk_index": i
-                },
-                "embedding": embedding
+                    "chunk_index": chunk_index,
+                    "page": chunk.page,
+                    "heading": chunk.heading,
+                    "content_hash": digest
+                }
             }
-            
-            # Insert into Supabase
-            supabase.table("document_chunks").insert(row).execute()
-            stored_count += 1
-            
+
+        fresh, kept = [], []
+        embedded_count = kept_count = 0
+
+        def store_fresh():
+            # Embed one batch of new chunks and bulk insert it, N rows per round trip
+            nonlocal stored_count, embedded_count
+            t0 = time.perf_counter()
+            embeddings = generate_embeddings([row["content"] for row in fresh], batch_size=embed_batch_size)
+            timings["embed"] += time.perf_counter() - t0
+            embedded_count += len(fresh)
+            progress(chunks_embedded=embedded_count)
+
+            rows = [{**row, "embedding": embedding} for row, embedding in zip(fresh, embeddings)]
+            t0 = time.perf_counter()
+            for row_start in range(0, len(rows), insert_batch_size):
+                saved_rows = insert_chunk_rows(rows[row_start:row_start + insert_batch_size])
+                inserted_ids.extend(row["id"] for row in saved_rows if row.get("id") is not None)
+                stored_count += len(saved_rows)
+                progress(chunks_stored=stored_count)
+                invalidate_search_cache()
+                if vector_index.index.active:
+                    vector_index.index.add(saved_rows)
+            timings["insert"] += time.perf_counter() - t0
+            fresh.clear()
+
+        def store_kept():
+            # Point unchanged chunks at the new file; their embeddings stay
+            nonlocal kept_count
+            t0 = time.perf_counter()
+            document_chunks.upsert_many(kept)
+            invalidate_search_cache()
+            if vector_index.index.active:
+                vector_index.index.update_metadata(kept)
+            timings["insert"] += time.perf_counter() - t0
+            kept_count += len(kept)
+            progress(chunks_reused=kept_count)
+            kept.clear()
+
+        # 2. Stream pages out of the PDF, chunk them, and embed and store
+        # the chunks batch by batch, so memory is bounded by a page and a
+        # batch rather than the whole document
+        page_count = 0
+
+        def set_pages(total: int):
+            nonlocal page_count
+            page_count = total
+            progress(pages_total=total)
+
+        if pdf_path and settings.INGEST_PARSE_PROCESS:
+            chunks = chunker.iter_pdf_chunks_in_process(
+                pdf_path,
+                on_pages=set_pages,
+                on_parsed=lambda parsed: progress(pages_parsed=parsed),
+                timings=timings,
+                batch_size=embed_batch_size,
+            )
+        else:
+            reader = PdfReader(io.BytesIO(file_bytes))
+            set_pages(len(reader.pages))
+
+            def pages():
+                for page_no, text in chunker.iter_pages(reader):
+                    progress(pages_parsed=page_no)
+                    yield page_no, text
+
+            chunks = _timed(chunker.iter_chunks(_timed(pages(), timings, "parse")), timings, "chunk")
+
+        chunk_index = 0
+        for chunk in chunks:
+            digest = chunk_hash(chunk.text)
+            row = chunk_row(chunk_index, chunk, digest)
+            chunk_index += 1
+            progress(chunks_total=chunk_index)
+
+            reusable = pool.get(digest)
+            if reusable:
+                old = reusable.pop()
+                replaced_rows.append(old)
+                kept.append({**row, "id": old["id"]})
+                if len(kept) >= insert_batch_size:
+                    store_kept()
+            else:
+                fresh.append(row)
+                if len(fresh) >= embed_batch_size:
+                    store_fresh()
+
+        if not (pdf_path and settings.INGEST_PARSE_PROCESS):
+            # Time spent inside the page generator is counted as parse only
+            timings["chunk"] -= timings["parse"]
+        metrics.pdf_parse_duration.observe(timings["parse"])
+
+        if not chunk_index:
+            _roll_back(inserted_ids, replaced_rows, uploaded_path)
+            return {"status": "error", "message": "No text found in PDF"}
+        if fresh:
+            store_fresh()
+        if kept:
+            store_kept()
+
+        # 3. Record the document. Until this succeeds the ingest can still be
+        # rolled back; after it, the new chunks are the document's
+        timings_ms = {stage: round(sec * 1000, 1) for stage, sec in timings.items()}
+        document_catalog.catalog.record({
+            **doc_metadata,
+            "chunk_count": chunk_index,
+            "size_bytes": len(file_bytes),
+            "pages": page_count,
+            "checksum": checksum,
+            "timings_ms": timings_ms,
+            "status": "active",
+            "updated_at": datetime.now().isoformat(),
+        })
+        committed = True
+
+        # 4. Retire chunks of the previous revision that are gone
+        t0 = time.perf_counter()
+        stale = [old["id"] for rows in pool.values() for old in rows]
+        retired = _retire_chunks(stale, insert_batch_size)
+        if retired:
+            invalidate_search_cache()
+            if vector_index.index.active:
+                vector_index.index.remove(retired)
+        if len(retired) < len(stale):
+            # Left under this doc_id, so the next revision retires them
+            print(f"⚠️ {len(stale) - len(retired)} stale chunks of {doc_id} could not be deleted")
+        timings["insert"] += time.perf_counter() - t0
+        progress(chunks_retired=len(retired))
+
+        if previous:
+            print(f"📄 Revised {filename}: {stored_count} new, {kept_count} unchanged, {len(retired)} retired chunks")
+
         return {
             "status": "success", 
             "chunks_processed": stored_count,
+            "chunks_reused": kept_count,
+            "chunks_retired": len(retired),
             "filename": filename,
             "description": description,
             "public_url": public_url,
-            "doc_id": doc_id
+            "doc_id": doc_id,
+            "revision": bool(previous),
+            "timings_ms": timings_ms
         }
 
     except Exception as e:
         print(f"Ingest Error: {e}")
-        return {"status": "error", "message": str(e)}
+        if not committed:
+            _roll_back(inserted_ids, replaced_rows, uploaded_path)
+        return {
+            "status": "error",
+            "message": str(e),
+            "chunks_processed": stored_count,
+            "timings_ms": {stage: round(sec * 1000, 1) for stage, sec in timings.items()}
+        }
+
+def _retire_chunks(chunk_ids: List, batch_size: int, retries: int = None) -> List:
+    """
+    Deletes chunks batch by batch, retrying each batch with backoff.
+    Deleting by id is idempotent, so a retried batch is safe. Returns the
+    ids deleted; on a batch that keeps failing, the ids before it.
+    """
+    retries = retries if retries is not None else settings.RAG_INSERT_RETRIES
+    retired: List = []
+    for start in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[start:start + batch_size]
+        for attempt in range(retries + 1):
+            try:
+                document_chunks.delete_many(batch)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    print(f"❌ Chunk delete failed: {e}")
+                    return retired
+                delay = 0.5 * (2 ** attempt)
+                print(f"⚠️ Chunk delete failed ({e}), retrying in {delay}s...")
+                time.sleep(delay)
+        retired.extend(batch)
+    return retired
+
+def _roll_back(inserted_ids: List, replaced_rows: List[dict], uploaded_path: str = None):
+    # Undoes a failed ingest: its new chunks, the metadata it wrote over
+    # reused chunks, and its uploaded file
+    batch_size = settings.RAG_INSERT_BATCH_SIZE
+    if inserted_ids:
+        deleted = _retire_chunks(inserted_ids, batch_size)
+        print(f"🧹 Deleted {len(deleted)} of {len(inserted_ids)} chunks of the failed ingest")
+        if vector_index.index.active:
+            vector_index.index.remove(deleted)
+    if replaced_rows:
+        try:
+            for start in range(0, len(replaced_rows), batch_size):
+                document_chunks.upsert_many(replaced_rows[start:start + batch_size])
+            if vector_index.index.active:
+                vector_index.index.update_metadata(replaced_rows)
+        except Exception as e:
+            print(f"❌ Could not restore reused chunks of the failed ingest: {e}")
+    if uploaded_path:
+        try:
+            document_storage.remove([uploaded_path])
+        except Exception as e:
+            print(f"⚠️ Could not remove {uploaded_path} of the failed ingest: {e}")
+    invalidate_search_cache()
+
 
 def search_knowledge_base(query: str, match_threshold: float = 0.7, match_count: int = 5):
     """
     Searches the vector database for relevant content.
+    Uses the in-process vector index when enabled and loaded, and the
+    match_documents RPC otherwise (or if the local search fails). If the RPC
+    fails too, the on-disk embedding snapshot answers when enabled.
     """
     try:
-        query_embedding = generate_embedding(query)
-        
-        # Call the Supabase RPC function 'match_documents'
-        # Ensure this function exists in your Supabase SQL
-        response = supabase.rpc("match_documents", {
-            "query_embedding": query_embedding,
-            "match_threshold": match_threshold,
-            "match_count": match_count
-        }).execute()
-        
-        return response.data
-    
+        return search_by_embedding(query, get_query_embedding(query), match_threshold, match_count)
     except Exception as e:
         print(f"RAG Search Error: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def search_by_embedding(query: str, query_embedding: List[float], match_threshold: float = 0.7, match_count: int = 5):
+    """
+    The retrieval half of search_knowledge_base(), for callers that embed
+    the query themselves (e.g. on a separate executor). Raises on failure.
+    """
+    cache_key = (_embedding_key(query_embedding), match_threshold, match_count)
+    cached = search_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    generation = _search_generation
+    results = _search(query, query_embedding, match_threshold, match_count)
+    if generation == _search_generation:
+        search_result_cache.set(cache_key, results)
+    return results
+
+def _search(query: str, query_embedding: List[float], match_threshold: float, match_count: int) -> List[dict]:
+    if settings.VECTOR_INDEX_ENABLED:
+        if vector_index.index.ready:
+            try:
+                results = vector_index.index.search(query_embedding, match_threshold, match_count)
+                if settings.VECTOR_INDEX_VERIFY_RATE and random.random() < settings.VECTOR_INDEX_VERIFY_RATE:
+                    remote = document_chunks.match(query_embedding, match_threshold, match_count)
+                    check = vector_index.compare_results(results, remote)
+                    if not check["match"]:
+                        print(f"⚠️ Local vector index drift for '{query}': {check}")
+                return results
+            except Exception as e:
+                print(f"Local vector search failed, using RPC: {e}")
+        else:
+            vector_index.load_in_background()
+
+    try:
+        return document_chunks.match(query_embedding, match_threshold, match_count)
+    except Exception as e:
+        if not settings.EMBEDDING_SNAPSHOT_ENABLED:
+            raise
+        # Supabase is unreachable: answer from the last on-disk snapshot
+        print(f"⚠️ match_documents failed ({e}), searching the local embedding snapshot")
+        try:
+            results = embedding_snapshot.snapshot.search(query_embedding, match_threshold, match_count)
+        except Exception:
+            metrics.snapshot_searches.inc("error")
+            raise
+        metrics.snapshot_searches.inc("ok" if results else "empty")
+        return results
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` operations per second with bursts of up to
+    `burst`. A rate of 0 or less disables limiting. Usable from threads
+    (acquire) and from coroutines (acquire_async).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Takes a token and returns how long the caller must wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
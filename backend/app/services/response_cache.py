@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from ..config import settings
+from ..data_access import complaints as complaint_store
+
+# path -> (ttl seconds, invalidation tag). Only exact paths are cached.
+# Invalidation is per process: with several workers, a write made through
+# one worker leaves the others serving their entries until the TTL runs out
+# (capped by RESPONSE_CACHE_MAX_TTL), so these are the staleness each route
+# tolerates.
+CACHED_ROUTES: Dict[str, Tuple[float, str]] = {
+    "/api/dashboard-stats": (30, "complaints"),
+    "/api/activity": (15, "complaints"),
+    "/api/heatmap": (60, "complaints"),
+    "/api/hotspots": (60, "complaints"),
+    "/api/complaints": (15, "complaints"),
+    "/api/documents/schemes": (300, "documents"),
+}
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    status_code: int
+    headers: Tuple[Tuple[str, str], ...]
+    etag: str
+    tag: str
+    expires_at: float
+
+
+def uncacheable(content) -> JSONResponse:
+    """
+    A JSON response the response cache must not store, for fallbacks
+    served when the real answer could not be computed.
+    """
+    return JSONResponse(content, headers={"Cache-Control": "no-store"})
+
+
+def is_uncacheable(headers) -> bool:
+    return "no-store" in headers.get("cache-control", "")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """
+    Rendered GET responses keyed by path and sorted query string, bounded by
+    total body bytes (least recently used entries are evicted first).
+
+    Entries carry a tag ("complaints", "documents"); invalidate(tag) drops
+    them and bumps the tag's generation, so a response that was being
+    computed while the write happened is not stored afterwards.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def rule_for(path: str) -> Optional[Tuple[float, str]]:
+        rule = CACHED_ROUTES.get(path)
+        if rule is None or settings.RESPONSE_CACHE_MAX_TTL <= 0:
+            return rule
+        return min(rule[0], settings.RESPONSE_CACHE_MAX_TTL), rule[1]
+
+    @staticmethod
+    def key_for(path: str, query_items) -> str:
+        return path + "?" + "&".join(f"{k}={v}" for k, v in sorted(query_items))
+
+    def generation(self, tag: str) -> int:
+        with self._lock:
+            return self._generations[tag]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at <= time.time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, entry: CachedResponse, generation: int) -> bool:
+        if len(entry.body) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            if self._generations[entry.tag] != generation:
+                return False
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            return True
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= len(entry.body)
+
+    def invalidate(self, tag: str):
+        with self._lock:
+            self._generations[tag] += 1
+            for key in [k for k, e in self._entries.items() if e.tag == tag]:
+                self._drop(key)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_MAX_ENTRY_BYTES)
+
+
+def _on_complaint_written(event: str, row: dict, changed: frozenset):
+    # Imports invalidate once per inserted batch (complaint_import), not
+    # once per row
+    if event != "imported":
+        cache.invalidate("complaints")
+
+
+# After the rollup, heatmap and hotspot views have applied the write, so a
+# response rebuilt right after the invalidation already sees it
+complaint_store.subscribe(_on_complaint_written, last=True)
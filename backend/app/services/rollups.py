@@ -0,0 +1,122 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from ..config import settings
+from .complaint_views import ComplaintView
+
+ALL_ZONES = "*"
+CLOSED_STATUSES = ("resolved", "closed", "rejected")
+ROLLUP_COLUMNS = "id,zone,status,assigned_to,created_at,resolved_at"
+
+
+class _Record(NamedTuple):
+    zone: str
+    status: str
+    assigned_to: Optional[str]
+    created_day: Optional[str]
+    resolved_day: Optional[str]
+    resolution_hours: Optional[float]
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _record(row: dict) -> _Record:
+    created = _parse_ts(row.get("created_at"))
+    resolved = _parse_ts(row.get("resolved_at"))
+    status = row.get("status") or "Open"
+    hours = None
+    if created and resolved and status.lower() == "resolved":
+        hours = max((resolved - created).total_seconds() / 3600, 0.0)
+    return _Record(
+        zone=(row.get("zone") or "").upper(),
+        status=status,
+        assigned_to=row.get("assigned_to"),
+        created_day=created.date().isoformat() if created else None,
+        resolved_day=resolved.date().isoformat() if resolved and status.lower() == "resolved" else None,
+        resolution_hours=hours,
+    )
+
+
+class _ZoneRollup:
+    def __init__(self):
+        self.total = 0
+        self.by_status = Counter()
+        self.created_by_day = Counter()
+        self.resolved_by_day = Counter()
+        self.resolution_hours_sum = 0.0
+        self.resolution_count = 0
+        self.open_assignments = Counter()
+
+    def apply(self, rec: _Record, sign: int):
+        self.total += sign
+        self.by_status[rec.status] += sign
+        if rec.created_day:
+            self.created_by_day[rec.created_day] += sign
+        if rec.resolved_day:
+            self.resolved_by_day[rec.resolved_day] += sign
+        if rec.resolution_hours is not None:
+            self.resolution_hours_sum += sign * rec.resolution_hours
+            self.resolution_count += sign
+        if rec.assigned_to and rec.status.lower() not in CLOSED_STATUSES:
+            self.open_assignments[rec.assigned_to] += sign
+            if self.open_assignments[rec.assigned_to] <= 0:
+                del self.open_assignments[rec.assigned_to]
+
+
+class RollupEngine(ComplaintView):
+    """
+    In-memory per-zone complaint aggregates for the dashboard, kept current
+    from the complaint write paths and periodically reconciled.
+    """
+
+    name = "Dashboard rollups"
+    columns = ROLLUP_COLUMNS
+
+    def record(self, row: dict) -> _Record:
+        return _record(row)
+
+    def _empty_state(self):
+        return defaultdict(_ZoneRollup)
+
+    def _add(self, state, rec: _Record, sign: int):
+        state[rec.zone].apply(rec, sign)
+        state[ALL_ZONES].apply(rec, sign)
+
+    def start(self):
+        super().start(settings.ROLLUP_RECONCILE_SECONDS)
+
+    @staticmethod
+    def _trend(today: int, yesterday: int) -> int:
+        if not yesterday:
+            return 100 if today else 0
+        return round((today - yesterday) * 100 / yesterday)
+
+    def stats(self, zone: Optional[str] = None) -> dict:
+        key = zone.upper() if zone else ALL_ZONES
+        today = date.today()
+        today_key = today.isoformat()
+        yesterday_key = (today - timedelta(days=1)).isoformat()
+
+        with self._lock:
+            z = self._state.get(key) or _ZoneRollup()
+            avg_hours = z.resolution_hours_sum / z.resolution_count if z.resolution_count else 0
+            return {
+                "total_complaints": z.total,
+                "resolved": z.resolved_by_day.get(today_key, 0),
+                "avg_resolution_hours": round(avg_hours, 1),
+                "active_agents": len(z.open_assignments),
+                "complaint_trend": self._trend(z.created_by_day.get(today_key, 0), z.created_by_day.get(yesterday_key, 0)),
+                "resolution_trend": self._trend(z.resolved_by_day.get(today_key, 0), z.resolved_by_day.get(yesterday_key, 0)),
+                "by_status": {status: n for status, n in z.by_status.items() if n},
+            }
+
+
+engine = RollupEngine()
@@ -1,40 +1,88 @@
 import os
+import threading
+import time
 from twilio.rest import Client
 
+from . import metrics
+
+# HARDCODED DEMO NUMBER as requested by user for the trial
+# "use my number which is in twilio 8287992338"
+# We will override the recipient to ensure they get it during the demo
+DEMO_RECIPIENT = "+918287992338"
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_twilio_client():
+    """
+    Returns the process-wide Twilio client, creating it on first use.
+    Returns None when credentials are not configured.
+    """
+    global _client
+    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
+    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
+    if not all([account_sid, auth_token]):
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Client(account_sid, auth_token)
+    return _client
+
+def create_message(client, body: str, from_: str, to: str):
+    """
+    Sends one SMS through the Twilio client, timed in the external call metrics.
+    """
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        message = client.messages.create(body=body, from_=from_, to=to)
+        outcome = "ok"
+        return message
+    finally:
+        metrics.external_duration.observe(time.perf_counter() - t0, "twilio", outcome)
+
+def complaint_sms_body(complaint_number: str, category: str) -> str:
+    return (
+        f"🔔 MCD Sahayak Update\n"
+        f"Complaint Registered: {complaint_number}\n"
+        f"Category: {category}\n"
+        f"We have received your grievance and it is being processed."
+    )
+
+def complaint_failed_sms_body(category: str) -> str:
+    return (
+        f"🔔 MCD Sahayak Update\n"
+        f"Sorry, we could not register your {category} complaint due to a technical problem.\n"
+        f"Please call us again to log it."
+    )
+
+def normalize_phone(to_number: str) -> str:
+    # Ensure E.164 format (default to India +91 if missing)
+    if not to_number.startswith('+'):
+        return f"+91{to_number}"
+    return to_number
+
 def send_complaint_sms(to_number: str, complaint_number: str, category: str):
     """
     Sends an SMS notification about a logged complaint.
-    Defaults to the environment variable TWILIO_PHONE_NUMBER if to_number is not provided or valid? 
+    Defaults to the environment variable TWILIO_PHONE_NUMBER if to_number is not provided or valid?
     Actually, for this demo, we will force send to the specific number requested by the user
     if they provided one, or just trust the to_number passed in if it's the user's number.
-    
+
     The user said: "send sms to a number... use my number... 8287992338"
     """
-    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
     from_number = os.environ.get('TWILIO_PHONE_NUMBER')
-    
-    # HARDCODED DEMO NUMBER as requested by user for the trial
-    # "use my number which is in twilio 8287992338"
-    # We will override the recipient to ensure they get it during the demo
-    DEMO_RECIPIENT = "+918287992338" 
+    client = get_twilio_client()
 
-    if not all([account_sid, auth_token, from_number]):
+    if not client or not from_number:
         print("Twilio credentials missing. SMS not sent.")
         return
 
     try:
-        client = Client(account_sid, auth_token)
-        
-        body_text = (
-            f"🔔 MCD Sahayak Update\n"
-            f"Complaint Registered: {complaint_number}\n"
-            f"Category: {category}\n"
-            f"We have received your grievance and it is being processed."
-        )
-
-        message = client.messages.create(
-            body=body_text,
+        message = create_message(
+            client,
+            body=complaint_sms_body(complaint_number, category),
             from_=from_number,
             to=DEMO_RECIPIENT # Sending to the user's number for the trial
         )
@@ -48,32 +96,24 @@ def send_broadcast_sms(to_number: str, message_body: str):
     """
     Sends a generic broadcast SMS.
     Returns: (success: bool, message: str)
+    Logs nothing per message: campaigns call this once per recipient and
+    report their counts when they finish.
     """
-    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
     from_number = os.environ.get('TWILIO_PHONE_NUMBER')
-    
-    if not all([account_sid, auth_token, from_number]):
-        msg = "Twilio credentials missing. SMS not sent."
-        print(msg)
-        return False, msg
+    client = get_twilio_client()
 
-    # Ensure E.164 format (default to India +91 if missing)
-    if not to_number.startswith('+'):
-        to_number = f"+91{to_number}"
+    if not client or not from_number:
+        return False, "Twilio credentials missing. SMS not sent."
+
+    to_number = normalize_phone(to_number)
 
     try:
-        client = Client(account_sid, auth_token)
-        
-        message = client.messages.create(
+        message = create_message(
+            client,
             body=message_body,
             from_=from_number,
             to=to_number
         )
-        msg = f"✅ Broadcast SMS sent to {to_number}: {message.sid}"
-        print(msg)
-        return True, msg
+        return True, f"✅ Broadcast SMS sent to {to_number}: {message.sid}"
     except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Failed to send Broadcast SMS: {error_msg}")
-        return False, error_msg
+        return False, str(e)
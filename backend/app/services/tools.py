@@ -1,20 +1,72 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
 
-DELHI_ZONES = {
-    "ROHINI": {"coords": (28.7041, 77.1025), "areas": ["rohini", "pitampura"]},
-    "SOUTH": {"coords": (28.5494, 77.2001), "areas": ["saket", "hauz khas"]},
-    "CENTRAL": {"coords": (28.6448, 77.2115), "areas": ["karol bagh", "paharganj"]},
-    "WEST": {"coords": (28.6219, 77.0878), "areas": ["janakpuri", "dwarka"]}
-}
+from ..config import settings
+from .gazetteer import Place, gazetteer
+from .wards import wards
 
+@lru_cache(maxsize=settings.GAZETTEER_CACHE_SIZE)
 def detect_zone_and_coords(text: str):
-    text = text.lower() if text else ""
-    for zone, data in DELHI_ZONES.items():
-        for area in data["areas"]:
-            if area in text: return zone, data["coords"]
-    return "CENTRAL", (28.6139, 77.2090)
+    """
+    Zone and coordinates for a free-text location, from the MCD gazetteer.
+    Unknown locations fall back to the gazetteer default (CENTRAL).
+    """
+    return gazetteer.detect(text)
 
-def calculate_sla(category: str):
+@lru_cache(maxsize=settings.GAZETTEER_CACHE_SIZE)
+def match_place(text: str) -> Optional[Place]:
+    """
+    The gazetteer locality or landmark named in `text`, or None. Zone-level
+    matches don't count: a zone's centre says nothing about the ward.
+    """
+    place = gazetteer.lookup(text)
+    return place if place and place.kind != "zone" else None
+
+def ward_zone(ward, text_zone: str) -> str:
+    """
+    The zone to store for a complaint in `ward`. The ward's zone only wins
+    over the text match when the ward boundaries are real (WARDS_AUTHORITATIVE).
+    """
+    return ward.zone if ward and settings.WARDS_AUTHORITATIVE else text_zone
+
+def resolve_location(text: str, lat: float = None, lng: float = None) -> dict:
+    """
+    Zone, ward and coordinates for a complaint. Known coordinates are kept
+    and placed in a ward directly; otherwise the gazetteer's coordinates for
+    the text are used. A location the gazetteer can't place more precisely
+    than a zone, without coordinates, gets no ward.
+    """
+    zone, (text_lat, text_lng) = detect_zone_and_coords(text)
+    located = lat is not None and lng is not None
+    if not located:
+        lat, lng = text_lat, text_lng
+        located = match_place(text) is not None
+    lat, lng = float(lat), float(lng)
+    ward = wards.locate(lat, lng) if located else None
+    return {
+        "zone": ward_zone(ward, zone),
+        "ward": ward.name if ward else None,
+        "latitude": lat,
+        "longitude": lng,
+    }
+
+def detect_zones(texts):
+    """
+    detect_zone_and_coords over a batch; each distinct text is matched once.
+    """
+    matches = {text: detect_zone_and_coords(text) for text in set(texts)}
+    return [matches[text] for text in texts]
+
+def calculate_sla(category: str, now: datetime = None):
     hours = 24 if "clean" in category.lower() else 48
-    deadline = (datetime.now() + timedelta(hours=hours)).isoformat()
-    return hours, deadline
\ No newline at end of file
+    deadline = ((now or datetime.now()) + timedelta(hours=hours)).isoformat()
+    return hours, deadline
+
+def calculate_slas(categories, now: datetime = None):
+    """
+    calculate_sla over a batch, against one shared `now`.
+    """
+    now = now or datetime.now()
+    slas = {category: calculate_sla(category, now) for category in set(categories)}
+    return [slas[category] for category in categories]
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+import time
+from typing import Optional, Tuple
+
+import httpx
+
+from . import metrics
+from .sms_service import normalize_phone
+
+VAPI_CALL_URL = "https://api.vapi.ai/call"
+
+# One pooled client per process for every outbound Vapi request
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=10.0)
+    return _http_client
+
+
+def vapi_configured() -> bool:
+    return bool(os.environ.get("VAPI_PRIVATE_KEY") and os.environ.get("VAPI_PHONE_NUMBER_ID"))
+
+
+def build_call_payload(phone: str, message: str) -> dict:
+    vapi_phone_id = os.environ.get("VAPI_PHONE_NUMBER_ID")
+    vapi_assistant_id = os.environ.get("VAPI_ASSISTANT_ID")
+
+    # Ensure E.164 format for Voice Calls (default to India +91)
+    phone_number = normalize_phone(phone)
+
+    # Prepare the buffer message to handle Twilio Trial overlap
+    # Using a professional intro as a buffer. "Namaste" + Intro is ~4-5 seconds.
+    # This is better than "..." which might be ignored by some TTS engines.
+    safe_message = f"Namaste. This is an official call from the Municipal Corporation of Delhi. {message}"
+
+    # If assistant ID is missing, we use a transient assistant config
+    assistant_config = {
+        "firstMessageMode": "assistant-speaks-first",
+        "firstMessage": safe_message,
+        "systemPrompt": "You are a helpful MCD officer. You just broadcasted a message to this citizen. Answer any questions they have about it or other MCD services politely and concisely in Hinglish.",
+        "voice": {
+            "provider": "11labs",
+            "voiceId": "sarah",
+        },
+        "model": {
+            "provider": "openai",
+            "model": "gpt-4-turbo",
+        }
+    }
+
+    # If we have an assistant ID, we can use it but override the first message
+    payload = {
+        "phoneNumberId": vapi_phone_id,
+        "customer": {
+            "number": phone_number
+        },
+    }
+
+    if vapi_assistant_id:
+        payload["assistantId"] = vapi_assistant_id
+        payload["assistantOverrides"] = {
+            "firstMessageMode": "assistant-speaks-first",
+            "firstMessage": safe_message,
+        }
+    else:
+        payload["assistant"] = assistant_config
+
+    return payload
+
+
+async def place_call(phone: str, message: str) -> Tuple[int, dict, str]:
+    """
+    Starts an outbound Vapi call.
+    Returns: (status_code, response json or {}, response text)
+    """
+    payload = build_call_payload(phone, message)
+    print(f"📡 Sending Vapi Payload: {payload}")
+
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        resp = await get_http_client().post(
+            VAPI_CALL_URL,
+            headers={
+                "Authorization": f"Bearer {os.environ.get('VAPI_PRIVATE_KEY')}",
+                "Content-Type": "application/json"
+            },
+            json=payload,
+            timeout=10.0
+        )
+        outcome = "ok" if resp.status_code in [200, 201] else "rejected"
+    finally:
+        metrics.external_duration.observe(time.perf_counter() - t0, "vapi", outcome)
+    body = resp.json() if resp.status_code in [200, 201] else {}
+    return resp.status_code, body, resp.text
@@ -0,0 +1,323 @@
+import json
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..data_access import doc_key, document_chunks, documents
+
+
+def parse_embedding(value) -> np.ndarray:
+    # pgvector columns come back from PostgREST as a "[0.1,0.2,...]" string
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    In-process copy of the document_chunks embeddings for exact top-k cosine
+    search. Rows are kept L2-normalised in one contiguous float32 matrix so a
+    query is a single matrix-vector product. Capacity grows geometrically, so
+    incremental adds are amortised O(1) per row.
+
+    Ingests in this process apply their writes directly (add, remove,
+    update_metadata); refresh() picks up writes made by other workers and
+    reconciles each document against the catalog and document_chunks.
+    Removals and metadata updates that arrive while load() runs are applied
+    again once it finishes, so a page read just before the write can't
+    bring back the old state.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List = []
+        self._contents: List[str] = []
+        self._metadata: List[dict] = []
+        self._id_set = set()
+        self.ready = False
+        self.loading = False
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+        # Highest chunk id read from the table, and the newest catalog
+        # updated_at seen, for refresh()
+        self.last_id = 0
+        self.docs_synced_at = ""
+        self._removed_while_loading: set = set()
+        self._updated_while_loading: dict = {}
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether writes should be applied to the index (loaded or loading).
+        """
+        return self.ready or self.loading
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, dim: int, extra: int):
+        if self._matrix.shape[1] != dim:
+            if self._size:
+                raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+            self._matrix = np.zeros((0, dim), dtype=np.float32)
+
+        needed = self._size + extra
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def add(self, rows: List[dict]) -> int:
+        """
+        Appends chunk rows ({id, content, metadata, embedding}) to the index.
+        Rows whose id is already indexed are skipped.
+        """
+        with self._lock:
+            rows = [r for r in rows if r.get("embedding") is not None and r.get("id") not in self._id_set]
+            if not rows:
+                return 0
+
+            vectors = np.stack([parse_embedding(r["embedding"]) for r in rows])
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors /= norms
+
+            self._ensure_capacity(vectors.shape[1], len(rows))
+            self._matrix[self._size:self._size + len(rows)] = vectors
+            self._size += len(rows)
+            for r in rows:
+                self._ids.append(r["id"])
+                self._contents.append(r.get("content", ""))
+                self._metadata.append(r.get("metadata") or {})
+                self._id_set.add(r["id"])
+        return len(rows)
+
+    def remove(self, ids: List) -> int:
+        """
+        Drops the given chunk ids, compacting the matrix in place.
+        """
+        with self._lock:
+            if self.loading:
+                self._removed_while_loading.update(ids)
+            ids = set(ids) & self._id_set
+            if not ids:
+                return 0
+            keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in ids]
+            self._matrix[:len(keep)] = self._matrix[keep]
+            self._size = len(keep)
+            self._ids = [self._ids[i] for i in keep]
+            self._contents = [self._contents[i] for i in keep]
+            self._metadata = [self._metadata[i] for i in keep]
+            self._id_set -= ids
+        return len(ids)
+
+    def update_metadata(self, rows: List[dict]) -> int:
+        """
+        Replaces the metadata of already indexed chunks ({id, metadata} rows).
+        Returns how many changed.
+        """
+        with self._lock:
+            if self.loading:
+                self._updated_while_loading.update({r.get("id"): r for r in rows})
+            position = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            updated = 0
+            for r in rows:
+                i = position.get(r.get("id"))
+                if i is not None and self._metadata[i] != (r.get("metadata") or {}):
+                    self._metadata[i] = r.get("metadata") or {}
+                    updated += 1
+        return updated
+
+    def load(self, page_size: int = 1000) -> int:
+        """
+        Pulls every chunk from Supabase, page by page in id order, into the
+        index.
+        """
+        with self._lock:
+            self.loading = True
+            self._removed_while_loading = set()
+            self._updated_while_loading = {}
+        try:
+            # Read the catalog first: documents revised while the chunks
+            # load are picked up again by the next refresh()
+            docs_synced_at = max([""] + [r.get("updated_at") or "" for r in documents.all()])
+            loaded = self._add_after_last_id(page_size)
+            with self._lock:
+                self.remove(list(self._removed_while_loading))
+                self.update_metadata(list(self._updated_while_loading.values()))
+                self.docs_synced_at = max(self.docs_synced_at, docs_synced_at)
+                self.ready = True
+                self.loaded_at = self.refreshed_at = time.time()
+        finally:
+            with self._lock:
+                self.loading = False
+                self._removed_while_loading = set()
+                self._updated_while_loading = {}
+        return loaded
+
+    def _add_after_last_id(self, page_size: int) -> int:
+        added = 0
+        while True:
+            page = document_chunks.page_after(self.last_id, page_size)
+            added += self.add(page)
+            if page:
+                self.last_id = max(self.last_id, page[-1]["id"])
+            if len(page) < page_size:
+                return added
+
+    def refresh(self, page_size: int = 1000) -> dict:
+        """
+        Catches up with writes made by other workers. Chunks with ids above
+        the last one read are added first; ids are not committed in order,
+        so that alone can miss some. Then every document that was revised
+        since the last refresh, whose indexed chunk count differs from its
+        catalog chunk_count, or that is indexed without a catalog entry is
+        re-read from document_chunks: chunks missing from the index are
+        added, chunks gone from the table (retired by a revision, or rolled
+        back by a failed ingest) are dropped, and metadata is updated.
+        """
+        added = self._add_after_last_id(page_size)
+        catalog_rows = documents.all()
+        since = self.docs_synced_at
+        catalog = {r.get("doc_id"): r for r in catalog_rows}
+        with self._lock:
+            by_doc: dict = {}
+            for chunk_id, meta in zip(self._ids, self._metadata):
+                by_doc.setdefault(doc_key(meta), set()).add(chunk_id)
+        by_doc.pop(None, None)
+
+        check = {
+            key for key, entry in catalog.items()
+            if (entry.get("updated_at") or "") > since or len(by_doc.get(key, ())) != (entry.get("chunk_count") or 0)
+        }
+        if catalog:
+            # Indexed but not (yet) catalogued: an ingest still running, or
+            # one that failed and was rolled back
+            check.update(key for key in by_doc if key not in catalog)
+
+        removed = updated = 0
+        for key in check:
+            current = {row["id"]: row for row in document_chunks.for_doc(key)}
+            indexed = by_doc.get(key, set())
+            removed += self.remove([chunk_id for chunk_id in indexed if chunk_id not in current])
+            updated += self.update_metadata([row for chunk_id, row in current.items() if chunk_id in indexed])
+            missing = [chunk_id for chunk_id in current if chunk_id not in indexed]
+            for start in range(0, len(missing), page_size):
+                added += self.add(document_chunks.by_ids(missing[start:start + page_size]))
+        self.docs_synced_at = max([since] + [r.get("updated_at") or "" for r in catalog_rows])
+        self.refreshed_at = time.time()
+        return {"added": added, "removed": removed, "updated": updated}
+
+    def search(self, query_embedding: List[float], match_threshold: float = 0.7, match_count: int = 5) -> List[dict]:
+        """
+        Returns the top `match_count` chunks with cosine similarity above
+        `match_threshold`, shaped like the match_documents RPC rows.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            if not self._size or match_count <= 0:
+                return []
+            scores = self._matrix[:self._size] @ query
+
+            k = min(match_count, self._size)
+            if k < self._size:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(self._size)
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                {
+                    "id": self._ids[i],
+                    "content": self._contents[i],
+                    "metadata": self._metadata[i],
+                    "similarity": float(scores[i]),
+                }
+                for i in top
+                if scores[i] > match_threshold
+            ]
+
+
+index = VectorIndex()
+
+
+def load_in_background():
+    """
+    Starts a one-off background load of the index if it is not loaded yet.
+    """
+    with index._lock:
+        if index.ready or index.loading:
+            return
+        index.loading = True
+
+    def _load():
+        try:
+            t0 = time.perf_counter()
+            count = index.load()
+            print(f"✅ Local vector index loaded: {count} chunks in {time.perf_counter() - t0:.1f}s")
+            start_refresh()
+        except Exception as e:
+            print(f"❌ Local vector index load failed: {e}")
+        finally:
+            index.loading = False
+
+    threading.Thread(target=_load, name="vector-index-load", daemon=True).start()
+
+
+_refresh_thread: Optional[threading.Thread] = None
+
+
+def start_refresh(interval_seconds: float = None):
+    """
+    Starts a background thread that refreshes the index every
+    `interval_seconds` (VECTOR_INDEX_REFRESH_SECONDS by default), so the
+    index trails other workers' ingests by at most about that long.
+    """
+    global _refresh_thread
+    if _refresh_thread:
+        return
+    interval_seconds = interval_seconds or settings.VECTOR_INDEX_REFRESH_SECONDS
+
+    def _loop():
+        while True:
+            time.sleep(interval_seconds)
+            if not index.ready:
+                continue
+            try:
+                result = index.refresh()
+                if any(result.values()):
+                    from . import rag_service
+                    rag_service.invalidate_search_cache()
+                    print(f"🔄 Local vector index refreshed: +{result['added']} "
+                          f"-{result['removed']} ~{result['updated']} chunks")
+            except Exception as e:
+                print(f"❌ Local vector index refresh failed: {e}")
+
+    _refresh_thread = threading.Thread(target=_loop, name="vector-index-refresh", daemon=True)
+    _refresh_thread.start()
+
+
+def compare_results(local: List[dict], remote: List[dict]) -> dict:
+    """
+    Summarises how far the local results drift from the match_documents RPC.
+    """
+    local_ids = [r.get("id") for r in local]
+    remote_ids = [r.get("id") for r in remote]
+    overlap = len(set(local_ids) & set(remote_ids))
+    return {
+        "match": local_ids == remote_ids,
+        "overlap": overlap,
+        "local_count": len(local_ids),
+        "remote_count": len(remote_ids),
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from ..config import settings
+from .. import data_access
+from ..data_access import complaints as complaint_store
+from . import metrics, notifications, rag_service
+from .tools import calculate_sla, resolve_location
+
+# Query embedding is CPU-bound; it gets its own small pool so a burst of
+# searches cannot starve the DB executor that complaint inserts wait on
+_embed_executor = ThreadPoolExecutor(max_workers=settings.EMBED_MAX_WORKERS, thread_name_prefix="embed")
+
+FAILED = "Action failed."
+
+
+class ToolError(Exception):
+    """
+    A tool failure with a message meant for the caller.
+    """
+
+
+class Tool(NamedTuple):
+    handler: Callable[[dict], Awaitable[object]]
+    timeout_ms: float
+    # Spoken to the caller when the tool misses its deadline
+    fallback: str
+    # Let the handler finish in the background after a timeout instead of
+    # cancelling it (for writes the caller has effectively been promised)
+    finish_late: bool = False
+    # Called with (args, error) when a late handler then fails, to make good
+    # on what the fallback promised
+    on_late_failure: Optional[Callable[[dict, BaseException], None]] = None
+
+
+TOOLS: Dict[str, Tool] = {}
+
+# Timed-out handlers left to finish; the loop only keeps weak references
+_late_tasks = set()
+
+
+def register(
+    name: str,
+    timeout_ms: float = None,
+    fallback: str = FAILED,
+    finish_late: bool = False,
+    on_late_failure: Callable[[dict, BaseException], None] = None,
+):
+    """
+    Registers an async handler(args) -> result for the Vapi function `name`.
+    """
+    def decorator(handler):
+        TOOLS[name] = Tool(handler, timeout_ms or settings.TOOL_TIMEOUT_MS, fallback, finish_late, on_late_failure)
+        return handler
+    return decorator
+
+
+def _complaint_not_registered(args: dict, error: BaseException):
+    # The caller was promised a ticket number by SMS; tell them instead
+    # that the complaint was not logged
+    key = f"unregistered-{args.get('phone') or 'unknown'}-{int(time.time())}"
+    print(f"📨 Complaint insert failed after the call moved on, queueing apology SMS ({key})")
+    notifications.enqueue_complaint_failed_sms(args.get("phone"), key, args.get("category", "General"))
+
+
+@register(
+    "createComplaint",
+    fallback="Your complaint is being registered. You will get the ticket number by SMS shortly.",
+    finish_late=True,
+    on_late_failure=_complaint_not_registered,
+)
+async def create_complaint(args: dict) -> str:
+    cat = args.get("category", "General")
+    desc = args.get("description", "Voice logged complaint")
+    loc = args.get("location", "Delhi")
+    phone = args.get("phone")
+    name = args.get("name", "Citizen")
+
+    place = resolve_location(loc, args.get("latitude"), args.get("longitude"))
+    sla_hrs, deadline = calculate_sla(cat)
+    ticket_id = f"MCD-{int(datetime.now().timestamp())}"[-8:]
+
+    row = {
+        "complaint_number": ticket_id,
+        "category": cat,
+        "description": desc,
+        "location": loc,
+        **place,
+        "citizen_phone": phone,
+        "citizen_name": name,
+        "status": "Open",
+        "sla_deadline": deadline,
+        "priority": "medium",
+        "source": "voice",
+        "created_at": datetime.now().isoformat()
+    }
+    try:
+        await data_access.run(complaint_store.insert, row)
+    except Exception as e:
+        print(f"❌ DB Error: {e}")
+        raise ToolError("Error logging complaint to database.")
+    print(f"✅ Logged: {ticket_id}")
+
+    # Queue SMS Notification (does not wait on Twilio)
+    notifications.enqueue_complaint_sms(phone, ticket_id, cat)
+    return f"Complaint registered. Ticket {ticket_id}."
+
+
+@register(
+    "consultManual",
+    timeout_ms=settings.TOOL_SEARCH_TIMEOUT_MS,
+    fallback="I could not look that up just now. Please ask me again in a moment.",
+)
+async def consult_manual(args: dict):
+    query = args.get("query")
+    loop = asyncio.get_running_loop()
+    try:
+        embedding = await loop.run_in_executor(_embed_executor, rag_service.get_query_embedding, query)
+        return await data_access.run(rag_service.search_by_embedding, query, embedding)
+    except Exception as e:
+        print(f"RAG Search Error: {e}")
+        return []
+
+
+def _parse_args(function: dict) -> dict:
+    args = function.get("arguments") or {}
+    if isinstance(args, str):
+        args = json.loads(args) if args.strip() else {}
+    return args
+
+
+async def _run_one(call: dict, deadline: float) -> dict:
+    t0 = time.perf_counter()
+    function = call.get("function") or {}
+    name = function.get("name")
+    tool = TOOLS.get(name)
+    # Unknown names are folded together to bound metric labels
+    label = name if tool is not None else "unknown"
+    outcome, result = "unknown", FAILED
+    try:
+        if tool is not None:
+            args = _parse_args(function)
+            timeout = max(0.0, min(tool.timeout_ms / 1000, deadline - time.monotonic()))
+            task = asyncio.ensure_future(tool.handler(args))
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if done:
+                result, outcome = task.result(), "ok"
+            else:
+                if not tool.finish_late:
+                    task.cancel()
+                else:
+                    _late_tasks.add(task)
+                    task.add_done_callback(functools.partial(_finished_late, tool, args))
+                print(f"⏱️ Tool {name} missed its {timeout * 1000:.0f}ms deadline")
+                result, outcome = tool.fallback, "timeout"
+    except ToolError as e:
+        result, outcome = str(e), "error"
+    except Exception as e:
+        print(f"❌ Tool call failed: {e}")
+        result, outcome = FAILED, "error"
+
+    metrics.tool_calls.inc(label, outcome)
+    metrics.tool_call_duration.observe(time.perf_counter() - t0, label)
+    return {"toolCallId": call.get("id"), "result": result}
+
+
+def _finished_late(tool: Tool, args: dict, task: asyncio.Task):
+    _late_tasks.discard(task)
+    if task.cancelled() or task.exception() is None:
+        return
+    print(f"❌ Late tool call failed: {task.exception()}")
+    if tool.on_late_failure is not None:
+        try:
+            tool.on_late_failure(args, task.exception())
+        except Exception as e:
+            print(f"❌ Late failure handler failed: {e}")
+
+
+async def dispatch(tool_calls: List[dict], budget_ms: Optional[float] = None) -> List[dict]:
+    """
+    Runs every tool call of one assistant turn concurrently and returns
+    their results in request order. Each call is bounded by its own timeout
+    and by the turn's shared budget; a call that misses its deadline
+    answers with its spoken fallback while the others still return.
+    """
+    budget_ms = budget_ms if budget_ms is not None else settings.TOOL_TURN_BUDGET_MS
+    deadline = time.monotonic() + budget_ms / 1000
+    return list(await asyncio.gather(*(_run_one(call, deadline) for call in tool_calls)))
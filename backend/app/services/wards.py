@@ -0,0 +1,226 @@
+import json
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..data_access import complaints as complaint_store
+from .gazetteer import gazetteer
+
+
+class WardDataNotAuthoritative(Exception):
+    pass
+
+
+class Ward(NamedTuple):
+    ward_no: int
+    name: str
+    zone: str
+
+
+def _rings(geometry: dict) -> List[List[Tuple[float, float]]]:
+    # Every ring of a Polygon / MultiPolygon; even-odd crossing over all of
+    # them handles holes and multi-part wards alike
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [[(float(x), float(y)) for x, y in ring] for polygon in polygons for ring in polygon]
+
+
+def _contains(rings, x: float, y: float) -> bool:
+    inside = False
+    for ring in rings:
+        x1, y1 = ring[-1]
+        for x2, y2 in ring:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                inside = not inside
+            x1, y1 = x2, y2
+    return inside
+
+
+def _contains_many(edges: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    # Same crossing test, vectorised over points; edges is (E, 4) x1,y1,x2,y2
+    inside = np.zeros(len(xs), dtype=bool)
+    for x1, y1, x2, y2 in edges:
+        crosses = (y1 > ys) != (y2 > ys)
+        if not crosses.any():
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = (x2 - x1) * (ys - y1) / (y2 - y1) + x1
+        inside ^= crosses & (xs < x_at)
+    return inside
+
+
+class WardIndex:
+    """
+    Ward boundary polygons behind a uniform grid. Each grid cell lists the
+    wards whose bounding box overlaps it, so a lookup is one dict access plus
+    point-in-polygon checks against a handful of candidates.
+    """
+
+    def __init__(self, features: List[dict], cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self.wards: List[Ward] = []
+        self._rings = []
+        self._edges = []
+        bboxes = []
+
+        for feature in features:
+            rings = _rings(feature.get("geometry") or {})
+            if not rings:
+                continue
+            props = feature.get("properties") or {}
+            self.wards.append(Ward(int(props.get("ward_no") or len(self.wards) + 1), props.get("ward", ""), props.get("zone", "")))
+            self._rings.append(rings)
+            self._edges.append(np.array([
+                (*ring[i - 1], *ring[i]) for ring in rings for i in range(len(ring))
+            ]))
+            xs = [x for ring in rings for x, _ in ring]
+            ys = [y for ring in rings for _, y in ring]
+            bboxes.append((min(xs), min(ys), max(xs), max(ys)))
+
+        self.bboxes = np.array(bboxes) if bboxes else np.zeros((0, 4))
+        self._grid: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+        cells = defaultdict(list)
+        for i, (x0, y0, x1, y1) in enumerate(bboxes):
+            for row in range(self._cell(y0), self._cell(y1) + 1):
+                for col in range(self._cell(x0), self._cell(x1) + 1):
+                    cells[(row, col)].append(i)
+        self._grid = {cell: tuple(wards) for cell, wards in cells.items()}
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_deg)
+
+    def locate(self, lat: float, lng: float) -> Optional[Ward]:
+        """
+        Ward containing the point, or None outside every ward.
+        """
+        for i in self._grid.get((self._cell(lat), self._cell(lng)), ()):
+            if _contains(self._rings[i], lng, lat):
+                return self.wards[i]
+        return None
+
+    def locate_many(self, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+        """
+        Ward index (into `wards`) for every point, -1 where none matches.
+        Points are sorted by latitude once; each ward then tests only the
+        points inside its bounding box, vectorised.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        result = np.full(len(lats), -1, dtype=np.int64)
+        if not len(lats) or not self.wards:
+            return result
+
+        order = np.argsort(lats, kind="stable")
+        sorted_lats = lats[order]
+        for i, (x0, y0, x1, y1) in enumerate(self.bboxes):
+            lo = np.searchsorted(sorted_lats, y0, side="left")
+            hi = np.searchsorted(sorted_lats, y1, side="right")
+            if lo >= hi:
+                continue
+            idx = order[lo:hi]
+            idx = idx[(lngs[idx] >= x0) & (lngs[idx] <= x1) & (result[idx] < 0)]
+            if not len(idx):
+                continue
+            inside = _contains_many(self._edges[i], lngs[idx], lats[idx])
+            result[idx[inside]] = i
+        return result
+
+
+def reassign_complaints(dry_run: bool = True, page_size: int = 1000) -> dict:
+    """
+    Recomputes ward and zone for every located complaint from its
+    coordinates, a page at a time, and writes back the rows that changed:
+    one update per distinct (zone, ward) pair per page. Writing needs real
+    ward boundaries (WARDS_AUTHORITATIVE); otherwise only a dry run is allowed.
+    """
+    if not dry_run and not settings.WARDS_AUTHORITATIVE:
+        raise WardDataNotAuthoritative(
+            "Ward boundaries are not authoritative (WARDS_AUTHORITATIVE is off); only dry runs are allowed"
+        )
+    t0 = time.perf_counter()
+    counts = {"scanned": 0, "located": 0, "unmatched": 0, "changed": 0, "updates": 0}
+    for page in complaint_store.iter_pages("id,latitude,longitude,zone,ward", page_size=page_size):
+        counts["scanned"] += len(page)
+        rows = [r for r in page if r.get("latitude") is not None and r.get("longitude") is not None]
+        counts["located"] += len(rows)
+        if not rows:
+            continue
+        found = wards.locate_many([r["latitude"] for r in rows], [r["longitude"] for r in rows])
+        counts["unmatched"] += int((found < 0).sum())
+
+        changes = defaultdict(list)
+        for row, i in zip(rows, found.tolist()):
+            if i < 0:
+                continue
+            ward = wards.wards[i]
+            if (row.get("zone"), row.get("ward")) != (ward.zone, ward.name):
+                changes[(ward.zone, ward.name)].append(row["id"])
+        for (zone, ward_name), ids in changes.items():
+            counts["changed"] += len(ids)
+            if not dry_run:
+                complaint_store.update_many(ids, {"zone": zone, "ward": ward_name})
+                counts["updates"] += 1
+
+    elapsed = time.perf_counter() - t0
+    return {
+        **counts,
+        "dry_run": dry_run,
+        "elapsed_seconds": round(elapsed, 3),
+        "points_per_second": round(counts["located"] / elapsed, 1) if elapsed else None,
+    }
+
+
+def rezone_complaints(dry_run: bool = True, page_size: int = 1000) -> dict:
+    """
+    Re-derives the zone of complaints placed by their location text, for
+    when the gazetteer moves a place to another zone. Only locations that
+    name a gazetteer place are considered (the default zone says nothing),
+    and with WARDS_AUTHORITATIVE complaints that have a ward keep the ward's
+    zone (reassign_complaints covers those). Writes one update per distinct
+    zone per page; with dry_run (the default) only counts.
+    """
+    t0 = time.perf_counter()
+    counts = {"scanned": 0, "matched": 0, "changed": 0, "updates": 0}
+    places: Dict[str, Optional[str]] = {}
+    for page in complaint_store.iter_pages("id,location,zone,ward", page_size=page_size):
+        counts["scanned"] += len(page)
+        changes = defaultdict(list)
+        for row in page:
+            if settings.WARDS_AUTHORITATIVE and row.get("ward"):
+                continue
+            location = row.get("location") or ""
+            if location not in places:
+                place = gazetteer.lookup(location)
+                places[location] = place.zone if place else None
+            zone = places[location]
+            if zone is None:
+                continue
+            counts["matched"] += 1
+            if row.get("zone") != zone:
+                changes[zone].append(row["id"])
+        for zone, ids in changes.items():
+            counts["changed"] += len(ids)
+            if not dry_run:
+                complaint_store.update_many(ids, {"zone": zone})
+                counts["updates"] += 1
+
+    return {**counts, "dry_run": dry_run, "elapsed_seconds": round(time.perf_counter() - t0, 3)}
+
+
+def load_ward_index(path: str = None) -> WardIndex:
+    with open(path or settings.WARDS_PATH, encoding="utf-8") as f:
+        collection = json.load(f)
+    index = WardIndex(collection.get("features", []), settings.WARD_GRID_CELL_DEG)
+    print(f"✅ Ward index: {len(index.wards)} wards, {len(index._grid)} grid cells")
+    return index
+
+
+wards = load_ward_index()
@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+# Startup cost report: how long each top-level import and warm-up task took,
+# and how many modules it pulled in. Served by the /ready endpoint.
+_process_start = time.perf_counter()
+_imports: List[dict] = []
+_warmups: Dict[str, dict] = {}
+_warmup_tasks: List[tuple] = []
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed_import(label: str):
+    modules_before = len(sys.modules)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _imports.append({
+            "module": label,
+            "ms": round((time.perf_counter() - t0) * 1000, 1),
+            "modules_loaded": len(sys.modules) - modules_before,
+        })
+
+
+def register_warmup(name: str, fn: Callable[[], None]):
+    """
+    Registers a task to run in the background once the app has started.
+    The app reports ready only after every registered task has finished.
+    """
+    _warmup_tasks.append((name, fn))
+    _warmups[name] = {"status": "pending", "ms": None, "error": None}
+
+
+def _run_warmups():
+    for name, fn in _warmup_tasks:
+        with _lock:
+            _warmups[name]["status"] = "running"
+        modules_before = len(sys.modules)
+        t0 = time.perf_counter()
+        try:
+            fn()
+            status, error = "done", None
+        except Exception as e:
+            print(f"❌ Warm-up '{name}' failed: {e}")
+            status, error = "failed", str(e)
+        with _lock:
+            _warmups[name].update({
+                "status": status,
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+                "modules_loaded": len(sys.modules) - modules_before,
+                "error": error,
+            })
+    print(f"✅ Warm-up finished: {report()['warmup']}")
+
+
+def start_warmups():
+    threading.Thread(target=_run_warmups, name="warmup", daemon=True).start()
+
+
+def _all_finished() -> bool:
+    # A failed warm-up does not block readiness: the lazy paths still load on
+    # first use, they are just slower.
+    return all(w["status"] in ("done", "failed") for w in _warmups.values())
+
+
+def is_ready() -> bool:
+    with _lock:
+        return _all_finished()
+
+
+def report() -> dict:
+    with _lock:
+        return {
+            "ready": _all_finished(),
+            "uptime_seconds": round(time.perf_counter() - _process_start, 1),
+            "imports": list(_imports),
+            "warmup": {name: dict(w) for name, w in _warmups.items()},
+        }
@@ -32,7 +32,8 @@ try:
     ALTER TABLE public.complaints 
     ADD COLUMN IF NOT EXISTS assigned_to text,
     ADD COLUMN IF NOT EXISTS notes text,
-    ADD COLUMN IF NOT EXISTS resolved_at timestamptz;
+    ADD COLUMN IF NOT EXISTS resolved_at timestamptz,
+    ADD COLUMN IF NOT EXISTS ward text;
     """)
     
     # 2. Update status inconsistent values
@@ -43,6 +44,127 @@ try:
     WHERE status = 'in-progress';
     """)
     
+    # 3. Document catalog
+    print("Creating document catalog...")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS public.documents (
+        doc_id text PRIMARY KEY,
+        filename text,
+        description text,
+        type text,
+        storage_path text,
+        public_url text,
+        chunk_count integer NOT NULL DEFAULT 0,
+        size_bytes bigint,
+        pages integer,
+        checksum text,
+        timings_ms jsonb,
+        status text DEFAULT 'active',
+        created_at timestamptz DEFAULT now(),
+        updated_at timestamptz DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS documents_checksum_idx ON public.documents (checksum);
+    """)
+
+    # 4. Chunk lookups by document (incremental re-ingestion)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS document_chunks_doc_id_idx ON public.document_chunks ((metadata->>'doc_id'));
+    """)
+    
+    # 5. Ingestion job status, shared by all workers
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS public.ingest_jobs (
+        job_id text PRIMARY KEY,
+        filename text,
+        description text,
+        status text NOT NULL,
+        created_at timestamptz DEFAULT now(),
+        started_at timestamptz,
+        finished_at timestamptz,
+        progress jsonb,
+        result jsonb,
+        error text
+    );
+    CREATE INDEX IF NOT EXISTS ingest_jobs_created_at_idx ON public.ingest_jobs (created_at DESC);
+    """)
+    
+    # 6. Broadcast campaigns and their per-recipient results
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS public.campaigns (
+        id text PRIMARY KEY,
+        mode text NOT NULL,
+        message text,
+        selector jsonb,
+        recipients jsonb,
+        status text NOT NULL,
+        error text,
+        total integer NOT NULL DEFAULT 0,
+        cursor integer NOT NULL DEFAULT 0,
+        sent integer NOT NULL DEFAULT 0,
+        failed integer NOT NULL DEFAULT 0,
+        owner text,
+        heartbeat_at timestamptz,
+        pause_requested boolean NOT NULL DEFAULT false,
+        created_at timestamptz DEFAULT now(),
+        started_at timestamptz,
+        finished_at timestamptz
+    );
+    CREATE INDEX IF NOT EXISTS campaigns_created_at_idx ON public.campaigns (created_at DESC);
+    CREATE TABLE IF NOT EXISTS public.campaign_results (
+        campaign_id text NOT NULL REFERENCES public.campaigns (id) ON DELETE CASCADE,
+        idx integer NOT NULL,
+        phone text,
+        status text NOT NULL,
+        detail text,
+        call_id text,
+        at timestamptz,
+        PRIMARY KEY (campaign_id, idx)
+    );
+    CREATE INDEX IF NOT EXISTS campaign_results_status_idx ON public.campaign_results (campaign_id, status, idx);
+    """)
+
+    # 7. Complaint SMS outbox (pending messages and delivery status)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS public.sms_outbox (
+        complaint_number text PRIMARY KEY,
+        to_number text,
+        body text,
+        status text NOT NULL,
+        attempts integer NOT NULL DEFAULT 0,
+        error text,
+        sid text,
+        transport text,
+        not_before timestamptz,
+        owner text,
+        heartbeat_at timestamptz,
+        created_at timestamptz DEFAULT now(),
+        updated_at timestamptz
+    );
+    CREATE INDEX IF NOT EXISTS sms_outbox_pending_idx ON public.sms_outbox (status, heartbeat_at);
+    """)
+
+    # 8. Complaint import job status, shared by all workers
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS public.import_jobs (
+        job_id text PRIMARY KEY,
+        filename text,
+        format text,
+        status text NOT NULL,
+        created_at timestamptz DEFAULT now(),
+        started_at timestamptz,
+        finished_at timestamptz,
+        progress jsonb,
+        result jsonb,
+        error text
+    );
+    CREATE INDEX IF NOT EXISTS import_jobs_created_at_idx ON public.import_jobs (created_at DESC);
+    """)
+
+    # 9. Keyset paging of complaints, newest first (ComplaintStore.page)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS complaints_created_at_id_idx ON public.complaints (created_at DESC, id DESC);
+    """)
+    
     print("Migration successful!")
     cur.close()
     conn.close()
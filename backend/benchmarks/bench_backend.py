@@ -0,0 +1,414 @@
+"""
+Backend benchmark suite: the hot service paths timed against an in-memory
+Supabase stand-in (benchmarks/fake_supabase.py) seeded with synthetic
+complaints and scheme documents.
+
+    cd backend && python -m benchmarks.bench_backend [--scale 1k,100k] [--only hotspots,search]
+                  [--repeat 5] [--model auto|hash|real] [--json] [--out results.json]
+                  [--compare baseline.json [--tolerance 0.25]]
+
+Groups and cases (every case runs at every scale):
+  zones      detect_zone_and_coords (uncached and cached)
+  heatmap    heatmap_build, get_heatmap_points (zoomed grid and raw points)
+  hotspots   hotspots_build, get_hotspots (engine and sampling fallback)
+  ingest     ingest_document (20-page PDF), ingest_document_revision (one page changed)
+  search     search_knowledge_base (RPC, local index, cached, on-disk snapshot), vector_index_load,
+             embedding_snapshot_sync
+  schemes    document_catalog_load (backfill from chunks), get_schemes
+
+--out writes the machine-readable results (--json prints them instead of
+the table). --compare reads an earlier results file and exits non-zero
+when any case's median got slower by more than --tolerance. The 1m scale
+needs several GB of RAM.
+"""
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import numpy as np
+
+# The services log with print(), some at import time; stdout is kept for
+# the results
+with contextlib.redirect_stdout(sys.stderr):
+    from app.config import settings
+    from app.routers import api_routes, documents
+    from app.data_access import document_chunks
+    from app.services import document_catalog, embedding_snapshot, heatmap, hotspots, rag_service, tools, vector_index
+
+    from . import datasets
+    from .bench_gazetteer import sample_locations
+    from .fake_supabase import install
+
+GROUPS = ("zones", "heatmap", "hotspots", "ingest", "search", "schemes")
+DOCUMENT_GROUPS = ("ingest", "search", "schemes")
+
+
+def _summary(samples, ops: int = 1) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    median = statistics.median(ms)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(median, 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p95_ms": round(ms[math.ceil(0.95 * len(ms)) - 1], 3),
+        "max_ms": round(ms[-1], 3),
+        "ops": ops,
+        "us_per_op": round(median * 1000 / ops, 3),
+    }
+
+
+def measure(fn, repeat: int, ops: int = 1, setup=None, warmup: int = 1) -> dict:
+    """
+    Times `repeat` calls of fn() after `warmup` untimed ones. setup(), if
+    given, runs untimed before every call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return _summary(samples, ops)
+
+
+class Context:
+    """
+    One scale's fake database, seeded lazily per dataset.
+    """
+
+    def __init__(self, scale: str, repeat: int, encoder):
+        self.scale = scale
+        self.n = datasets.SCALES[scale]
+        self.repeat = repeat
+        self.encoder = encoder
+        self.fake = install()
+        self.seeded = set()
+
+    def seed_complaints(self):
+        if "complaints" not in self.seeded:
+            self.fake.load("complaints", datasets.complaints(self.n))
+            self.seeded.add("complaints")
+
+    def drop_complaints(self):
+        if "complaints" in self.seeded:
+            self.fake.reset("complaints")
+            self.seeded.discard("complaints")
+            # Rebuild the views from the now-empty table to free their copies
+            heatmap.grid.reconcile()
+            hotspots.engine.reconcile()
+            gc.collect()
+
+    def seed_documents(self):
+        if "documents" not in self.seeded:
+            rows, embeddings = datasets.document_chunks(self.n, self.encoder)
+            self.fake.load("document_chunks", rows, embeddings)
+            self.seeded.add("documents")
+            rag_service.invalidate_search_cache()
+            document_catalog.catalog.load()
+
+    def few(self, heavy: bool = True) -> int:
+        # Whole-table rebuilds at 1M take seconds each; fewer runs suffice
+        return max(1, min(self.repeat, 3)) if heavy and self.n >= 1_000_000 else self.repeat
+
+
+def bench_zones(ctx: Context):
+    inputs = sample_locations(min(ctx.n, 100_000))
+    detect = tools.detect_zone_and_coords
+
+    def run():
+        for text in inputs:
+            detect(text)
+
+    yield "detect_zone_and_coords", measure(run, ctx.repeat, ops=len(inputs), setup=detect.cache_clear)
+    yield "detect_zone_and_coords_cached", measure(run, ctx.repeat, ops=len(inputs))
+
+
+def bench_heatmap(ctx: Context):
+    ctx.seed_complaints()
+    yield "heatmap_build", measure(heatmap.grid.reconcile, ctx.few(), warmup=0)
+    yield "get_heatmap_points_zoom12", measure(lambda: api_routes.get_heatmap_points(zoom=12), ctx.repeat)
+    yield "get_heatmap_points_zoom16_bbox", measure(
+        lambda: api_routes.get_heatmap_points(zoom=16, bbox="28.60,77.18,28.66,77.24"), ctx.repeat)
+    yield "get_heatmap_points_raw", measure(lambda: api_routes.get_heatmap_points(), ctx.repeat)
+
+
+def bench_hotspots(ctx: Context):
+    ctx.seed_complaints()
+    engine = hotspots.engine
+    from sklearn.cluster import DBSCAN  # noqa: F401  (the app's startup warm-up pays this import)
+
+    def build():
+        engine.reconcile()
+        api_routes.get_hotspots()
+
+    yield "hotspots_build", measure(build, ctx.few(), warmup=0)
+    yield "get_hotspots", measure(lambda: api_routes.get_hotspots(), ctx.repeat)
+    yield "get_hotspots_zone", measure(lambda: api_routes.get_hotspots(zone="central"), ctx.repeat)
+
+    engine.ready = False  # the fallback path used while the engine is loading
+    try:
+        yield "get_hotspots_sample", measure(lambda: api_routes.get_hotspots(), ctx.repeat)
+    finally:
+        engine.ready = True
+
+
+def _ingest_stats(stats: dict, results: list) -> dict:
+    stats["ops"] = results[-1]["chunks_processed"] + results[-1].get("chunks_reused", 0)
+    stats["us_per_op"] = round(stats["median_ms"] * 1000 / max(stats["ops"], 1), 3)
+    stats["stages_ms"] = {
+        stage: round(statistics.median(r["timings_ms"][stage] for r in results), 2)
+        for stage in results[-1]["timings_ms"]
+    }
+    return stats
+
+
+def bench_ingest(ctx: Context):
+    ctx.seed_documents()
+    results = []
+    upload = {}
+
+    # Every run ingests different bytes; identical files are deduplicated
+    fresh = itertools.count(1000)
+    revision = itertools.count(1)
+
+    def next_fresh():
+        seed = next(fresh)
+        upload.update(pdf=datasets.make_pdf(20, seed=seed), filename=f"bench_scheme_{seed}.pdf", revision=False)
+
+    def next_revision():
+        upload.update(pdf=datasets.make_pdf(20, seed=999, revision=next(revision)), filename="bench_circular.pdf", revision=True)
+
+    def run():
+        result = rag_service.ingest_document(upload["pdf"], upload["filename"], "Benchmark scheme", replace=upload["revision"])
+        if result.get("status") != "success" or result.get("revision") != upload["revision"]:
+            raise RuntimeError(f"ingest_document failed: {result.get('status')} {result.get('message')}")
+        results.append(result)
+
+    yield "ingest_document", _ingest_stats(measure(run, ctx.few(heavy=False), setup=next_fresh), results)
+
+    # A corrected circular: one page of 20 changed, the rest reused
+    rag_service.ingest_document(datasets.make_pdf(20, seed=999), "bench_circular.pdf", "Benchmark scheme")
+    results.clear()
+    yield "ingest_document_revision", _ingest_stats(measure(run, ctx.few(heavy=False), setup=next_revision), results)
+
+
+def bench_search(ctx: Context):
+    ctx.seed_documents()
+    queries = [f"How do I apply for {topic}?" for topic in datasets.TOPICS]
+
+    def clear_caches():
+        rag_service.query_embedding_cache.clear()
+        rag_service.search_result_cache.clear()
+
+    def run():
+        for q in queries:
+            rag_service.search_knowledge_base(q)
+
+    enabled = settings.VECTOR_INDEX_ENABLED
+    try:
+        settings.VECTOR_INDEX_ENABLED = False
+        yield "search_knowledge_base_rpc", measure(run, ctx.repeat, ops=len(queries), setup=clear_caches)
+
+        settings.VECTOR_INDEX_ENABLED = True
+
+        def load():
+            vector_index.index = vector_index.VectorIndex()
+            vector_index.index.load()
+
+        yield "vector_index_load", measure(load, ctx.few(), warmup=0)
+        yield "search_knowledge_base_index", measure(run, ctx.repeat, ops=len(queries), setup=clear_caches)
+        yield "search_knowledge_base_cached", measure(run, ctx.repeat, ops=len(queries))
+    finally:
+        settings.VECTOR_INDEX_ENABLED = enabled
+        vector_index.index = vector_index.VectorIndex()
+
+    # Offline fallback: match_documents unreachable, answered from the snapshot
+    with tempfile.TemporaryDirectory() as directory:
+        paths = (os.path.join(directory, str(i)) for i in itertools.count())
+        snapshots = []
+
+        def fresh_snapshot():
+            snapshots.append(embedding_snapshot.EmbeddingSnapshot(next(paths), settings.EMBEDDING_SNAPSHOT_DTYPE))
+
+        yield "embedding_snapshot_sync", measure(lambda: snapshots[-1].sync(), ctx.few(), warmup=0, setup=fresh_snapshot)
+
+        def unreachable(*args, **kwargs):
+            raise ConnectionError("match_documents unreachable")
+
+        saved = settings.EMBEDDING_SNAPSHOT_ENABLED, embedding_snapshot.snapshot
+        settings.EMBEDDING_SNAPSHOT_ENABLED, embedding_snapshot.snapshot = True, snapshots[-1]
+        document_chunks.match = unreachable
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                yield "search_knowledge_base_snapshot", measure(run, ctx.repeat, ops=len(queries), setup=clear_caches)
+        finally:
+            del document_chunks.match
+            settings.EMBEDDING_SNAPSHOT_ENABLED, embedding_snapshot.snapshot = saved
+
+
+def bench_schemes(ctx: Context):
+    ctx.seed_documents()
+    yield "document_catalog_load", measure(
+        document_catalog.catalog.load, ctx.few(), warmup=0, setup=lambda: ctx.fake.reset("documents"))
+    yield "get_schemes", measure(documents.get_schemes, ctx.repeat)
+
+
+BENCHES = {
+    "zones": bench_zones,
+    "heatmap": bench_heatmap,
+    "hotspots": bench_hotspots,
+    "ingest": bench_ingest,
+    "search": bench_search,
+    "schemes": bench_schemes,
+}
+
+
+def _encoder(model: str):
+    if model == "hash":
+        return datasets.HashEncoder(), "hash"
+    try:
+        return rag_service.get_model(), "all-MiniLM-L6-v2"
+    except ImportError:
+        if model == "real":
+            raise
+        return datasets.HashEncoder(), "hash"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(scales, groups, repeat: int = 5, model: str = "auto", log=None) -> dict:
+    log = log or (lambda msg: None)
+    encoder, model_name = _encoder(model)
+    rag_service._model = encoder
+
+    results = []
+    for scale in scales:
+        ctx = Context(scale, repeat, encoder)
+        # Complaint groups first, so the complaint rows can be dropped
+        # before the document rows are seeded
+        ordered = [g for g in GROUPS if g in groups]
+        for group in ordered:
+            if group in DOCUMENT_GROUPS:
+                ctx.drop_complaints()
+            log(f"[{scale}] {group}...")
+            for case, stats in BENCHES[group](ctx):
+                results.append({"case": case, "group": group, "scale": scale, "rows": ctx.n, **stats})
+                log(f"[{scale}] {case}: median {stats['median_ms']} ms")
+        ctx.fake.reset()
+        gc.collect()
+
+    return {
+        "suite": "backend",
+        "format": 1,
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": model_name,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Median ratios against `baseline` for every (case, scale) in both;
+    a case regressed when its ratio exceeds 1 + tolerance.
+    """
+    before = {(r["case"], r["scale"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in results["results"]:
+        old = before.get((r["case"], r["scale"]))
+        if not old or not old["median_ms"]:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        rows.append({
+            "case": r["case"],
+            "scale": r["scale"],
+            "baseline_ms": old["median_ms"],
+            "median_ms": r["median_ms"],
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1k,100k", help=f"comma-separated scales from {', '.join(datasets.SCALES)}")
+    parser.add_argument("--only", default=",".join(GROUPS), help="comma-separated groups to run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--model", choices=("auto", "hash", "real"), default="auto",
+                        help="embedding model: the real one if installed (auto), or the deterministic hash encoder")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON only")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="results file to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case counts as regressed")
+    args = parser.parse_args()
+
+    scales = [s.strip().lower() for s in args.scale.split(",") if s.strip()]
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = [s for s in scales if s not in datasets.SCALES] + [g for g in groups if g not in BENCHES]
+    if unknown:
+        parser.error(f"unknown scale or group: {', '.join(unknown)}")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(scales, groups, args.repeat, args.model, log=lambda msg: print(f"⏱️  {msg}", file=sys.stderr))
+
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+        results["comparison"] = {"baseline": args.compare, "tolerance": args.tolerance, "cases": comparison}
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"model {results['meta']['model']}, {args.repeat} runs per case, commit {results['meta']['git_commit']}")
+        for r in results["results"]:
+            print(f"  {r['scale']:>5} {r['case']:<32} median {r['median_ms']:>10.3f} ms  "
+                  f"p95 {r['p95_ms']:>10.3f} ms  {r['us_per_op']:>10.3f} us/op")
+        for c in comparison or []:
+            flag = "REGRESSED" if c["regressed"] else "ok"
+            print(f"  {c['scale']:>5} {c['case']:<32} {c['baseline_ms']:>10.3f} -> {c['median_ms']:>10.3f} ms  x{c['ratio']:<6} {flag}")
+
+    if comparison and any(c["regressed"] for c in comparison):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
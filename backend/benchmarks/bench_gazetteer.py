@@ -0,0 +1,136 @@
+"""
+Zone detection benchmark: the compiled gazetteer matcher against the old
+substring scan.
+
+    cd backend && python -m benchmarks.bench_gazetteer [--n 20000] [--json]
+
+Four matchers are timed over the same location strings:
+  legacy        the original four-zone DELHI_ZONES loop (8 localities)
+  linear_scan   the same loop run over the full gazetteer
+  trie          Gazetteer.lookup(), uncached
+  trie_cached   detect_zone_and_coords(), with the lru_cache warm
+"""
+import argparse
+import json
+import random
+import time
+
+from app.services import tools
+from app.services.gazetteer import gazetteer, load_gazetteer
+
+LEGACY_ZONES = {
+    "ROHINI": {"coords": (28.7041, 77.1025), "areas": ["rohini", "pitampura"]},
+    "SOUTH": {"coords": (28.5494, 77.2001), "areas": ["saket", "hauz khas"]},
+    "CENTRAL": {"coords": (28.6448, 77.2115), "areas": ["karol bagh", "paharganj"]},
+    "WEST": {"coords": (28.6219, 77.0878), "areas": ["janakpuri", "dwarka"]}
+}
+
+
+def legacy_detect(text: str):
+    text = text.lower() if text else ""
+    for zone, data in LEGACY_ZONES.items():
+        for area in data["areas"]:
+            if area in text: return zone, data["coords"]
+    return "CENTRAL", (28.6139, 77.2090)
+
+
+def _linear_scan_patterns():
+    with open(tools.settings.GAZETTEER_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    patterns = []
+    for entry in data["places"]:
+        for name in [entry["name"]] + entry["aliases"]:
+            patterns.append((name.lower(), entry["zone"], tuple(entry["coords"])))
+    return patterns
+
+
+def linear_scan_detect(text: str, patterns):
+    text = text.lower() if text else ""
+    for name, zone, coords in patterns:
+        if name in text:
+            return zone, coords
+    return "CENTRAL", (28.6139, 77.2090)
+
+
+def sample_locations(n: int, seed: int = 7):
+    """
+    Realistic complaint locations: house/street noise around a gazetteer
+    name (English, Hindi or run-together), plus ~10% unknown places.
+    """
+    rng = random.Random(seed)
+    with open(tools.settings.GAZETTEER_PATH, encoding="utf-8") as f:
+        places = json.load(f)["places"]
+    names = [name for p in places for name in [p["name"]] + p["aliases"]]
+    prefixes = ["", "H.No. 123, ", "Near bus stop, ", "Block C, ", "Gali no 4, ", "Opp. park, "]
+    suffixes = ["", ", New Delhi", ", Delhi 110017", " main road", " sector 3", " market"]
+    unknown = ["Connaught Place", "Noida sector 18", "Gurgaon", "Somewhere near the temple"]
+    out = []
+    for _ in range(n):
+        core = rng.choice(unknown) if rng.random() < 0.1 else rng.choice(names)
+        out.append(rng.choice(prefixes) + core + rng.choice(suffixes))
+    return out
+
+
+def _time(fn, inputs):
+    t0 = time.perf_counter()
+    for text in inputs:
+        fn(text)
+    elapsed = time.perf_counter() - t0
+    return {"total_ms": round(elapsed * 1000, 2), "us_per_call": round(elapsed * 1e6 / len(inputs), 2)}
+
+
+def run(n: int = 20000) -> dict:
+    inputs = sample_locations(n)
+    patterns = _linear_scan_patterns()
+
+    t0 = time.perf_counter()
+    load_gazetteer()
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    tools.detect_zone_and_coords.cache_clear()
+    for text in inputs:
+        tools.detect_zone_and_coords(text)
+
+    results = {
+        "inputs": n,
+        "distinct_inputs": len(set(inputs)),
+        "gazetteer_patterns": gazetteer.patterns,
+        "compile_ms": round(compile_ms, 2),
+        "legacy": _time(legacy_detect, inputs),
+        "linear_scan": _time(lambda t: linear_scan_detect(t, patterns), inputs),
+        "trie": _time(gazetteer.lookup, inputs),
+        "trie_cached": _time(tools.detect_zone_and_coords, inputs),
+    }
+    info = tools.detect_zone_and_coords.cache_info()
+    results["cache"] = {"size": info.maxsize, "hits": info.hits, "misses": info.misses}
+
+    # How often each matcher resolves a location to something other than the fallback
+    results["resolved"] = {
+        "legacy": sum(1 for t in inputs if legacy_detect(t) != ("CENTRAL", (28.6139, 77.2090))),
+        "trie": sum(1 for t in inputs if gazetteer.lookup(t) is not None),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000, help="number of location strings")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON only")
+    args = parser.parse_args()
+
+    results = run(args.n)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{results['inputs']} locations ({results['distinct_inputs']} distinct), "
+          f"{results['gazetteer_patterns']} patterns compiled in {results['compile_ms']}ms")
+    for name in ("legacy", "linear_scan", "trie", "trie_cached"):
+        r = results[name]
+        print(f"  {name:<12} {r['us_per_call']:>8.2f} us/call  {r['total_ms']:>10.2f} ms")
+    print(f"  cache: {results['cache']['hits']} hits / {results['cache']['misses']} misses (size {results['cache']['size']})")
+    print(f"  resolved: legacy {results['resolved']['legacy']}, trie {results['resolved']['trie']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Seeded synthetic data for the benchmarks: complaints spread around the
+gazetteer's places, scheme-document chunks with topic-clustered
+embeddings, a deterministic stand-in for the embedding model, and small
+text PDFs for ingestion. The same seed always gives the same data.
+"""
+import hashlib
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+CATEGORIES = ["Garbage", "Pothole", "Streetlight", "Water Logging", "Sewage", "Cleanliness", "Stray Animals", "Encroachment"]
+STATUSES = (["Open", "In Progress", "Resolved", "Closed"], [0.45, 0.2, 0.3, 0.05])
+PRIORITIES = (["low", "medium", "high", "critical"], [0.2, 0.5, 0.25, 0.05])
+SOURCES = ["voice", "web", "import"]
+
+# Scheme topics; chunk embeddings cluster around each topic's embedding, so
+# searching for a topic finds its chunks above the default 0.7 threshold
+TOPICS = [
+    "property tax rebate for senior citizens",
+    "birth and death certificate registration",
+    "trade licence renewal for shops",
+    "building plan sanction and completion certificate",
+    "solid waste segregation rules for households",
+    "street vendor registration and vending zones",
+    "dengue and malaria prevention drive",
+    "community hall booking charges",
+    "tree pruning and park maintenance requests",
+    "pet dog registration and vaccination",
+    "parking permits in residential colonies",
+    "old age pension and widow pension scheme",
+    "health licence for restaurants and eating houses",
+    "sewer connection and water charges",
+    "school admission in municipal primary schools",
+    "rainwater harvesting subsidy",
+]
+
+
+def _places() -> List[dict]:
+    with open(settings.GAZETTEER_PATH, encoding="utf-8") as f:
+        return json.load(f)["places"]
+
+
+def complaints(n: int, seed: int = 42, days: int = 180) -> List[dict]:
+    """
+    `n` complaint rows around gazetteer places (jittered ~400 m, so
+    neighbouring complaints form hotspots), created over the last `days`.
+    """
+    rng = np.random.default_rng(seed)
+    places = _places()
+    place_idx = rng.integers(0, len(places), n)
+    lat = np.array([places[i]["coords"][0] for i in place_idx]) + rng.normal(0, 0.004, n)
+    lng = np.array([places[i]["coords"][1] for i in place_idx]) + rng.normal(0, 0.004, n)
+    category = rng.integers(0, len(CATEGORIES), n)
+    status = rng.choice(len(STATUSES[0]), n, p=STATUSES[1])
+    priority = rng.choice(len(PRIORITIES[0]), n, p=PRIORITIES[1])
+    source = rng.integers(0, len(SOURCES), n)
+    age = np.sort(rng.uniform(0, days * 86400, n))[::-1]
+    located = rng.random(n) > 0.05
+
+    now = datetime(2026, 1, 1)
+    rows = []
+    for i in range(n):
+        place = places[place_idx[i]]
+        created = now - timedelta(seconds=float(age[i]))
+        cat = CATEGORIES[category[i]]
+        rows.append({
+            "id": i + 1,
+            "complaint_number": f"MCD-BENCH-{i + 1:07d}",
+            "category": cat,
+            "description": f"{cat} reported near {place['name']}",
+            "location": place["name"].title(),
+            "latitude": round(float(lat[i]), 6) if located[i] else None,
+            "longitude": round(float(lng[i]), 6) if located[i] else None,
+            "zone": place["zone"],
+            "citizen_phone": f"+9198{i % 100_000_000:08d}",
+            "status": STATUSES[0][status[i]],
+            "priority": PRIORITIES[0][priority[i]],
+            "source": SOURCES[source[i]],
+            "sla_deadline": (created + timedelta(hours=24 if "clean" in cat.lower() else 48)).isoformat(),
+            "created_at": created.isoformat(),
+        })
+    return rows
+
+
+class HashEncoder:
+    """
+    Deterministic stand-in for SentenceTransformer: each text maps to a
+    fixed pseudo-random unit vector. Used when the real model is not
+    installed, or with --model hash, so timings measure the backend rather
+    than the model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _one(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._one(texts)
+        if not len(texts):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._one(t) for t in texts])
+
+
+def document_chunks(n: int, encoder, seed: int = 42, chunks_per_doc: int = 50) -> Tuple[List[dict], np.ndarray]:
+    """
+    `n` document_chunks rows (ingest_document's metadata shape) and their
+    embeddings, one row each. Chunk text comes from a small pool, so the
+    rows are cheap to hold even at 1M.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = np.asarray(encoder.encode(TOPICS), dtype=np.float32)
+    dim = centroids.shape[1]
+    topic = rng.integers(0, len(TOPICS), n)
+
+    embeddings = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 65536):
+        end = min(start + 65536, n)
+        block = centroids[topic[start:end]] + rng.standard_normal((end - start, dim), dtype=np.float32) * 0.03
+        embeddings[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+
+    pool = [f"{TOPICS[t].capitalize()}: eligibility, documents required and fees, part {p}." for t in range(len(TOPICS)) for p in range(8)]
+    created = datetime(2026, 1, 1)
+    rows = []
+    doc_meta = None
+    for i in range(n):
+        doc_no, chunk_index = divmod(i, chunks_per_doc)
+        if chunk_index == 0:
+            name = f"scheme_{doc_no:06d}.pdf"
+            doc_meta = {
+                "doc_id": f"bench-doc-{doc_no:06d}",
+                "filename": name,
+                "description": TOPICS[topic[i]].capitalize(),
+                "storage_path": f"schemes/{name}",
+                "public_url": f"https://storage.invalid/documents/schemes/{name}",
+                "created_at": (created + timedelta(minutes=doc_no)).isoformat(),
+                "type": "scheme_doc",
+            }
+        rows.append({
+            "id": i + 1,
+            "content": pool[topic[i] * 8 + chunk_index % 8],
+            "metadata": {**doc_meta, "chunk_index": chunk_index},
+            "created_at": doc_meta["created_at"],
+        })
+    return rows, embeddings
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_lines(rng, count: int) -> List[str]:
+    lines = []
+    for _ in range(count):
+        topic = TOPICS[rng.integers(0, len(TOPICS))]
+        lines.append(f"Applicants for {topic} must submit the form at the zonal office within {rng.integers(7, 90)} days.")
+    return lines
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 42, revision: int = 0) -> bytes:
+    """
+    A text PDF (Helvetica, one content stream per page) that pypdf can
+    extract, with sentence-like lines drawn from the scheme topics.
+    A non-zero `revision` rewrites the last page only, like a corrected
+    circular.
+    """
+    rng = np.random.default_rng(seed)
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for p in range(pages):
+        lines = _pdf_lines(rng, lines_per_page)
+        if revision and p == pages - 1:
+            lines = _pdf_lines(np.random.default_rng((seed, revision)), lines_per_page)
+        text = "\n".join(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+        stream = zlib.compress(f"BT /F1 10 Tf 12 TL 40 800 Td\n{text}\nET".encode("latin-1"))
+        content_id, page_id = 4 + 2 * p, 5 + 2 * p
+        objects[content_id] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(page_id)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_id in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(out)
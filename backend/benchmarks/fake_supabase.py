@@ -0,0 +1,559 @@
+"""
+In-memory stand-in for the subset of the supabase-py client the backend
+uses: table().select / insert / update with eq, neq, gt(e), lt(e), in_,
+is_, ilike, not_, or_, order, limit, range and count="exact"; rpc
+("match_documents"); and storage uploads.
+
+It is built to keep the fake's own cost out of the numbers:
+  - filtered and sorted results are cached per query shape and table
+    version, so paging through a table is O(page) per request, not a
+    re-sort per page;
+  - a single-key ordered query with a limit uses a heap, O(n log k);
+  - embeddings live in one float32 matrix per table, and match_documents
+    is a single matrix-vector product.
+"""
+import bisect
+import heapq
+import itertools
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+VECTOR_COLUMNS = {"document_chunks": "embedding"}
+_QUERY_CACHE_SIZE = 8
+
+
+class Response:
+    def __init__(self, data: List[dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _coerce(value, like):
+    # Filter values arrive as strings from or_() expressions
+    if isinstance(value, str) and isinstance(like, (int, float)) and not isinstance(like, bool):
+        try:
+            return type(like)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _sort_key(value):
+    # NULLs sort last ascending and first descending, as in Postgres
+    return (0, value) if value is not None else (1,)
+
+
+def _like_pattern(pattern: str):
+    return re.compile("^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _parse_logic(expr: str) -> tuple:
+    """
+    PostgREST logic tree ("a.lt.1,and(b.eq.x,c.is.null)") as nested filter
+    tuples: ("or" | "and", children) or (op, column, value).
+    """
+    terms = []
+    for term in _split_top_level(expr):
+        m = re.match(r"^(and|or)\((.*)\)$", term)
+        if m:
+            terms.append((m.group(1),) + (_parse_logic(m.group(2))[1],))
+            continue
+        column, op, value = term.split(".", 2)
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        terms.append((op, column, None if value == "null" and op == "is" else value))
+    return ("or", tuple(terms))
+
+
+def _matches(row: dict, filt: tuple) -> bool:
+    op = filt[0]
+    if op in ("and", "or"):
+        results = (_matches(row, child) for child in filt[1])
+        return all(results) if op == "and" else any(results)
+    if op == "not":
+        return not _matches(row, filt[1])
+    column, value = filt[1], filt[2]
+    if "->>" in column:
+        # JSON text path, e.g. metadata->>doc_id
+        base, key = column.split("->>", 1)
+        current = (row.get(base) or {}).get(key)
+    else:
+        current = row.get(column)
+    if op == "is":
+        return current is None if value is None else current == value
+    if op == "in":
+        return current in value
+    if current is None:
+        return False
+    if op == "ilike":
+        return value.match(str(current)) is not None
+    value = _coerce(value, current)
+    if op == "eq":
+        return current == value
+    if op == "neq":
+        return current != value
+    if op == "gt":
+        return current > value
+    if op == "gte":
+        return current >= value
+    if op == "lt":
+        return current < value
+    if op == "lte":
+        return current <= value
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class _VectorColumn:
+    """
+    Float32 embedding storage for one table. Rows keep their slot number;
+    capacity grows geometrically so appends are amortised O(1).
+    """
+
+    def __init__(self):
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.size = 0
+
+    def reserve(self, dim: int, rows: int):
+        if self.matrix.shape[1] != dim:
+            if self.size:
+                raise ValueError(f"Embedding dimension {dim} does not match {self.matrix.shape[1]}")
+            self.matrix = np.zeros((0, dim), dtype=np.float32)
+        if rows <= self.matrix.shape[0]:
+            return
+        capacity = max(rows, 2 * self.matrix.shape[0], 1024)
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        grown[:self.size] = self.matrix[:self.size]
+        self.matrix = grown
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[:self.size] = self.norms[:self.size]
+        self.norms = norms
+
+    def append(self, vectors: np.ndarray) -> range:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        self.reserve(vectors.shape[1], self.size + len(vectors))
+        start = self.size
+        self.matrix[start:start + len(vectors)] = vectors
+        self.norms[start:start + len(vectors)] = np.linalg.norm(vectors, axis=1)
+        self.size += len(vectors)
+        return range(start, self.size)
+
+
+class _Table:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: List[dict] = []
+        self.by_id: Dict[Any, dict] = {}
+        self.version = 0
+        self.query_cache: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+        self.vectors = _VectorColumn() if name in VECTOR_COLUMNS else None
+        self.vector_column = VECTOR_COLUMNS.get(name)
+        self._live: Optional[np.ndarray] = None
+        # Rows in ascending id order, so keyset reads on id can bisect
+        self.ids_ascending = True
+
+    def note_appended(self, rows: List[dict]):
+        if self.ids_ascending and rows:
+            previous = self.rows[-len(rows) - 1]["id"] if len(self.rows) > len(rows) else None
+            ids = [row["id"] for row in rows]
+            if (previous is not None and ids[0] <= previous) or any(a >= b for a, b in zip(ids, ids[1:])):
+                self.ids_ascending = False
+
+    def touch(self):
+        self.version += 1
+        self.query_cache.clear()
+        self._live = None
+
+    def live_slots(self) -> np.ndarray:
+        """
+        Row position for every embedding slot, -1 for slots no row points at
+        any more (superseded by an update).
+        """
+        if self._live is None or len(self._live) != self.vectors.size:
+            live = np.full(self.vectors.size, -1, dtype=np.int64)
+            slots = np.fromiter((row.get("_slot", -1) for row in self.rows), dtype=np.int64, count=len(self.rows))
+            has_slot = slots >= 0
+            live[slots[has_slot]] = np.flatnonzero(has_slot)
+            self._live = live
+        return self._live
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._filters: List[tuple] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._payload = None
+        self._negate = False
+
+    # --- builder ---
+
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, rows):
+        self._op, self._payload = "insert", rows
+        return self
+
+    def update(self, data: dict):
+        self._op, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id"):
+        self._op, self._payload = "upsert", (rows, on_conflict)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _filter(self, filt: tuple):
+        if self._negate:
+            filt = ("not", filt)
+            self._negate = False
+        self._filters.append(filt)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(("eq", column, value))
+
+    def neq(self, column, value):
+        return self._filter(("neq", column, value))
+
+    def gt(self, column, value):
+        return self._filter(("gt", column, value))
+
+    def gte(self, column, value):
+        return self._filter(("gte", column, value))
+
+    def lt(self, column, value):
+        return self._filter(("lt", column, value))
+
+    def lte(self, column, value):
+        return self._filter(("lte", column, value))
+
+    def in_(self, column, values):
+        return self._filter(("in", column, frozenset(values)))
+
+    def is_(self, column, value):
+        return self._filter(("is", column, None if value in ("null", None) else value))
+
+    def ilike(self, column, pattern):
+        return self._filter(("ilike", column, _like_pattern(pattern)))
+
+    def or_(self, expr: str):
+        return self._filter(_parse_logic(expr))
+
+    def order(self, column, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # --- execution ---
+
+    def execute(self) -> Response:
+        with self._db.lock:
+            self._db.calls += 1
+            table = self._db.table_state(self._table)
+            if self._op == "insert":
+                return Response(self._db.insert_rows(table, self._payload))
+            if self._op == "update":
+                return self._update(table)
+            if self._op == "upsert":
+                return self._upsert(table)
+            if self._op == "delete":
+                return self._delete(table)
+            return self._select(table)
+
+    def _update(self, table: _Table) -> Response:
+        matched = [row for row in table.rows if all(_matches(row, f) for f in self._filters)]
+        payload = dict(self._payload)
+        vector = payload.pop(table.vector_column, None) if table.vectors else None
+        for row in matched:
+            row.update(payload)
+            if vector is not None:
+                row["_slot"] = table.vectors.append(np.asarray([vector]))[0]
+        table.touch()
+        return Response([self._db.project(table, row, "*") for row in matched])
+
+    def _delete(self, table: _Table) -> Response:
+        removed, kept = [], []
+        for row in table.rows:
+            (removed if all(_matches(row, f) for f in self._filters) else kept).append(row)
+        table.rows = kept
+        for row in removed:
+            table.by_id.pop(row.get("id"), None)
+        table.touch()
+        return Response([self._db.project(table, row, "*") for row in removed])
+
+    def _upsert(self, table: _Table) -> Response:
+        rows, on_conflict = self._payload
+        rows = rows if isinstance(rows, list) else [rows]
+        keys = [k.strip() for k in on_conflict.split(",")]
+
+        def key(row):
+            return tuple(row.get(k) for k in keys)
+
+        existing = {key(row): row for row in table.rows}
+        saved, fresh = [], []
+        for row in rows:
+            current = existing.get(key(row))
+            if current is None:
+                fresh.append(row)
+            else:
+                current.update(row)
+                saved.append(self._db.project(table, current, "*"))
+        table.touch()
+        return Response(saved + self._db.insert_rows(table, fresh))
+
+    def _shape(self) -> tuple:
+        return (tuple(self._filters), tuple(self._order))
+
+    def _select(self, table: _Table) -> Response:
+        end = None if self._limit is None else self._offset + self._limit
+        key = self._shape()
+        matched = table.query_cache.get(key)
+        if matched is not None:
+            table.query_cache.move_to_end(key)
+            self._db.cache_hits += 1
+        elif not self._count and end is not None and len(self._order) <= 1 and not self._offset:
+            # A bounded top-k or first-N read: no need to materialise everything
+            matched = self._top(table, end)
+            key = None
+        else:
+            matched = self._filtered_sorted(table)
+            table.query_cache[key] = matched
+            if len(table.query_cache) > _QUERY_CACHE_SIZE:
+                table.query_cache.popitem(last=False)
+
+        rows = matched[self._offset:end] if key is not None else matched
+        count = len(matched) if self._count else None
+        return Response([self._db.project(table, row, self._columns) for row in rows], count)
+
+    def _candidates(self, table: _Table):
+        if not self._filters:
+            return table.rows
+        return (row for row in table.rows if all(_matches(row, f) for f in self._filters))
+
+    def _top(self, table: _Table, k: int) -> List[dict]:
+        candidates = self._candidates(table)
+        if not self._order:
+            return list(itertools.islice(candidates, k))
+        column, desc = self._order[0]
+        if column == "id" and not desc and table.ids_ascending and table.rows:
+            # Keyset page on id: start at the bound and take the first k matches
+            start = 0
+            for filt in self._filters:
+                if filt[0] in ("gt", "gte") and filt[1] == "id":
+                    find = bisect.bisect_right if filt[0] == "gt" else bisect.bisect_left
+                    start = max(start, find(table.rows, _coerce(filt[2], table.rows[0]["id"]), key=lambda row: row["id"]))
+            rows = itertools.islice(table.rows, start, None)
+            return list(itertools.islice((r for r in rows if all(_matches(r, f) for f in self._filters)), k))
+        pick = heapq.nlargest if desc else heapq.nsmallest
+        return pick(k, candidates, key=lambda row: _sort_key(row.get(column)))
+
+    def _filtered_sorted(self, table: _Table) -> List[dict]:
+        rows = list(self._candidates(table))
+        if self._order and len({desc for _, desc in self._order}) == 1:
+            columns = [c for c, _ in self._order]
+            rows.sort(key=lambda row: tuple(_sort_key(row.get(c)) for c in columns), reverse=self._order[0][1])
+        else:
+            for column, desc in reversed(self._order):
+                rows.sort(key=lambda row: _sort_key(row.get(column)), reverse=desc)
+        return rows
+
+
+class FakeRPC:
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    def execute(self) -> Response:
+        if self._name != "match_documents":
+            raise ValueError(f"Unknown RPC: {self._name}")
+        with self._db.lock:
+            self._db.calls += 1
+            table = self._db.table_state("document_chunks")
+            vectors = table.vectors
+            if not vectors.size:
+                return Response([])
+            query = np.asarray(self._params["query_embedding"], dtype=np.float32)
+            matrix = vectors.matrix[:vectors.size]
+            norms = vectors.norms[:vectors.size] * (np.linalg.norm(query) or 1.0)
+            scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+
+            live = table.live_slots()
+            scores[live < 0] = -np.inf
+
+            k = min(int(self._params["match_count"]), len(scores))
+            top = np.argpartition(-scores, k - 1)[:k] if k else []
+            out = []
+            for slot in sorted(top, key=lambda s: -scores[s]):
+                if scores[slot] <= self._params["match_threshold"]:
+                    continue
+                row = table.rows[live[slot]]
+                out.append({"id": row["id"], "content": row["content"], "metadata": row["metadata"],
+                            "similarity": float(scores[slot])})
+            return Response(out)
+
+
+class _Bucket:
+    def __init__(self, db: "FakeSupabase", name: str):
+        self._db = db
+        self._name = name
+
+    def upload(self, path: str, data: bytes, options: dict = None):
+        with self._db.lock:
+            self._db.objects[(self._name, path)] = len(data)
+        return {"path": path}
+
+    def remove(self, paths: List[str]):
+        with self._db.lock:
+            removed = [p for p in paths if self._db.objects.pop((self._name, p), None) is not None]
+        return [{"name": p} for p in removed]
+
+    def get_public_url(self, path: str) -> str:
+        return f"https://storage.invalid/{self._name}/{path}"
+
+
+class _Storage:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+
+    def from_(self, bucket: str) -> _Bucket:
+        return _Bucket(self._db, bucket)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, _Table] = {}
+        self.objects: Dict[tuple, int] = {}
+        self.storage = _Storage(self)
+        self.calls = 0
+        self.cache_hits = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict) -> FakeRPC:
+        return FakeRPC(self, name, params)
+
+    def table_state(self, name: str) -> _Table:
+        if name not in self.tables:
+            self.tables[name] = _Table(name)
+        return self.tables[name]
+
+    def insert_rows(self, table: _Table, rows) -> List[dict]:
+        rows = rows if isinstance(rows, list) else [rows]
+        if not rows:
+            return []
+        # Serial ids for rows that come without one (text keys are kept)
+        next_id = max((k for k in table.by_id if isinstance(k, int)), default=0) + 1
+        saved = []
+        vectors = None
+        if table.vectors is not None:
+            vectors = [row.get(table.vector_column) for row in rows]
+            slots = table.vectors.append(np.asarray(vectors, dtype=np.float32)) if all(v is not None for v in vectors) else None
+        for i, row in enumerate(rows):
+            row = dict(row)
+            if row.get("id") is None:
+                row["id"] = next_id
+                next_id += 1
+            if vectors is not None:
+                row.pop(table.vector_column, None)
+                row["_slot"] = slots[i] if slots is not None else table.vectors.append(np.asarray([vectors[i]]))[0]
+            table.rows.append(row)
+            table.by_id[row["id"]] = row
+            saved.append(row)
+        table.note_appended(saved)
+        table.touch()
+        return [self.project(table, row, "*") for row in saved]
+
+    def project(self, table: _Table, row: dict, columns: str) -> dict:
+        if columns == "*":
+            out = {k: v for k, v in row.items() if k != "_slot"}
+            wanted = (table.vector_column,) if table.vectors is not None else ()
+        else:
+            wanted = [c.strip() for c in columns.split(",")]
+            out = {c: row.get(c) for c in wanted if c != table.vector_column}
+        if table.vectors is not None and table.vector_column in wanted and "_slot" in row:
+            out[table.vector_column] = table.vectors.matrix[row["_slot"]].copy()
+        return out
+
+    # --- seeding ---
+
+    def load(self, name: str, rows: List[dict], embeddings: np.ndarray = None):
+        """
+        Bulk-loads rows without the per-insert bookkeeping. `embeddings`,
+        for a vector table, holds one row per entry of `rows`.
+        """
+        with self.lock:
+            table = self.table_state(name)
+            if embeddings is not None:
+                slots = table.vectors.append(embeddings)
+                for row, slot in zip(rows, slots):
+                    row["_slot"] = slot
+            table.rows.extend(rows)
+            table.by_id.update((row["id"], row) for row in rows)
+            table.note_appended(rows)
+            table.touch()
+
+    def reset(self, name: str = None):
+        with self.lock:
+            for table in ([name] if name else list(self.tables)):
+                self.tables.pop(table, None)
+
+    def __len__(self):
+        return sum(len(t.rows) for t in self.tables.values())
+
+
+def install(fake: FakeSupabase = None) -> FakeSupabase:
+    """
+    Points the backend's data-access layer at `fake` (a new one if omitted).
+    """
+    from app import database
+    fake = fake or FakeSupabase()
+    database.supabase = fake
+    return fake